@@ -0,0 +1,70 @@
+from typing import Callable, Iterable, List, Optional
+from contextlib import contextmanager
+import logging
+import queue
+import threading
+from .trading_agent import TradingAgent
+
+logger = logging.getLogger(__name__)
+
+
+class AgentPool:
+    """Fixed set of TradingAgents built and warmed ahead of time, lent to one caller at a time.
+
+    Agents are warmed in a background thread, so creating the pool returns at once and the
+    first acquire() only waits for the first agent. Conversation memory is cleared when an
+    agent is returned; market data and the LLM cache are shared by all agents anyway.
+    """
+
+    def __init__(self, size: int = 4, factory: Callable[[], TradingAgent] = TradingAgent,
+                 warm_tickers: Iterable[str] = (), background: bool = True):
+        self.size = size
+        self.factory = factory
+        self.warm_tickers = list(warm_tickers)
+        self.agents: List[TradingAgent] = []
+        self.errors: List[Exception] = []
+        self._idle = queue.Queue()
+        self._ready = threading.Event()
+
+        if background:
+            self._thread = threading.Thread(target=self._fill, name='agent-pool-warmup', daemon=True)
+            self._thread.start()
+        else:
+            self._thread = None
+            self._fill()
+
+    def _fill(self):
+        for _ in range(self.size):
+            try:
+                agent = self.factory().warm(self.warm_tickers)
+            except Exception as e:
+                logger.error(f"Could not warm agent: {str(e)}")
+                self.errors.append(e)
+                continue
+            self.agents.append(agent)
+            self._idle.put(agent)
+        if not self.agents:
+            # Wakes callers already waiting so they fail instead of blocking forever
+            self._idle.put(None)
+        self._ready.set()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until every agent has been built"""
+        return self._ready.wait(timeout)
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None):
+        """Borrow an idle agent for the duration of a with block"""
+        try:
+            agent = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No idle agent within {timeout}s")
+        if agent is None:
+            self._idle.put(None)
+            raise RuntimeError(f"No agents could be built: {self.errors[0] if self.errors else 'pool is empty'}")
+        try:
+            yield agent
+        finally:
+            if agent._memory is not None:
+                agent._memory.clear()
+            self._idle.put(agent)
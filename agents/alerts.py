@@ -0,0 +1,303 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from email.message import EmailMessage
+import logging
+import os
+import queue
+import random
+import smtplib
+import threading
+import time
+from .expressions import strategy_text
+from .metrics import incr, span
+
+logger = logging.getLogger(__name__)
+
+# Most alerts listed in one message
+MAX_BATCH = 50
+
+
+def event_recipients(event: Dict[str, Any]) -> List[str]:
+    """Addresses a signal goes to: the strategy's `email` or `recipients` field"""
+    strategy = event.get('strategy') or {}
+    recipients = strategy.get('recipients') or strategy.get('email') or []
+    if isinstance(recipients, str):
+        recipients = recipients.replace(';', ',').split(',')
+    return [address.strip() for address in recipients if address and address.strip()]
+
+
+def describe_alert(event: Dict[str, Any]) -> str:
+    """The ticker and condition that fired, e.g. "NVDA: rsi < 30"; also what counts as the same alert"""
+    strategy = event.get('strategy') or {}
+    try:
+        condition = strategy_text(strategy)
+    except ValueError:
+        condition = str(event.get('strategy_id'))
+    timeframe = f" on {strategy['timeframe']} bars" if strategy.get('timeframe') not in (None, '1d') else ''
+    return f"{event.get('ticker', '').upper()}: {condition}{timeframe}"
+
+
+def format_alert_message(alerts: List[Dict[str, Any]]) -> Tuple[str, str]:
+    """Subject and plain text body of one message listing the alerts"""
+    tickers = list(dict.fromkeys(alert['ticker'] for alert in alerts))
+    if len(alerts) == 1:
+        subject = f"Trading alert: {alerts[0]['condition']}"
+    else:
+        shown = ', '.join(tickers[:5]) + (f" and {len(tickers) - 5} more" if len(tickers) > 5 else '')
+        subject = f"{len(alerts)} trading alerts: {shown}"
+
+    lines = []
+    for alert in alerts:
+        price = f" at {alert['price']:.2f}" if alert.get('price') is not None else ''
+        lines.append(f"- {alert['condition']}{price} ({alert['timestamp']})")
+        signals = ', '.join(f"{name} {label}" for name, label in (alert.get('signals') or {}).items())
+        if signals:
+            lines.append(f"  Signals: {signals}")
+    return subject, "Your strategies triggered:\n\n" + '\n'.join(lines) + "\n"
+
+
+class SMTPSender:
+    """Sends each batch of alerts as one email over SMTP, opening a connection per batch"""
+
+    def __init__(self, host: str = 'localhost', port: int = 25, from_addr: str = 'alerts@localhost',
+                 username: Optional[str] = None, password: Optional[str] = None, starttls: bool = False,
+                 timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.from_addr = from_addr
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    @classmethod
+    def from_env(cls) -> "SMTPSender":
+        """Configured by SMTP_HOST, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, SMTP_STARTTLS and ALERT_FROM"""
+        return cls(
+            host=os.getenv('SMTP_HOST', 'localhost'),
+            port=int(os.getenv('SMTP_PORT', '25')),
+            from_addr=os.getenv('ALERT_FROM', 'alerts@localhost'),
+            username=os.getenv('SMTP_USERNAME'),
+            password=os.getenv('SMTP_PASSWORD'),
+            starttls=os.getenv('SMTP_STARTTLS') == '1'
+        )
+
+    def send(self, recipient: str, alerts: List[Dict[str, Any]]):
+        subject, body = format_alert_message(alerts)
+        message = EmailMessage()
+        message['From'] = self.from_addr
+        message['To'] = recipient
+        message['Subject'] = subject
+        message.set_content(body)
+
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password or '')
+            smtp.send_message(message)
+
+
+class AlertPipeline:
+    """Delivers triggered signals to their recipients without holding up the monitor.
+
+    submit() only puts the signal on a bounded queue; when the queue is full the signal
+    is dropped and counted rather than blocking the caller. The dispatcher drops repeats
+    of an alert a recipient was sent within `cooldown`, then collects each recipient's
+    alerts for `batch_window` seconds (or until `max_batch`), so a market move that fires
+    many strategies sends every recipient one message. Batches go out through `workers`
+    threads, each retried with exponential backoff; a batch that still fails clears its
+    cooldowns so the next firing is delivered.
+
+    An instance can be passed directly as a StrategyMonitor's `on_signal`.
+    """
+
+    def __init__(self, sender, recipients: Callable[[Dict[str, Any]], List[str]] = event_recipients,
+                 default_recipients: Iterable[str] = (), cooldown: float = 3600.0, batch_window: float = 30.0,
+                 max_batch: int = MAX_BATCH, workers: int = 4, retries: int = 3, backoff: float = 1.0,
+                 max_queue: int = 10000, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.sender = sender
+        self.recipients = recipients
+        self.default_recipients = list(default_recipients)
+        self.cooldown = cooldown
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.clock = clock
+        self._sleep = sleep
+        self.stats = {'submitted': 0, 'dropped': 0, 'deduplicated': 0, 'batches': 0, 'sent': 0, 'failed': 0}
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        # Alerts waiting per recipient, oldest batch first, and when each (recipient, alert) was last queued
+        self._pending: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._last_sent: Dict[Tuple[str, str], float] = {}
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='alert-sender')
+        self._stop = threading.Event()
+        self._thread = None
+
+    def submit(self, event: Dict[str, Any]) -> bool:
+        """Queue a triggered signal; False if the queue is full and it was dropped"""
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._count('dropped')
+            logger.warning(f"Alert queue full, dropping signal for {event.get('strategy_id')}")
+            return False
+        self._count('submitted')
+        return True
+
+    __call__ = submit
+
+    def start(self):
+        """Dispatch queued signals from a background thread until stop() is called"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='alert-dispatcher', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop dispatching, sending whatever is still queued or batched first.
+
+        Sends that have not started by `timeout` are cancelled.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if not self.flush(timeout):
+            with self._lock:
+                logger.warning(f"Stopping with {len(self._in_flight)} alert batch(es) not delivered")
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='alert-sender')
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Send every queued and batched alert now and wait for delivery; False on timeout"""
+        self._dispatch(force=True)
+        with self._lock:
+            in_flight = list(self._in_flight)
+        done, not_done = wait(in_flight, timeout)
+        return not not_done
+
+    def pending(self) -> int:
+        """Alerts queued or waiting in a batch"""
+        with self._lock:
+            return self._queue.qsize() + sum(len(batch['alerts']) for batch in self._pending.values())
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                event = self._queue.get(timeout=self._next_due())
+            except queue.Empty:
+                event = None
+            if event is not None:
+                self._add(event)
+            try:
+                self._dispatch()
+            except Exception as e:
+                logger.error(f"Alert dispatch failed: {str(e)}")
+
+    def _next_due(self) -> float:
+        """Seconds until the oldest batch is due, at most one second so stop() is noticed"""
+        with self._lock:
+            if not self._pending:
+                return 1.0
+            first = next(iter(self._pending.values()))['started']
+        return min(1.0, max(0.0, first + self.batch_window - self.clock()))
+
+    def _dispatch(self, force: bool = False):
+        """Batch everything queued, then send the batches that are due"""
+        while True:
+            try:
+                self._add(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        now = self.clock()
+        futures = []
+        with self._lock:
+            for recipient, batch in list(self._pending.items()):
+                alerts = batch['alerts']
+                # Full batches go out at once; the rest waits for the window unless forced
+                if force or now - batch['started'] >= self.batch_window:
+                    sending = len(alerts)
+                else:
+                    sending = len(alerts) - len(alerts) % self.max_batch
+                for offset in range(0, sending, self.max_batch):
+                    futures.append(self._executor.submit(self._deliver, recipient,
+                                                         alerts[offset:min(offset + self.max_batch, sending)]))
+                del alerts[:sending]
+                if not alerts:
+                    del self._pending[recipient]
+            self._in_flight.update(futures)
+        # Outside the lock: a callback on a future that is already done runs right here
+        for future in futures:
+            future.add_done_callback(self._finished)
+
+    def _add(self, event: Dict[str, Any]):
+        """Queue the alert for each of its recipients unless it is within their cooldown"""
+        recipients = self.recipients(event) or self.default_recipients
+        if not recipients:
+            logger.info(f"Signal for {event.get('strategy_id')} has no recipients")
+            return
+
+        # Identical strategies saved under different ids are one alert
+        key = describe_alert(event)
+        alert = {
+            'strategy_id': event.get('strategy_id'),
+            'ticker': event.get('ticker', ''),
+            'condition': key,
+            'price': event.get('price'),
+            'signals': event.get('signals'),
+            'timestamp': event.get('timestamp'),
+        }
+        now = self.clock()
+        with self._lock:
+            for recipient in recipients:
+                last = self._last_sent.get((recipient, key))
+                if last is not None and now - last < self.cooldown:
+                    self.stats['deduplicated'] += 1
+                    incr('alerts.deduplicated')
+                    continue
+                self._last_sent[(recipient, key)] = now
+                batch = self._pending.setdefault(recipient, {'started': now, 'alerts': []})
+                batch['alerts'].append(alert)
+
+            # Cooldowns only matter while they last
+            if len(self._last_sent) > 10000:
+                self._last_sent = {k: t for k, t in self._last_sent.items() if now - t < self.cooldown}
+
+    def _deliver(self, recipient: str, alerts: List[Dict[str, Any]]):
+        """Send one batch, retrying with exponential backoff and jitter"""
+        for attempt in range(self.retries + 1):
+            try:
+                with span('alerts.send'):
+                    self.sender.send(recipient, alerts)
+                self._count('batches')
+                self._count('sent', len(alerts))
+                return
+            except Exception as e:
+                if attempt == self.retries:
+                    self._count('failed', len(alerts))
+                    logger.error(f"Giving up on {len(alerts)} alert(s) for {recipient}: {str(e)}")
+                    with self._lock:
+                        for alert in alerts:
+                            self._last_sent.pop((recipient, alert['condition']), None)
+                    return
+                delay = self.backoff * (2 ** attempt) * (1 + random.random())
+                logger.info(f"Retrying alerts for {recipient} in {delay:.1f}s after error: {str(e)}")
+                self._sleep(delay)
+
+    def _finished(self, future: Future):
+        with self._lock:
+            self._in_flight.discard(future)
+
+    def _count(self, name: str, value: int = 1):
+        with self._lock:
+            self.stats[name] += value
+        incr(f'alerts.{name}', value)
@@ -0,0 +1,226 @@
+from typing import Any, Dict, Iterable, Optional, Tuple
+import numpy as np
+import pandas as pd
+import talib
+from .expressions import SeriesSource, compile_strategy
+from .metrics import timed
+from .signals import (
+    CONDITION_LABELS, strategy_entries,
+    RSI_OVERSOLD, RSI_OVERBOUGHT, RSI_NEUTRAL,
+    MACD_BULLISH, MACD_BEARISH,
+    VOLUME_HIGH, VOLUME_LOW, VOLUME_NORMAL
+)
+from .timeframes import bars_per_year, normalize_timeframe
+
+# Bars skipped before the first signal is evaluated
+WARMUP_BARS = 20
+
+# Bars held after a signal fires
+HOLDING_PERIOD = 5
+
+# Bars of the previous chunk replayed before each chunk in a chunked backtest
+CHUNK_OVERLAP = 500
+
+
+@timed('indicators.calculate')
+def calculate_indicator_series(data: pd.DataFrame) -> Dict[str, Any]:
+    """Calculate every technical indicator once over the whole frame"""
+    close_prices = data['Close'].values.astype(float)
+    high_prices = data['High'].values.astype(float)
+    low_prices = data['Low'].values.astype(float)
+    volume = data['Volume'].values.astype(float)
+
+    series = {}
+
+    # RSI
+    series['RSI'] = talib.RSI(close_prices, timeperiod=14)
+
+    # MACD
+    macd, signal, hist = talib.MACD(close_prices)
+    series['MACD'] = {
+        'macd': macd,
+        'signal': signal,
+        'histogram': hist
+    }
+
+    # Bollinger Bands
+    upper, middle, lower = talib.BBANDS(close_prices, timeperiod=20)
+    series['BB'] = {
+        'upper': upper,
+        'middle': middle,
+        'lower': lower
+    }
+
+    # Volume indicators
+    series['OBV'] = talib.OBV(close_prices, volume)
+
+    # Trend indicators
+    series['SMA_20'] = talib.SMA(close_prices, timeperiod=20)
+    series['SMA_50'] = talib.SMA(close_prices, timeperiod=50)
+    series['EMA_20'] = talib.EMA(close_prices, timeperiod=20)
+
+    # Volatility
+    series['ATR'] = talib.ATR(high_prices, low_prices, close_prices, timeperiod=14)
+
+    return series
+
+
+def latest_values(series: Dict[str, Any]) -> Dict[str, Any]:
+    """Take the most recent value of each indicator series"""
+    return {
+        name: {key: values[-1] for key, values in value.items()} if isinstance(value, dict) else value[-1]
+        for name, value in series.items()
+    }
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over up to `window` bars, like Series.tail(window).mean() at each bar"""
+    values = np.asarray(values, dtype=float)
+    sums = np.cumsum(values)
+    means = np.empty_like(values)
+    count = min(window, len(values))
+    means[:count] = sums[:count] / np.arange(1, count + 1)
+    if len(values) > window:
+        means[window:] = (sums[window:] - sums[:-window]) / window
+    return means
+
+
+def generate_signal_masks(series: Dict[str, Any], volume: np.ndarray, avg_volume_10d: np.ndarray,
+                          oversold: float = 30, overbought: float = 70) -> Dict[str, Dict[str, np.ndarray]]:
+    """Boolean mask per signal label, the vectorized form of signals.generate_signals"""
+    rsi = series['RSI']
+    macd = series['MACD']
+
+    # NaN comparisons are False, which matches the scalar rules during warm-up
+    with np.errstate(invalid='ignore'):
+        rsi_oversold = rsi < oversold
+        rsi_overbought = ~rsi_oversold & (rsi > overbought)
+        macd_bullish = macd['macd'] > macd['signal']
+        volume_high = volume > avg_volume_10d * 1.5
+        volume_low = ~volume_high & (volume < avg_volume_10d * 0.5)
+
+    return {
+        'RSI': {
+            RSI_OVERSOLD: rsi_oversold,
+            RSI_OVERBOUGHT: rsi_overbought,
+            RSI_NEUTRAL: ~(rsi_oversold | rsi_overbought)
+        },
+        'MACD': {
+            MACD_BULLISH: macd_bullish,
+            MACD_BEARISH: ~macd_bullish
+        },
+        'Volume': {
+            VOLUME_HIGH: volume_high,
+            VOLUME_LOW: volume_low,
+            VOLUME_NORMAL: ~(volume_high | volume_low)
+        }
+    }
+
+
+def strategy_mask(masks: Dict[str, Dict[str, np.ndarray]], strategy: Dict[str, Any], length: int) -> np.ndarray:
+    """Bars where the strategy triggers, the vectorized form of signals.should_trigger_signal"""
+    matches = []
+    for indicator, condition in strategy_entries(strategy):
+        label = CONDITION_LABELS.get(indicator, {}).get(condition)
+        triggered = np.zeros(length, dtype=bool)
+        for name, mask in masks.get(indicator, {}).items():
+            if label is not None and label in name:
+                triggered |= mask
+        matches.append(triggered)
+
+    if str(strategy.get('logic', 'and')).lower() == 'or':
+        return np.logical_or.reduce(matches)
+    return np.logical_and.reduce(matches)
+
+
+def forward_returns(close_prices: np.ndarray, horizon: int = HOLDING_PERIOD) -> np.ndarray:
+    """Return from each bar to `horizon` bars later, capped at the last bar"""
+    close_prices = np.asarray(close_prices, dtype=float)
+    exit_idx = np.minimum(np.arange(len(close_prices)) + horizon, len(close_prices) - 1)
+    return close_prices[exit_idx] / close_prices - 1
+
+
+def periods_per_year(strategy: Dict[str, Any], horizon: int = HOLDING_PERIOD) -> float:
+    """Holding periods in a trading year at the strategy's bar size"""
+    return bars_per_year(normalize_timeframe(strategy.get('timeframe'))) / horizon
+
+
+def summarize_returns(performance: np.ndarray, periods: Optional[float] = None) -> Dict[str, Any]:
+    """Calculate the performance metrics reported for a backtest.
+
+    `sharpe_ratio` is per holding period; with `periods` per year, `annualized_sharpe`
+    scales it by their square root. Returns without spread, such as a single trade,
+    have a Sharpe ratio of 0.
+    """
+    std = np.std(performance) if len(performance) else 0.0
+    summary = {
+        'total_signals': len(performance),
+        'avg_return': np.mean(performance) if len(performance) else 0,
+        'win_rate': np.count_nonzero(performance > 0) / len(performance) if len(performance) else 0,
+        'sharpe_ratio': np.mean(performance) / std if std > 1e-12 else 0
+    }
+    if periods is not None:
+        summary['annualized_sharpe'] = summary['sharpe_ratio'] * np.sqrt(periods)
+    return summary
+
+
+def strategy_signals(df: pd.DataFrame, strategy: Dict[str, Any],
+                     horizon: int = HOLDING_PERIOD) -> Tuple[np.ndarray, np.ndarray]:
+    """Trigger mask and forward return of every bar in a frame"""
+    expression = compile_strategy(strategy)
+    volume = df['Volume'].values.astype(float)
+    source = SeriesSource.from_frame(df, {**calculate_indicator_series(df), 'avg_volume': rolling_mean(volume, 10)})
+    triggered = np.array(expression.evaluate(source), dtype=bool)
+    return triggered, forward_returns(df['Close'].values, horizon)
+
+
+def backtest(df: pd.DataFrame, strategy: Dict[str, Any], warmup: int = WARMUP_BARS,
+             horizon: int = HOLDING_PERIOD) -> Dict[str, Any]:
+    """Backtest a strategy over a price frame in a single vectorized pass"""
+    triggered, returns = strategy_signals(df, strategy, horizon)
+    triggered[:warmup] = False
+    return summarize_returns(returns[triggered], periods_per_year(strategy, horizon))
+
+
+def backtest_chunks(chunks: Iterable[pd.DataFrame], strategy: Dict[str, Any], warmup: int = WARMUP_BARS,
+                    horizon: int = HOLDING_PERIOD, overlap: int = CHUNK_OVERLAP) -> Dict[str, Any]:
+    """Backtest over consecutive frames (e.g. MarketDataStore.iter_history) holding only one at a time.
+
+    Each chunk is evaluated after the last `overlap` bars of the previous one, which
+    warms up the recursive indicators to floating-point precision. Signals in the last
+    `horizon` bars of a chunk are evaluated with the next chunk, once their forward
+    returns are known.
+    """
+    overlap = max(overlap, horizon)
+    performance = []
+    carry = None
+    consumed = 0       # bars received so far
+    evaluated = 0      # bars whose signals have been counted
+    last = None
+
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        frame = chunk if carry is None else pd.concat([carry, chunk])
+        frame_start = consumed - (0 if carry is None else len(carry))
+        consumed += len(chunk)
+
+        triggered, returns = strategy_signals(frame, strategy, horizon)
+        lo = max(evaluated, warmup) - frame_start
+        hi = len(frame) - horizon
+        if hi > lo:
+            performance.append(returns[lo:hi][triggered[lo:hi]])
+            evaluated = frame_start + hi
+
+        carry = frame.iloc[-overlap:]
+        last = (triggered, returns, frame_start)
+
+    # The final bars' forward returns end at the last bar, as in backtest()
+    if last is not None:
+        triggered, returns, frame_start = last
+        lo = max(evaluated, warmup) - frame_start
+        if lo < len(returns):
+            performance.append(returns[lo:][triggered[lo:]])
+
+    return summarize_returns(np.concatenate(performance) if performance else np.array([]),
+                             periods_per_year(strategy, horizon))
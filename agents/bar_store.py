@@ -0,0 +1,209 @@
+from typing import Any, Dict, Iterator, List, Optional
+from datetime import datetime
+import json
+import os
+import re
+import threading
+import numpy as np
+import pandas as pd
+
+# On-disk format version, bumped on incompatible layout changes
+FORMAT_VERSION = 1
+
+# Columns stored as int64; everything else is float64
+INTEGER_COLUMNS = {'Volume'}
+
+INDEX_FILE = 'index.bin'
+META_FILE = 'meta.json'
+
+
+class BarStore:
+    """Columnar bar storage: one raw little-endian file per column plus an epoch-ns index.
+
+    Each ticker lives in its own directory:
+
+        <root>/<TICKER>/meta.json   columns, dtypes, row count and timezone
+        <root>/<TICKER>/index.bin   int64 nanoseconds since the epoch (UTC)
+        <root>/<TICKER>/<col>.bin   float64 or int64 values
+
+    Files are memory-mapped on read, so loading a column or a row range only
+    touches the pages it needs. New bars are appended to the end of each file;
+    the row count in meta.json is updated last, so readers never see a partial append.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.RLock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def tickers(self) -> List[str]:
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.exists(os.path.join(self.root, name, META_FILE)))
+
+    def exists(self, ticker: str) -> bool:
+        return os.path.exists(self._meta_path(ticker))
+
+    def metadata(self, ticker: str) -> Dict[str, Any]:
+        with open(self._meta_path(ticker)) as f:
+            return json.load(f)
+
+    def rows(self, ticker: str) -> int:
+        return self.metadata(ticker)['rows'] if self.exists(ticker) else 0
+
+    def write(self, ticker: str, df: pd.DataFrame):
+        """Replace a ticker's bars"""
+        with self._lock:
+            ticker_dir = self._ticker_dir(ticker)
+            os.makedirs(ticker_dir, exist_ok=True)
+            meta = self._new_metadata(df)
+
+            # Replaced files get new inodes, so existing memory maps keep their old contents
+            self._replace_array(os.path.join(ticker_dir, INDEX_FILE), self._index_values(df.index))
+            for name, column in meta['columns'].items():
+                values = df[name].values.astype(column['dtype'])
+                self._replace_array(os.path.join(ticker_dir, column['file']), values)
+
+            meta['rows'] = len(df)
+            self._save_metadata(ticker, meta)
+
+    def append(self, ticker: str, df: pd.DataFrame):
+        """Append bars, overwriting any stored bars at or after the first new timestamp"""
+        if df.empty:
+            return
+        with self._lock:
+            if not self.exists(ticker):
+                self.write(ticker, df)
+                return
+
+            meta = self.metadata(ticker)
+            ticker_dir = self._ticker_dir(ticker)
+            new_index = self._index_values(df.index)
+
+            # Bars that replace the stored tail (e.g. today's partial bar) truncate it first
+            position = int(np.searchsorted(self._index(ticker, meta), new_index[0], side='left'))
+            if position < meta['rows']:
+                meta['rows'] = position
+                self._save_metadata(ticker, meta)
+                self._truncate(ticker_dir, meta, position)
+
+            self._write_array(os.path.join(ticker_dir, INDEX_FILE), new_index, 'ab')
+            for name, column in meta['columns'].items():
+                if name in df.columns:
+                    values = df[name].values.astype(column['dtype'])
+                else:
+                    values = np.zeros(len(df), dtype=column['dtype'])
+                self._write_array(os.path.join(ticker_dir, column['file']), values, 'ab')
+
+            meta['rows'] = position + len(df)
+            self._save_metadata(ticker, meta)
+
+    def read(self, ticker: str, columns: Optional[List[str]] = None,
+             start: Optional[datetime] = None, end: Optional[datetime] = None) -> pd.DataFrame:
+        """Load a row range of some or all columns as a DataFrame"""
+        meta = self.metadata(ticker)
+        index = self._index(ticker, meta)
+        lo, hi = self._row_range(index, meta, start, end)
+        columns = columns or list(meta['columns'])
+
+        data = {name: np.array(self.column(ticker, name, lo, hi, meta)) for name in columns}
+        dates = pd.to_datetime(np.array(index[lo:hi]), utc=True).tz_convert(meta['tz'])
+        return pd.DataFrame(data, index=pd.DatetimeIndex(dates, name='Date'))
+
+    def iter_chunks(self, ticker: str, chunk_rows: int = 100_000, columns: Optional[List[str]] = None,
+                    start: Optional[datetime] = None, end: Optional[datetime] = None) -> Iterator[pd.DataFrame]:
+        """Yield a row range as consecutive frames of at most `chunk_rows` bars, reading one chunk at a time"""
+        meta = self.metadata(ticker)
+        index = self._index(ticker, meta)
+        lo, hi = self._row_range(index, meta, start, end)
+        columns = columns or list(meta['columns'])
+
+        for chunk_start in range(lo, hi, chunk_rows):
+            chunk_stop = min(chunk_start + chunk_rows, hi)
+            data = {name: np.array(self.column(ticker, name, chunk_start, chunk_stop, meta)) for name in columns}
+            dates = pd.to_datetime(np.array(index[chunk_start:chunk_stop]), utc=True).tz_convert(meta['tz'])
+            yield pd.DataFrame(data, index=pd.DatetimeIndex(dates, name='Date'))
+
+    def column(self, ticker: str, name: str, start_row: int = 0, stop_row: Optional[int] = None,
+               meta: Optional[Dict[str, Any]] = None) -> np.ndarray:
+        """Memory-mapped view of one column between two row positions"""
+        meta = meta or self.metadata(ticker)
+        column = meta['columns'][name]
+        values = self._map(os.path.join(self._ticker_dir(ticker), column['file']), column['dtype'], meta['rows'])
+        return values[start_row:stop_row]
+
+    def index(self, ticker: str) -> np.ndarray:
+        """Memory-mapped epoch-ns timestamps"""
+        return self._index(ticker, self.metadata(ticker))
+
+    def export_csv(self, ticker: str, path: str):
+        """Write a ticker in the CSV layout the frontend reads"""
+        self.read(ticker).to_csv(path)
+
+    def _index(self, ticker: str, meta: Dict[str, Any]) -> np.ndarray:
+        return self._map(os.path.join(self._ticker_dir(ticker), INDEX_FILE), '<i8', meta['rows'])
+
+    def _row_range(self, index: np.ndarray, meta: Dict[str, Any],
+                   start: Optional[datetime], end: Optional[datetime]):
+        lo = 0 if start is None else int(np.searchsorted(index, self._epoch_ns(start, meta['tz']), side='left'))
+        hi = meta['rows'] if end is None else int(np.searchsorted(index, self._epoch_ns(end, meta['tz']), side='right'))
+        return lo, hi
+
+    def _truncate(self, ticker_dir: str, meta: Dict[str, Any], position: int):
+        os.truncate(os.path.join(ticker_dir, INDEX_FILE), position * 8)
+        for column in meta['columns'].values():
+            os.truncate(os.path.join(ticker_dir, column['file']), position * np.dtype(column['dtype']).itemsize)
+
+    def _new_metadata(self, df: pd.DataFrame) -> Dict[str, Any]:
+        tz = str(df.index.tz) if df.index.tz is not None else 'UTC'
+        columns = {}
+        for name in df.columns:
+            dtype = '<i8' if name in INTEGER_COLUMNS else '<f8'
+            columns[name] = {'dtype': dtype, 'file': self._column_file(name)}
+        return {'version': FORMAT_VERSION, 'tz': tz, 'rows': 0, 'columns': columns}
+
+    def _save_metadata(self, ticker: str, meta: Dict[str, Any]):
+        path = self._meta_path(ticker)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def _ticker_dir(self, ticker: str) -> str:
+        return os.path.join(self.root, ticker.upper())
+
+    def _meta_path(self, ticker: str) -> str:
+        return os.path.join(self._ticker_dir(ticker), META_FILE)
+
+    @staticmethod
+    def _map(path: str, dtype: str, rows: int) -> np.ndarray:
+        # Zero-length files cannot be memory-mapped
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(rows,))
+
+    @staticmethod
+    def _write_array(path: str, values: np.ndarray, mode: str):
+        with open(path, mode) as f:
+            f.write(np.ascontiguousarray(values).tobytes())
+
+    @classmethod
+    def _replace_array(cls, path: str, values: np.ndarray):
+        cls._write_array(path + '.tmp', values, 'wb')
+        os.replace(path + '.tmp', path)
+
+    @staticmethod
+    def _column_file(name: str) -> str:
+        return re.sub(r'[^A-Za-z0-9_]+', '_', name) + '.bin'
+
+    @staticmethod
+    def _index_values(index: pd.DatetimeIndex) -> np.ndarray:
+        if index.tz is None:
+            index = index.tz_localize('UTC')
+        return index.tz_convert('UTC').as_unit('ns').asi8.astype('<i8')
+
+    @staticmethod
+    def _epoch_ns(value: datetime, tz: str) -> int:
+        timestamp = pd.Timestamp(value)
+        if timestamp.tz is None:
+            timestamp = timestamp.tz_localize(tz)
+        return timestamp.tz_convert('UTC').as_unit('ns').value
@@ -0,0 +1,460 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timedelta
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from .bar_store import BarStore
+from .market_data import DATA_DIR, MARKET_TZ, MarketDataStore, default_store
+from .metrics import incr, span
+from .timeframes import DEFAULT_TIMEFRAME, normalize_timeframe
+
+logger = logging.getLogger(__name__)
+
+# On-disk layout version, bumped on incompatible changes
+FORMAT_VERSION = 1
+
+# Columns published per ticker; the epoch-ns index is stored in front of them
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Tickers one shared directory can hold
+DEFAULT_SLOTS = 4096
+
+# Spare rows allocated past the current bars, so new bars are appended in place
+MIN_HEADROOM = 1024
+
+CONTROL_FILE = 'control.bin'
+META_FILE = 'meta.json'
+
+# control.bin: a header of int64 fields followed by one slot per ticker
+HEADER_FIELDS = ['version', 'epoch', 'slots', 'closed']
+HEADER_BYTES = 64
+SLOT_DTYPE = np.dtype([('seq', '<i8'), ('generation', '<i8'), ('rows', '<i8'), ('capacity', '<i8'),
+                       ('updated', '<i8'), ('name', 'S24')])
+
+
+def default_root() -> str:
+    """Where the server publishes: $MARKET_DATA_SHM, else tmpfs at /dev/shm, else data/shared"""
+    if os.getenv('MARKET_DATA_SHM'):
+        return os.environ['MARKET_DATA_SHM']
+    if os.path.isdir('/dev/shm'):
+        return '/dev/shm/trading_agent_bars'
+    return os.path.join(DATA_DIR, 'shared')
+
+
+def _bars_path(root: str, ticker: str, generation: int) -> str:
+    return os.path.join(root, f"{ticker}.{generation}.bin")
+
+
+class MarketDataServer:
+    """Publishes the latest bars of a set of tickers into memory-mapped files for other processes.
+
+    Each ticker's bars live in one file of float64 rows (index, Open, High, Low, Close,
+    Volume) with spare capacity at the end, named by a generation number. A small control
+    file holds one slot per ticker with its generation and row count behind a seqlock:
+    the sequence number is odd while a slot is being updated, so readers retry instead of
+    seeing a half-written slot.
+
+    Rows below a slot's row count never change within a generation. New bars are written
+    past them and then made visible by raising the row count. A frame whose window starts
+    later than the published rows (a refresh over the last `days` as time moves on) is
+    compared from its first row, so the older rows simply stay published. Any other change
+    (a revised last bar, corrected or backfilled history, running out of capacity) writes
+    a new generation file and unlinks the old one, which stays readable for processes
+    that still map it. Readers therefore share the pages of one copy without copying or
+    locking.
+
+    One server publishes to a directory; any number of SharedMarketData clients read it.
+    """
+
+    def __init__(self, tickers: Iterable[str] = (), store: Optional[MarketDataStore] = None,
+                 root: Optional[str] = None, timeframe: str = DEFAULT_TIMEFRAME, days: int = 365,
+                 interval: float = 60.0, slots: int = DEFAULT_SLOTS):
+        self.tickers = [ticker.upper() for ticker in tickers]
+        self.store = store or default_store()
+        self.root = root or default_root()
+        self.timeframe = normalize_timeframe(timeframe)
+        self.days = days
+        self.interval = interval
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._slots: Dict[str, int] = {}
+        self._maps: Dict[str, np.memmap] = {}
+        self._create(slots)
+
+    def publish(self, ticker: str, df: pd.DataFrame) -> bool:
+        """Make a ticker's bars visible to readers; False when nothing changed"""
+        ticker = ticker.upper()
+        if df.empty:
+            return False
+        values = self._pack(df)
+        rows = values.shape[1]
+
+        with self._lock, span('data_server.publish', ticker=ticker):
+            slot = self._slot(ticker)
+            previous = generation = int(self._slots_view['generation'][slot])
+            published, capacity = int(self._slots_view['rows'][slot]), int(self._slots_view['capacity'][slot])
+            array = self._maps.get(ticker)
+
+            # Published row where the frame starts; rows before it stay as they are
+            start = 0
+            if array is not None and published:
+                index = array[0, :published].view('<i8')
+                start = int(np.searchsorted(index, values[0, 0:1].view('<i8')[0]))
+            overlap = published - start
+            # Bit-level comparison, so NaNs in the same place compare equal
+            unchanged = (array is not None and 0 < overlap <= rows and start + rows <= capacity
+                         and np.array_equal(array[:, start:published].view('<i8'), values[:, :overlap].view('<i8')))
+            if unchanged and rows == overlap:
+                return False
+
+            if unchanged:
+                array[:, published:start + rows] = values[:, overlap:]
+                incr('data_server.appended_rows', rows - overlap)
+                rows = start + rows
+            else:
+                generation += 1
+                capacity = rows + max(rows // 4, MIN_HEADROOM)
+                array = np.memmap(_bars_path(self.root, ticker, generation), dtype='<f8', mode='w+',
+                                  shape=(len(COLUMNS) + 1, capacity))
+                array[:, :rows] = values
+                incr('data_server.generations')
+
+            self._commit(slot, generation, rows, capacity)
+            if generation != previous:
+                self._maps[ticker] = array
+                self._unlink(ticker, previous)
+        return True
+
+    def refresh(self, ticker: str) -> bool:
+        """Fetch a ticker through the store and publish it if anything changed"""
+        try:
+            df = self.store.get_history(ticker, days=self.days, timeframe=self.timeframe)
+        except Exception as e:
+            logger.warning(f"Could not refresh {ticker}: {str(e)}")
+            return False
+        return self.publish(ticker, df)
+
+    def add(self, *tickers: str):
+        """Track more tickers and publish them now"""
+        for ticker in tickers:
+            ticker = ticker.upper()
+            if ticker not in self.tickers:
+                self.tickers.append(ticker)
+            self.refresh(ticker)
+
+    def run_cycle(self) -> List[str]:
+        """Refresh every tracked ticker once; return those with new data"""
+        return [ticker for ticker in list(self.tickers) if self.refresh(ticker)]
+
+    def start(self):
+        """Publish every `interval` seconds in a background thread until stop() is called"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='market-data-server', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def close(self, unlink: bool = True):
+        """Stop publishing and tell clients; with `unlink` the files are removed"""
+        self.stop()
+        with self._lock:
+            self._header[HEADER_FIELDS.index('closed')] = 1
+            if unlink:
+                for ticker, slot in self._slots.items():
+                    self._unlink(ticker, int(self._slots_view['generation'][slot]))
+                for name in (CONTROL_FILE, META_FILE):
+                    if os.path.exists(os.path.join(self.root, name)):
+                        os.remove(os.path.join(self.root, name))
+            self._maps.clear()
+
+    def __enter__(self) -> "MarketDataServer":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                updated = self.run_cycle()
+                if updated:
+                    logger.info(f"Published {', '.join(updated)}")
+            except Exception as e:
+                logger.error(f"Publishing cycle failed: {str(e)}")
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def _create(self, slots: int):
+        """Start a fresh directory; clients attached to a previous server re-attach when it closes"""
+        os.makedirs(self.root, exist_ok=True)
+        control_path = os.path.join(self.root, CONTROL_FILE)
+        if os.path.exists(control_path):
+            # Let clients of the previous server know it is gone before its files are replaced
+            np.memmap(control_path, dtype='<i8', mode='r+', shape=(len(HEADER_FIELDS),))[
+                HEADER_FIELDS.index('closed')] = 1
+        for name in os.listdir(self.root):
+            if name.endswith('.bin') and name != CONTROL_FILE:
+                os.remove(os.path.join(self.root, name))
+
+        tmp_path = control_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.truncate(HEADER_BYTES + slots * SLOT_DTYPE.itemsize)
+        header = np.memmap(tmp_path, dtype='<i8', mode='r+', shape=(len(HEADER_FIELDS),))
+        header[:] = [FORMAT_VERSION, 0, slots, 0]
+        header.flush()
+        os.replace(tmp_path, control_path)
+
+        self._header = np.memmap(control_path, dtype='<i8', mode='r+', shape=(len(HEADER_FIELDS),))
+        self._slots_view = np.memmap(control_path, dtype=SLOT_DTYPE, mode='r+', offset=HEADER_BYTES, shape=(slots,))
+
+        meta = {'version': FORMAT_VERSION, 'timeframe': self.timeframe, 'tz': MARKET_TZ,
+                'columns': COLUMNS, 'slots': slots}
+        with open(os.path.join(self.root, META_FILE + '.tmp'), 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(os.path.join(self.root, META_FILE + '.tmp'), os.path.join(self.root, META_FILE))
+
+    def _slot(self, ticker: str) -> int:
+        slot = self._slots.get(ticker)
+        if slot is None:
+            if len(self._slots) >= len(self._slots_view):
+                raise ValueError(f"No free slot for {ticker}; all {len(self._slots_view)} are in use")
+            if len(ticker.encode()) > SLOT_DTYPE['name'].itemsize:
+                raise ValueError(f"Ticker name too long: {ticker}")
+            slot = self._slots[ticker] = len(self._slots)
+            # Readers skip the slot until its first commit gives it a generation
+            self._slots_view[slot]['name'] = ticker.encode()
+        return slot
+
+    def _commit(self, slot: int, generation: int, rows: int, capacity: int):
+        """Seqlock write of one slot, then a bump of the epoch clients wait on"""
+        entry = self._slots_view[slot:slot + 1]
+        entry['seq'] += 1
+        entry['generation'] = generation
+        entry['rows'] = rows
+        entry['capacity'] = capacity
+        entry['updated'] = time.time_ns()
+        entry['seq'] += 1
+        self._header[HEADER_FIELDS.index('epoch')] += 1
+
+    def _unlink(self, ticker: str, generation: int):
+        path = _bars_path(self.root, ticker, generation)
+        if generation > 0 and os.path.exists(path):
+            os.remove(path)
+
+    @staticmethod
+    def _pack(df: pd.DataFrame) -> np.ndarray:
+        values = np.empty((len(COLUMNS) + 1, len(df)), dtype='<f8')
+        values[0] = BarStore._index_values(df.index).view('<f8')
+        for row, column in enumerate(COLUMNS, start=1):
+            values[row] = df[column].values.astype(float)
+        return values
+
+
+class SharedMarketData:
+    """Read side of a MarketDataServer, usable wherever a MarketDataStore is.
+
+    get_history() returns frames whose price and volume columns are views of the shared
+    pages, so many worker processes hold one copy of each ticker. Volume is float64 in
+    these frames. Tickers or bar sizes the server does not publish are read from
+    `fallback` when one is given.
+    """
+
+    def __init__(self, root: Optional[str] = None, fallback: Optional[MarketDataStore] = None):
+        self.root = root or default_root()
+        self.fallback = fallback
+        self._lock = threading.RLock()
+        self._header = None
+        self._slots_view = None
+        self._slots: Dict[str, int] = {}
+        self._maps: Dict[str, Tuple[int, np.ndarray]] = {}
+        self._indexes: Dict[str, Tuple[int, int, pd.DatetimeIndex]] = {}
+        self.meta: Dict[str, Any] = {}
+
+    @property
+    def epoch(self) -> int:
+        """Counter raised by every publish; 0 when no server is running"""
+        header = self._attach()
+        return 0 if header is None else int(header[HEADER_FIELDS.index('epoch')])
+
+    def tickers(self) -> List[str]:
+        """Published tickers, plus those the fallback store holds"""
+        published = self._find_slots() if self._attach() is not None else {}
+        fallback = self.fallback.tickers() if self.fallback is not None else []
+        return sorted(set(published) | set(fallback))
+
+    def version(self, ticker: str) -> Optional[Dict[str, int]]:
+        """Generation, row count and last update (epoch ns) of a published ticker"""
+        snapshot = self._snapshot(ticker.upper())
+        if snapshot is None:
+            return None
+        generation, rows, _ = snapshot
+        return {'generation': generation, 'rows': rows,
+                'updated': int(self._slots_view['updated'][self._slots[ticker.upper()]])}
+
+    def arrays(self, ticker: str) -> Optional[Dict[str, np.ndarray]]:
+        """Read-only views of a ticker's published epoch-ns index and columns"""
+        snapshot = self._snapshot(ticker.upper())
+        if snapshot is None:
+            return None
+        _, rows, array = snapshot
+        arrays = {'index': array[0, :rows].view('<i8')}
+        arrays.update({column: array[row, :rows] for row, column in enumerate(COLUMNS, start=1)})
+        return arrays
+
+    def get_history(self, ticker: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                    days: Optional[int] = None, force_refresh: bool = False,
+                    timeframe: str = DEFAULT_TIMEFRAME) -> pd.DataFrame:
+        """Bars for [start, end] from shared memory, with the same arguments as MarketDataStore.get_history"""
+        ticker = ticker.upper()
+        timeframe = normalize_timeframe(timeframe)
+        published = self._attach() is not None and timeframe == self.meta['timeframe']
+        snapshot = self._snapshot(ticker) if published else None
+        if snapshot is None or force_refresh:
+            incr('shared_data.misses')
+            if self.fallback is None:
+                logger.warning(f"{ticker} {timeframe} is not published and there is no fallback store")
+                return pd.DataFrame()
+            return self.fallback.get_history(ticker, start, end, days, force_refresh, timeframe)
+
+        incr('shared_data.hits')
+        generation, rows, array = snapshot
+        end = end or datetime.now()
+        if start is None:
+            start = end - timedelta(days=days or 365)
+        index = array[0, :rows].view('<i8')
+        lo = int(np.searchsorted(index, BarStore._epoch_ns(start, self.meta['tz']), side='left'))
+        hi = int(np.searchsorted(index, BarStore._epoch_ns(end, self.meta['tz']), side='right'))
+        return pd.DataFrame(array[1:, lo:hi].T, index=self._index(ticker, generation, rows, index)[lo:hi],
+                            columns=COLUMNS, copy=False)
+
+    def wait_for_update(self, since: Optional[int] = None, timeout: Optional[float] = None,
+                        poll: float = 0.005) -> int:
+        """Block until the epoch moves past `since` (default: now); return the new epoch"""
+        since = self.epoch if since is None else since
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            epoch = self.epoch
+            if epoch != since or (deadline is not None and time.monotonic() >= deadline):
+                return epoch
+            time.sleep(poll)
+
+    def close(self):
+        with self._lock:
+            self._header = self._slots_view = None
+            self._slots.clear()
+            self._maps.clear()
+            self._indexes.clear()
+
+    def _attach(self) -> Optional[np.memmap]:
+        """Map the control file, re-attaching when the server that wrote it has closed"""
+        with self._lock:
+            if self._header is not None and not self._header[HEADER_FIELDS.index('closed')]:
+                return self._header
+            self.close()
+            control_path = os.path.join(self.root, CONTROL_FILE)
+            try:
+                with open(os.path.join(self.root, META_FILE)) as f:
+                    meta = json.load(f)
+                header = np.memmap(control_path, dtype='<i8', mode='r', shape=(len(HEADER_FIELDS),))
+            except (OSError, ValueError):
+                return None
+            if header[HEADER_FIELDS.index('version')] != FORMAT_VERSION or header[HEADER_FIELDS.index('closed')]:
+                return None
+            self.meta = meta
+            self._header = header
+            self._slots_view = np.memmap(control_path, dtype=SLOT_DTYPE, mode='r', offset=HEADER_BYTES,
+                                         shape=(int(header[HEADER_FIELDS.index('slots')]),))
+            return self._header
+
+    def _find_slots(self) -> Dict[str, int]:
+        with self._lock:
+            names = self._slots_view['name']
+            for slot in np.flatnonzero(names != b''):
+                self._slots.setdefault(names[slot].decode(), int(slot))
+            return dict(self._slots)
+
+    def _snapshot(self, ticker: str) -> Optional[Tuple[int, int, np.ndarray]]:
+        """Consistent (generation, rows, mapped array) of a ticker, or None if it is not published"""
+        while True:
+            if self._attach() is None:
+                return None
+            slot = self._slots.get(ticker)
+            if slot is None:
+                slot = self._find_slots().get(ticker)
+                if slot is None:
+                    return None
+
+            # Seqlock read: retry while the slot is being written or changed under us
+            slots = self._slots_view
+            seq = int(slots['seq'][slot])
+            generation, rows, capacity = int(slots['generation'][slot]), int(slots['rows'][slot]), int(slots['capacity'][slot])
+            if seq & 1 or int(slots['seq'][slot]) != seq:
+                time.sleep(0)
+                continue
+            if generation == 0:
+                # Named but not yet published, or its first publish failed
+                return None
+
+            try:
+                return generation, rows, self._map(ticker, generation, capacity)
+            except FileNotFoundError:
+                # Replaced by a newer generation between reading the slot and opening the file
+                continue
+
+    def _map(self, ticker: str, generation: int, capacity: int) -> np.ndarray:
+        with self._lock:
+            mapped = self._maps.get(ticker)
+            if mapped is None or mapped[0] != generation:
+                array = np.memmap(_bars_path(self.root, ticker, generation), dtype='<f8', mode='r',
+                                  shape=(len(COLUMNS) + 1, capacity))
+                # A plain ndarray view, which keeps the mapping open for as long as any frame uses it
+                mapped = self._maps[ticker] = (generation, np.asarray(array))
+            return mapped[1]
+
+    def _index(self, ticker: str, generation: int, rows: int, index: np.ndarray) -> pd.DatetimeIndex:
+        """DatetimeIndex of a ticker's rows, rebuilt only when they change"""
+        with self._lock:
+            cached = self._indexes.get(ticker)
+            if cached is None or cached[:2] != (generation, rows):
+                dates = pd.to_datetime(np.array(index), utc=True).tz_convert(self.meta['tz'])
+                cached = self._indexes[ticker] = (generation, rows, pd.DatetimeIndex(dates, name='Date'))
+            return cached[2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish market data to shared memory for agent workers")
+    parser.add_argument('tickers', nargs='+')
+    parser.add_argument('--root', default=None, help="Directory to publish to (default: $MARKET_DATA_SHM or /dev/shm)")
+    parser.add_argument('--timeframe', default=DEFAULT_TIMEFRAME)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--interval', type=float, default=60.0, help="Seconds between refreshes")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = MarketDataServer(args.tickers, root=args.root, timeframe=args.timeframe, days=args.days,
+                              interval=args.interval)
+    logger.info(f"Publishing {len(server.tickers)} tickers to {server.root}")
+    try:
+        server.start()
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
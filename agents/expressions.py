@@ -0,0 +1,715 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from functools import lru_cache
+import re
+import numpy as np
+import pandas as pd
+import talib
+from .panel import (
+    calculate_panel_indicators, panel_atr, panel_ema, panel_rolling_mean, panel_rsi, panel_sma
+)
+
+# Price and volume columns every source provides
+COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# Indicator series with their default parameters, as calculate_indicator_series computes them
+INDICATOR_SERIES = ['rsi', 'macd', 'macd_signal', 'macd_hist', 'bb_upper', 'bb_middle', 'bb_lower',
+                    'obv', 'sma_20', 'sma_50', 'ema_20', 'atr', 'avg_volume']
+
+# Other spellings of series names
+ALIASES = {
+    'price': 'close',
+    'signal': 'macd_signal',
+    'signal_line': 'macd_signal',
+    'macd_line': 'macd',
+    'macd_histogram': 'macd_hist',
+    'histogram': 'macd_hist',
+    'upper_band': 'bb_upper',
+    'middle_band': 'bb_middle',
+    'lower_band': 'bb_lower',
+    'volume_avg': 'avg_volume',
+    'avg_volume_10d': 'avg_volume',
+    'average_volume': 'avg_volume',
+}
+
+# Named conditions, usable as words ("MACD bullish cross") or identifiers (macd_bullish_cross)
+MACROS = {
+    'oversold': 'rsi < 30',
+    'overbought': 'rsi > 70',
+    'macd_bullish': 'macd > macd_signal',
+    'macd_bearish': 'macd < macd_signal',
+    'macd_bullish_cross': 'macd crosses_above macd_signal',
+    'macd_bearish_cross': 'macd crosses_below macd_signal',
+    'volume_spike': 'volume > 1.5 * avg_volume',
+    'low_volume': 'volume < 0.5 * avg_volume',
+}
+
+# Parameterized indicators: name(period), with the period that makes them a default series
+INDICATOR_FUNCTIONS = {'rsi': 14, 'sma': None, 'ema': None, 'atr': 14, 'avg_volume': 10}
+
+# Functions over a window of another series: name(series, bars)
+WINDOW_FUNCTIONS = {'highest', 'lowest', 'change'}
+
+COMPARISONS = {'<': '<', '<=': '<=', '>': '>', '>=': '>=', 'below': '<', 'above': '>'}
+FLIPPED = {'<': '>', '<=': '>=', '>': '<', '>=': '<='}
+
+_TOKEN_RE = re.compile(r'\s*(?:(?P<number>\d+(?:\.\d+)?)(?P<times>x\b)?|(?P<name>[A-Za-z_][A-Za-z0-9_]*)'
+                       r'|(?P<op><=|>=|[<>()\[\],*/+-]))')
+
+Node = Tuple[Any, ...]
+
+
+class ExpressionError(ValueError):
+    """Raised for strategy expressions that cannot be parsed or evaluated"""
+
+
+class _Parser:
+    """Recursive-descent parser from expression text to a normalized node tree.
+
+    Nodes are tuples, so equal sub-expressions are equal keys: ('series', 'rsi'),
+    ('const', 30.0), ('cmp', '<', a, b), ('cross', 'above', a, b), ('between', x, lo, hi),
+    ('and', children), ('or', children), ('not', x), ('within', x, bars), ('for', x, bars),
+    ('lag', x, bars), ('arith', op, a, b), ('call', name, args).
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = self._tokenize(text)
+        self.position = 0
+
+    def parse(self) -> Node:
+        node = self._or()
+        if self._peek() is not None:
+            raise ExpressionError(f"Unexpected '{self._peek()[1]}' in: {self.text}")
+        return node
+
+    def _tokenize(self, text: str) -> List[Tuple[str, Any]]:
+        tokens, position = [], 0
+        text = text.strip()
+        while position < len(text):
+            match = _TOKEN_RE.match(text, position)
+            if not match or match.end() == position:
+                raise ExpressionError(f"Cannot read '{text[position:]}' in: {text}")
+            position = match.end()
+            if match.group('number') is not None:
+                tokens.append(('number', float(match.group('number'))))
+                if match.group('times'):
+                    tokens.append(('op', '*'))
+            elif match.group('name') is not None:
+                tokens.append(('name', match.group('name').lower()))
+            else:
+                tokens.append(('op', match.group('op')))
+        return tokens
+
+    def _peek(self, offset: int = 0) -> Optional[Tuple[str, Any]]:
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def _next(self) -> Tuple[str, Any]:
+        token = self._peek()
+        if token is None:
+            raise ExpressionError(f"Unexpected end of: {self.text}")
+        self.position += 1
+        return token
+
+    def _accept(self, *values: str) -> Optional[str]:
+        token = self._peek()
+        if token is not None and token[0] in ('name', 'op') and token[1] in values:
+            self.position += 1
+            return token[1]
+        return None
+
+    def _expect(self, value: str):
+        if not self._accept(value):
+            found = self._peek()
+            raise ExpressionError(f"Expected '{value}' but found '{found[1] if found else 'end'}' in: {self.text}")
+
+    def _integer(self) -> int:
+        kind, value = self._next()
+        if kind != 'number' or value != int(value) or value < 1:
+            raise ExpressionError(f"Expected a whole number of bars in: {self.text}")
+        return int(value)
+
+    def _or(self) -> Node:
+        children = [self._and()]
+        while self._accept('or'):
+            children.append(self._and())
+        return _combine('or', children)
+
+    def _and(self) -> Node:
+        children = [self._not()]
+        while self._accept('and'):
+            children.append(self._not())
+        return _combine('and', children)
+
+    def _not(self) -> Node:
+        if self._accept('not'):
+            return ('not', self._not())
+        return self._window()
+
+    def _window(self) -> Node:
+        node = self._compare()
+        while True:
+            # "within 5 bars": at any of the last 5 bars; "for 3 bars": at each of the last 3
+            kind = self._accept('within', 'for')
+            if kind is None:
+                return node
+            bars = self._integer()
+            self._accept('bars', 'bar')
+            node = (kind, node, bars)
+
+    def _compare(self) -> Node:
+        left = self._additive()
+        op = self._accept(*COMPARISONS)
+        if op is not None:
+            return _comparison(COMPARISONS[op], left, self._additive())
+
+        direction = None
+        if self._accept('crosses_above'):
+            direction = 'above'
+        elif self._accept('crosses_below'):
+            direction = 'below'
+        elif self._accept('crosses'):
+            direction = self._accept('above', 'below', 'over', 'under')
+            if direction is None:
+                raise ExpressionError(f"Expected 'above' or 'below' after 'crosses' in: {self.text}")
+            direction = {'over': 'above', 'under': 'below'}.get(direction, direction)
+        if direction is not None:
+            return ('cross', direction, left, self._additive())
+
+        if self._accept('between'):
+            low = self._additive()
+            self._expect('and')
+            return ('between', left, low, self._additive())
+        return left
+
+    def _additive(self) -> Node:
+        node = self._term()
+        while True:
+            op = self._accept('+', '-')
+            if op is None:
+                return node
+            node = _arithmetic(op, node, self._term())
+
+    def _term(self) -> Node:
+        node = self._unary()
+        while True:
+            op = self._accept('*', '/')
+            if op is None:
+                return node
+            node = _arithmetic(op, node, self._unary())
+
+    def _unary(self) -> Node:
+        if self._accept('-'):
+            return _arithmetic('*', ('const', -1.0), self._unary())
+        return self._postfix()
+
+    def _postfix(self) -> Node:
+        node = self._primary()
+        # rsi[1]: the value one bar ago
+        while self._accept('['):
+            bars = self._integer()
+            self._expect(']')
+            node = ('lag', node, bars)
+        return node
+
+    def _primary(self) -> Node:
+        kind, value = self._next()
+        if kind == 'number':
+            return ('const', value)
+        if kind == 'op' and value == '(':
+            node = self._or()
+            self._expect(')')
+            return node
+        if kind != 'name':
+            raise ExpressionError(f"Unexpected '{value}' in: {self.text}")
+
+        if self._peek() == ('op', '('):
+            return self._call(value)
+        return self._name(value)
+
+    def _name(self, name: str) -> Node:
+        # Multi-word names such as "MACD bullish cross" or "bb upper"
+        for length in (3, 2):
+            words = [name] + [token[1] for token in self.tokens[self.position:self.position + length - 1]
+                              if token[0] == 'name']
+            joined = ALIASES.get('_'.join(words), '_'.join(words))
+            if len(words) == length and (joined in MACROS or joined in INDICATOR_SERIES):
+                self.position += length - 1
+                name = joined
+                break
+
+        name = ALIASES.get(name, name)
+        if name in MACROS:
+            return _Parser(MACROS[name]).parse()
+        if name in COLUMNS or name in INDICATOR_SERIES:
+            return ('series', name)
+        raise ExpressionError(f"Unknown name '{name}' in: {self.text}")
+
+    def _call(self, name: str) -> Node:
+        self._expect('(')
+        args = [self._or()]
+        while self._accept(','):
+            args.append(self._or())
+        self._expect(')')
+
+        if name in INDICATOR_FUNCTIONS:
+            if len(args) != 1 or args[0][0] != 'const' or args[0][1] != int(args[0][1]) or args[0][1] < 1:
+                raise ExpressionError(f"{name}() takes one whole-number period in: {self.text}")
+            period = int(args[0][1])
+            # Default periods share the precomputed series
+            if period == INDICATOR_FUNCTIONS[name]:
+                return ('series', name)
+            if f"{name}_{period}" in INDICATOR_SERIES:
+                return ('series', f"{name}_{period}")
+            return ('call', name, (period,))
+
+        if name in WINDOW_FUNCTIONS:
+            if len(args) != 2 or args[1][0] != 'const' or args[1][1] != int(args[1][1]) or args[1][1] < 1:
+                raise ExpressionError(f"{name}() takes a series and a whole number of bars in: {self.text}")
+            return ('window', name, args[0], int(args[1][1]))
+        raise ExpressionError(f"Unknown function '{name}' in: {self.text}")
+
+
+def _combine(kind: str, children: List[Node]) -> Node:
+    """AND/OR node with nested nodes of the same kind flattened and children in canonical order"""
+    flat = []
+    for child in children:
+        flat.extend(child[1] if child[0] == kind else [child])
+    unique = sorted(set(flat), key=repr)
+    return unique[0] if len(unique) == 1 else (kind, tuple(unique))
+
+
+def _comparison(op: str, left: Node, right: Node) -> Node:
+    # Constants go on the right, so "30 > rsi" and "rsi < 30" are one node
+    if left[0] == 'const' and right[0] != 'const':
+        return ('cmp', FLIPPED[op], right, left)
+    return ('cmp', op, left, right)
+
+
+def _arithmetic(op: str, left: Node, right: Node) -> Node:
+    if left[0] == 'const' and right[0] == 'const':
+        return ('const', float(_apply_arithmetic(op, left[1], right[1])))
+    # Commutative operands in canonical order
+    if op in '+*' and repr(right) < repr(left):
+        left, right = right, left
+    return ('arith', op, left, right)
+
+
+def _apply_arithmetic(op: str, left, right):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if op == '+':
+            return left + right
+        if op == '-':
+            return left - right
+        if op == '*':
+            return left * right
+        return left / right
+
+
+def _result_type(node: Node) -> str:
+    """'bool' or 'number', raising ExpressionError where the two are mixed"""
+    kind = node[0]
+    if kind in ('const', 'series', 'call'):
+        return 'number'
+    if kind == 'lag':
+        return _result_type(node[1])
+    if kind == 'window':
+        _require(node[2], 'number', node)
+        return 'number'
+    if kind == 'arith':
+        _require(node[2], 'number', node)
+        _require(node[3], 'number', node)
+        return 'number'
+    if kind in ('cmp', 'cross', 'between'):
+        for child in node[2:] if kind != 'between' else node[1:]:
+            _require(child, 'number', node)
+        return 'bool'
+    if kind in ('and', 'or'):
+        for child in node[1]:
+            _require(child, 'bool', node)
+        return 'bool'
+    if kind in ('not', 'within', 'for'):
+        _require(node[1], 'bool', node)
+        return 'bool'
+    raise ExpressionError(f"Unknown expression node: {kind}")
+
+
+def _require(node: Node, expected: str, parent: Node):
+    if _result_type(node) != expected:
+        raise ExpressionError(f"Expected a {'condition' if expected == 'bool' else 'value'} in {to_text(parent)}")
+
+
+def to_text(node: Node) -> str:
+    """Expression text for a node, in the canonical order the parser produces"""
+    kind = node[0]
+    if kind == 'const':
+        return f"{node[1]:g}"
+    if kind == 'series':
+        return node[1]
+    if kind == 'call':
+        return f"{node[1]}({', '.join(str(arg) for arg in node[2])})"
+    if kind == 'window':
+        return f"{node[1]}({to_text(node[2])}, {node[3]})"
+    if kind == 'lag':
+        return f"{to_text(node[1])}[{node[2]}]"
+    if kind == 'arith':
+        return f"({to_text(node[2])} {node[1]} {to_text(node[3])})"
+    if kind == 'cmp':
+        return f"{to_text(node[2])} {node[1]} {to_text(node[3])}"
+    if kind == 'cross':
+        return f"{to_text(node[2])} crosses_{node[1]} {to_text(node[3])}"
+    if kind == 'between':
+        return f"{to_text(node[1])} between {to_text(node[2])} and {to_text(node[3])}"
+    if kind in ('and', 'or'):
+        return '(' + f" {kind.upper()} ".join(to_text(child) for child in node[1]) + ')'
+    if kind == 'not':
+        return f"NOT {to_text(node[1])}"
+    return f"({to_text(node[1])}) {kind} {node[2]} bars"
+
+
+def _lookback(node: Node) -> int:
+    """Bars before the current one that a node reads"""
+    kind = node[0]
+    if kind in ('const', 'series', 'call'):
+        return 0
+    if kind == 'lag':
+        return node[2] + _lookback(node[1])
+    if kind in ('within', 'for'):
+        return node[2] - 1 + _lookback(node[1])
+    if kind == 'window':
+        return node[3] + _lookback(node[2])
+    if kind == 'cross':
+        return 1 + max(_lookback(node[2]), _lookback(node[3]))
+    children = node[1] if kind in ('and', 'or') else [child for child in node[1:] if isinstance(child, tuple)]
+    return max((_lookback(child) for child in children), default=0)
+
+
+class SeriesSource:
+    """Named input series for expressions, computed on first use.
+
+    Arrays are 1-D (bars) or 2-D (tickers x bars, as from panel.build_panel); time is
+    always the last axis. Indicator series can be passed in when they were already
+    computed, e.g. backtest.calculate_indicator_series output or a monitor's window.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], series: Optional[Dict[str, Any]] = None):
+        self.columns = {name.lower(): np.asarray(values, dtype=float) for name, values in columns.items()}
+        self.shape = self.columns['close'].shape
+        self._series: Dict[Any, np.ndarray] = {}
+        if series is not None:
+            self._series.update(flatten_indicators(series) if 'RSI' in series else series)
+
+    @classmethod
+    def from_frame(cls, df, series: Optional[Dict[str, Any]] = None) -> "SeriesSource":
+        return cls({column: df[column].values for column in df.columns if column.lower() in COLUMNS}, series)
+
+    @classmethod
+    def from_panel(cls, panel: Dict[str, Any], series: Optional[Dict[str, Any]] = None) -> "SeriesSource":
+        return cls({column: panel[column] for column in ('Open', 'High', 'Low', 'Close', 'Volume') if column in panel},
+                   series)
+
+    def get(self, name: str) -> np.ndarray:
+        if name in self.columns:
+            return self.columns[name]
+        if name not in self._series:
+            if name not in INDICATOR_SERIES:
+                raise ExpressionError(f"No series named '{name}'")
+            if name == 'avg_volume':
+                self._series[name] = self.call('avg_volume', 10)
+            else:
+                self._series.update(self._default_indicators())
+        return self._series[name]
+
+    def call(self, name: str, period: int) -> np.ndarray:
+        key = (name, period)
+        if key not in self._series:
+            self._series[key] = self._indicator(name, period)
+        return self._series[key]
+
+    def _column(self, name: str) -> np.ndarray:
+        if name not in self.columns:
+            raise ExpressionError(f"No '{name}' column to evaluate against")
+        return self.columns[name]
+
+    def _default_indicators(self) -> Dict[str, np.ndarray]:
+        close, high, low, volume = (self._column(name) for name in ('close', 'high', 'low', 'volume'))
+        if close.ndim == 1:
+            # Imported here because backtest builds on this module
+            from .backtest import calculate_indicator_series
+            series = calculate_indicator_series(pd.DataFrame({'Close': close, 'High': high, 'Low': low, 'Volume': volume}))
+        else:
+            series = calculate_panel_indicators(close, high, low, volume)
+        return flatten_indicators(series)
+
+    def _indicator(self, name: str, period: int) -> np.ndarray:
+        close = self._column('close')
+        if name == 'avg_volume':
+            return panel_rolling_mean(np.atleast_2d(self._column('volume')), period).reshape(self.shape)
+        if close.ndim == 1:
+            if name == 'atr':
+                return talib.ATR(self._column('high'), self._column('low'), close, timeperiod=period)
+            return {'rsi': talib.RSI, 'sma': talib.SMA, 'ema': talib.EMA}[name](close, timeperiod=period)
+        if name == 'atr':
+            return panel_atr(self._column('high'), self._column('low'), close, period)
+        return {'rsi': panel_rsi, 'sma': panel_sma, 'ema': panel_ema}[name](close, period)
+
+
+def flatten_indicators(values: Dict[str, Any]) -> Dict[str, Any]:
+    """Indicator output keyed like calculate_indicator_series, as flat expression series names"""
+    flat = {
+        'rsi': values['RSI'],
+        'macd': values['MACD']['macd'],
+        'macd_signal': values['MACD']['signal'],
+        'macd_hist': values['MACD']['histogram'],
+        'bb_upper': values['BB']['upper'],
+        'bb_middle': values['BB']['middle'],
+        'bb_lower': values['BB']['lower'],
+        'obv': values['OBV'],
+        'sma_20': values['SMA_20'],
+        'sma_50': values['SMA_50'],
+        'ema_20': values['EMA_20'],
+        'atr': values['ATR'],
+    }
+    if 'avg_volume' in values:
+        flat['avg_volume'] = values['avg_volume']
+    return flat
+
+
+def _shift(values, bars: int):
+    """Values `bars` bars earlier along the time axis; NaN before the first bar"""
+    if np.ndim(values) == 0:
+        return values
+    values = np.asarray(values, dtype=float)
+    shifted = np.full(values.shape, np.nan)
+    if bars < values.shape[-1]:
+        shifted[..., bars:] = values[..., :-bars]
+    return shifted
+
+
+def _window_count(mask: np.ndarray, bars: int) -> np.ndarray:
+    """How many of the last `bars` bars (including the current one) are set"""
+    counts = np.cumsum(mask, axis=-1, dtype=np.int64)
+    if bars < mask.shape[-1]:
+        counts[..., bars:] -= counts[..., :-bars].copy()
+    return counts
+
+
+class Evaluator:
+    """Evaluates nodes against one SeriesSource, computing each distinct sub-expression once"""
+
+    def __init__(self, source: SeriesSource):
+        self.source = source
+        self.cache: Dict[Node, Any] = {}
+
+    def evaluate(self, node: Node):
+        value = self.cache.get(node)
+        if value is None:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                value = self.cache[node] = self._compute(node)
+        return value
+
+    def mask(self, node: Node) -> np.ndarray:
+        """Boolean array with the source's shape"""
+        return np.broadcast_to(self.evaluate(node), self.source.shape)
+
+    def _compute(self, node: Node):
+        kind = node[0]
+        if kind == 'const':
+            return node[1]
+        if kind == 'series':
+            return self.source.get(node[1])
+        if kind == 'call':
+            return self.source.call(node[1], node[2][0])
+        if kind == 'lag':
+            return _shift(self.evaluate(node[1]), node[2])
+        if kind == 'arith':
+            return _apply_arithmetic(node[1], self.evaluate(node[2]), self.evaluate(node[3]))
+        if kind == 'cmp':
+            return self._compare(node[1], self.evaluate(node[2]), self.evaluate(node[3]))
+        if kind == 'cross':
+            op = '>' if node[1] == 'above' else '<'
+            left, right = self.evaluate(node[2]), self.evaluate(node[3])
+            before = self._compare('<=' if op == '>' else '>=', _shift(left, 1), _shift(right, 1))
+            return self._compare(op, left, right) & before
+        if kind == 'between':
+            value = self.evaluate(node[1])
+            return (value >= self.evaluate(node[2])) & (value <= self.evaluate(node[3]))
+        if kind == 'and':
+            return np.logical_and.reduce([self.mask(child) for child in node[1]])
+        if kind == 'or':
+            return np.logical_or.reduce([self.mask(child) for child in node[1]])
+        if kind == 'not':
+            return ~self.mask(node[1])
+        if kind in ('within', 'for'):
+            counts = _window_count(self.mask(node[1]), node[2])
+            return counts > 0 if kind == 'within' else counts == node[2]
+        if kind == 'window':
+            return self._window(node[1], np.broadcast_to(self.evaluate(node[2]), self.source.shape), node[3])
+        raise ExpressionError(f"Unknown expression node: {kind}")
+
+    @staticmethod
+    def _compare(op: str, left, right):
+        if op == '<':
+            return left < right
+        if op == '<=':
+            return left <= right
+        if op == '>':
+            return left > right
+        return left >= right
+
+    @staticmethod
+    def _window(name: str, values: np.ndarray, bars: int) -> np.ndarray:
+        if name == 'change':
+            return values / _shift(values, bars) - 1
+        # Highest or lowest of the previous `bars` bars, so "close > highest(close, 20)" is a breakout
+        out = np.full(values.shape, np.nan)
+        if values.shape[-1] > bars:
+            windows = np.lib.stride_tricks.sliding_window_view(values, bars, axis=-1)[..., :-1, :]
+            out[..., bars:] = windows.max(axis=-1) if name == 'highest' else windows.min(axis=-1)
+        return out
+
+
+class Expression:
+    """A compiled strategy condition"""
+
+    def __init__(self, node: Node):
+        _require(node, 'bool', node)
+        self.node = node
+        self.lookback = _lookback(node)
+
+    def evaluate(self, source: Union[SeriesSource, Evaluator]) -> np.ndarray:
+        """Bars (or tickers x bars) where the condition holds"""
+        evaluator = source if isinstance(source, Evaluator) else Evaluator(source)
+        return evaluator.mask(self.node)
+
+    def __str__(self) -> str:
+        return to_text(self.node)
+
+    def __repr__(self) -> str:
+        return f"Expression({to_text(self.node)!r})"
+
+
+@lru_cache(maxsize=4096)
+def compile_expression(text: str) -> Expression:
+    """Parse expression text such as "RSI < 30 AND MACD bullish cross" into a reusable Expression"""
+    return Expression(_Parser(text).parse())
+
+
+def _number(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _volume_multiple(threshold) -> Optional[float]:
+    """1.5 for '1.5x_average', '1.5x', '150%' or 1.5"""
+    if isinstance(threshold, str):
+        text = threshold.strip().lower()
+        match = re.match(r'^(\d+(?:\.\d+)?)\s*(x|times)?', text)
+        if match is None:
+            return None
+        value = float(match.group(1))
+        return value / 100 if text.endswith('%') else value
+    return _number(threshold)
+
+
+def condition_text(indicator: str, condition: str, threshold) -> str:
+    """Expression text for one indicator/condition/threshold entry of a strategy"""
+    indicator = str(indicator).strip()
+    condition = str(condition).strip().lower()
+    if condition in ('crosses_above', 'crosses_below'):
+        op = condition
+    elif condition in ('above', 'below'):
+        op = '>' if condition == 'above' else '<'
+    else:
+        raise ExpressionError(f"Unknown condition '{condition}'")
+
+    key = indicator.upper()
+    if key == 'MACD':
+        # MACD is compared with its signal line unless a level is given
+        level = _number(threshold)
+        return f"macd {op} {'macd_signal' if level is None else f'{level:g}'}"
+
+    if key == 'BB':
+        # A band name, or %B: 0 is the lower band and 1 the upper band
+        if isinstance(threshold, str) and threshold.strip().lower() in ('upper', 'middle', 'lower'):
+            return f"close {op} bb_{threshold.strip().lower()}"
+        level = _number(threshold)
+        if level is None:
+            band = 'upper' if condition.endswith('above') else 'lower'
+            return f"close {op} bb_{band}"
+        return f"(close - bb_lower) / (bb_upper - bb_lower) {op} {level:g}"
+
+    if key == 'VOLUME':
+        multiple = _volume_multiple(threshold)
+        if multiple is None:
+            raise ExpressionError(f"Unknown volume threshold '{threshold}'")
+        # Small numbers are multiples of average volume, large ones a share count
+        if isinstance(threshold, str) or multiple < 100:
+            return f"volume {op} {multiple:g} * avg_volume"
+        return f"volume {op} {multiple:g}"
+
+    level = _number(threshold)
+    if level is None:
+        raise ExpressionError(f"Threshold for {indicator} must be a number, got '{threshold}'")
+    return f"{indicator.lower()} {op} {level:g}"
+
+
+def strategy_conditions(strategy: Dict[str, Any]) -> List[Tuple[Any, Any, Any]]:
+    """(indicator, condition, threshold) of each condition in a strategy's list fields, or its single fields"""
+    indicators = strategy.get('indicators') or [strategy.get('indicator')]
+    conditions = strategy.get('conditions') or [strategy.get('condition')]
+    thresholds = strategy.get('thresholds') or [strategy.get('threshold')]
+    if len(conditions) == 1:
+        conditions = conditions * len(indicators)
+    if len(thresholds) == 1:
+        thresholds = thresholds * len(indicators)
+    if not (len(indicators) == len(conditions) == len(thresholds)):
+        raise ExpressionError("Strategy needs one condition and threshold per indicator")
+    return list(zip(indicators, conditions, thresholds))
+
+
+def strategy_text(strategy: Dict[str, Any]) -> str:
+    """Expression text for a strategy: its 'expression' field, or its conditions joined by its 'logic'"""
+    if strategy.get('expression'):
+        return str(strategy['expression'])
+
+    logic = str(strategy.get('logic', 'and')).strip().upper()
+    if logic not in ('AND', 'OR'):
+        raise ExpressionError(f"Unknown logic '{strategy.get('logic')}'; use 'and' or 'or'")
+    terms = [condition_text(*entry) for entry in strategy_conditions(strategy)]
+    return f" {logic} ".join(f"({term})" for term in terms) if len(terms) > 1 else terms[0]
+
+
+def compile_strategy(strategy: Dict[str, Any]) -> Expression:
+    return compile_expression(strategy_text(strategy))
+
+
+class StrategySet:
+    """Many strategies compiled once and evaluated together.
+
+    Sub-expressions shared between strategies (the same RSI comparison, the same MACD
+    cross) are computed once per input. On a panel every node is evaluated for all
+    tickers at once and each strategy reads the row of its own ticker.
+    """
+
+    def __init__(self, strategies: Dict[str, Dict[str, Any]]):
+        self.strategies = strategies
+        self.expressions = {strategy_id: compile_strategy(strategy) for strategy_id, strategy in strategies.items()}
+        self.lookback = max((expression.lookback for expression in self.expressions.values()), default=0)
+
+    def evaluate(self, source: SeriesSource, strategy_ids: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+        """Masks of the given (default: all) strategies over one source"""
+        evaluator = Evaluator(source)
+        ids = self.expressions if strategy_ids is None else strategy_ids
+        return {strategy_id: self.expressions[strategy_id].evaluate(evaluator) for strategy_id in ids}
+
+    def evaluate_panel(self, panel: Dict[str, Any], source: Optional[SeriesSource] = None) -> Dict[str, np.ndarray]:
+        """Per-strategy masks over a panel, each taken from its ticker's row"""
+        evaluator = Evaluator(source or SeriesSource.from_panel(panel))
+        rows = {ticker: row for row, ticker in enumerate(panel['tickers'])}
+        return {
+            strategy_id: expression.evaluate(evaluator)[rows[self.strategies[strategy_id]['ticker'].upper()]]
+            for strategy_id, expression in self.expressions.items()
+        }
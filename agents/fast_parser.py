@@ -0,0 +1,201 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import re
+from .timeframes import DEFAULT_TIMEFRAME, normalize_timeframe
+
+# Company names and aliases users type instead of tickers
+COMPANY_TICKERS = {
+    'nvidia': 'NVDA',
+    'amd': 'AMD',
+    'advanced micro devices': 'AMD',
+    'tesla': 'TSLA',
+    'apple': 'AAPL',
+    'microsoft': 'MSFT',
+    'amazon': 'AMZN',
+    'google': 'GOOGL',
+    'alphabet': 'GOOGL',
+    'meta': 'META',
+    'facebook': 'META',
+    'netflix': 'NFLX',
+    'intel': 'INTC',
+    'broadcom': 'AVGO',
+    'taiwan semiconductor': 'TSM',
+    'tsmc': 'TSM',
+    'qualcomm': 'QCOM',
+    'micron': 'MU',
+    's&p 500': 'SPY',
+    's&p500': 'SPY',
+    'sp500': 'SPY',
+    'nasdaq 100': 'QQQ',
+    'nasdaq': 'QQQ',
+    'semiconductor etf': 'SMH',
+    'semiconductors': 'SMH',
+}
+
+# Indicator names as the validator expects them, with the phrases that name them
+INDICATOR_PATTERNS = {
+    'RSI': r'\brsi\b|relative strength',
+    'MACD': r'\bmacd\b',
+    'BB': r'\bbb\b|bollinger',
+    'Volume': r'\bvolume\b',
+}
+
+# Comparison phrases, checked in order so "crosses above" wins over "above"
+CONDITION_PATTERNS = [
+    ('crosses_above', r'cross(?:es|ing)?\s+(?:above|over)|bullish\s+cross(?:over)?'),
+    ('crosses_below', r'cross(?:es|ing)?\s+(?:below|under)|bearish\s+cross(?:over)?'),
+    ('below', r'\b(?:below|under|less than|drops? (?:to|below)|falls? (?:to|below)|oversold)\b|<'),
+    ('above', r'\b(?:above|over|greater than|more than|exceeds?|rises? (?:to|above)|overbought|spikes?)\b|>'),
+]
+
+# Thresholds implied by wording alone
+IMPLIED_THRESHOLDS = {
+    ('RSI', 'below'): 30,
+    ('RSI', 'above'): 70,
+}
+
+# Requests combining several conditions are left to the LLM
+COMPOUND_PATTERN = r'\b(?:and|or|then|unless|while|with|but|after|before)\b'
+
+# Negated conditions ("is not below 30") are left to the LLM
+NEGATION_PATTERN = r"\b(?:not|never|no longer|neither|nor)\b|n't\b"
+
+TICKER_PATTERN = r'\$?\b[A-Z]{1,5}\b'
+
+# Bar sizes: "5m", "15 minute", "1-hour bars", "hourly", "daily"
+TIMEFRAME_PATTERN = (r'\b(\d+\s*-?\s*(?:m|mins?|minutes?|h|hrs?|hours?))\b(?:\s+(?:bars?|candles?|charts?))?'
+                     r'|\b(hourly|daily)\b')
+
+
+def normalize_strategy(strategy: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill the single-condition fields from the list fields of the extraction format, and vice versa"""
+    strategy = dict(strategy)
+    for single, plural in (('indicator', 'indicators'), ('condition', 'conditions'), ('threshold', 'thresholds')):
+        if single not in strategy and strategy.get(plural):
+            strategy[single] = strategy[plural][0]
+        if plural not in strategy and single in strategy:
+            strategy[plural] = [strategy[single]]
+    if isinstance(strategy.get('ticker'), str):
+        strategy['ticker'] = strategy['ticker'].upper()
+    return strategy
+
+
+class FastStrategyParser:
+    """Rule-based extraction for simple one-condition requests like "RSI below 30 on NVDA".
+
+    parse() returns None whenever the request is not unambiguous, so the caller can
+    fall back to the LLM.
+    """
+
+    def __init__(self, known_tickers: Optional[Iterable[str]] = None, company_tickers: Optional[Dict[str, str]] = None):
+        self.company_tickers = dict(COMPANY_TICKERS)
+        self.company_tickers.update({name.lower(): ticker.upper() for name, ticker in (company_tickers or {}).items()})
+        self.known_tickers = set(self.company_tickers.values())
+        self.known_tickers.update(ticker.upper() for ticker in (known_tickers or []))
+
+        # Longest names first so "advanced micro devices" is matched before "amd"
+        names = sorted(self.company_tickers, key=len, reverse=True)
+        self._company_re = re.compile(r'(?<![\w&])(' + '|'.join(re.escape(name) for name in names) + r')(?![\w&])')
+        self._indicator_res = {name: re.compile(pattern) for name, pattern in INDICATOR_PATTERNS.items()}
+        self._condition_res = [(name, re.compile(pattern)) for name, pattern in CONDITION_PATTERNS]
+        self._compound_re = re.compile(COMPOUND_PATTERN)
+        self._negation_re = re.compile(NEGATION_PATTERN)
+        self._ticker_re = re.compile(TICKER_PATTERN)
+        self._timeframe_re = re.compile(TIMEFRAME_PATTERN)
+        self._indicator_words = {'RSI', 'MACD', 'BB', 'ATR', 'OBV', 'SMA', 'EMA', 'ETF'}
+
+    def add_ticker(self, ticker: str, *names: str):
+        """Register a tradable ticker and any company names that refer to it"""
+        ticker = ticker.upper()
+        self.known_tickers.add(ticker)
+        for name in names:
+            self.company_tickers[name.lower()] = ticker
+        names = sorted(self.company_tickers, key=len, reverse=True)
+        self._company_re = re.compile(r'(?<![\w&])(' + '|'.join(re.escape(name) for name in names) + r')(?![\w&])')
+
+    def find_tickers(self, user_input: str) -> List[str]:
+        """Tickers mentioned by symbol ($NVDA, NVDA) or by company name"""
+        found = []
+        for match in self._ticker_re.finditer(user_input):
+            symbol = match.group().lstrip('$')
+            if symbol in self._indicator_words:
+                continue
+            if match.group().startswith('$') or symbol in self.known_tickers:
+                found.append(symbol)
+        for match in self._company_re.finditer(user_input.lower()):
+            found.append(self.company_tickers[match.group(1)])
+        return list(dict.fromkeys(found))
+
+    def parse(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """Strategy dict for a simple request, or None when the LLM should handle it"""
+        text = user_input.lower()
+        if self._compound_re.search(text) or self._negation_re.search(text):
+            return None
+        timeframe, text = self._timeframe(text)
+        if timeframe is None:
+            return None
+
+        tickers = self.find_tickers(user_input)
+        indicators = [name for name, pattern in self._indicator_res.items() if pattern.search(text)]
+        conditions = self._conditions(text)
+        if len(tickers) != 1 or len(indicators) != 1 or len(conditions) != 1:
+            return None
+
+        indicator, condition = indicators[0], conditions[0]
+        threshold = self._threshold(text, indicator, condition)
+        if threshold is None:
+            return None
+
+        return normalize_strategy({
+            'ticker': tickers[0],
+            'indicator': indicator,
+            'condition': condition,
+            'threshold': threshold,
+            'timeframe': timeframe
+        })
+
+    def _conditions(self, text: str) -> List[str]:
+        """Distinct comparisons in the text; a phrase inside a longer one ("above" in "crosses above") is not counted"""
+        matches = [(match.start(), match.end(), name)
+                   for name, pattern in self._condition_res for match in pattern.finditer(text)]
+        outer = [(start, end, name) for start, end, name in matches
+                 if not any(s <= start and end <= e and (s, e) != (start, end) for s, e, _ in matches)]
+        # The same span matched by two patterns is ambiguous too
+        return list(dict.fromkeys(name for _, _, name in outer))
+
+    def _timeframe(self, text: str) -> Tuple[Optional[str], str]:
+        """Bar size named in the text (daily by default) and the text without it"""
+        matches = list(self._timeframe_re.finditer(text))
+        if not matches:
+            return DEFAULT_TIMEFRAME, text
+        if len(matches) > 1:
+            return None, text
+        match = matches[0]
+        try:
+            timeframe = normalize_timeframe(match.group(1) or match.group(2))
+        except ValueError:
+            return None, text
+        # Its digits are not a threshold
+        return timeframe, text[:match.start()] + ' ' + text[match.end():]
+
+    def _threshold(self, text: str, indicator: str, condition: str):
+        if indicator == 'Volume':
+            # "1.5x average", "1.5 times average", "50% above average" or "20% below average"
+            multiple = re.search(r'(\d+(?:\.\d+)?)\s*(?:x|times)\b', text)
+            if multiple:
+                return f"{float(multiple.group(1)):g}x_average"
+            percent = re.search(r'(\d+(?:\.\d+)?)\s*%', text)
+            if percent:
+                sign = -1 if condition == 'below' else 1
+                return f"{1 + sign * float(percent.group(1)) / 100:g}x_average"
+            return None
+
+        if condition.startswith('crosses') and indicator == 'MACD':
+            # A MACD crossover is against its signal line
+            return 'signal'
+
+        numbers = re.findall(r'(?<![\w.])(\d+(?:\.\d+)?)(?![\w.%])', text)
+        if len(numbers) == 1:
+            return float(numbers[0]) if '.' in numbers[0] else int(numbers[0])
+        if not numbers:
+            return IMPLIED_THRESHOLDS.get((indicator, condition))
+        return None
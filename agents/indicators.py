@@ -0,0 +1,228 @@
+from typing import Any, Dict, Optional
+from collections import deque
+import math
+
+NAN = float('nan')
+
+
+class StreamingSMA:
+    """Simple moving average over a ring buffer with a running sum"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        if len(self.window) == self.period:
+            self.total -= self.window[0]
+        self.window.append(x)
+        self.total += x
+        if len(self.window) == self.period:
+            self.value = self.total / self.period
+        return self.value
+
+
+class StreamingEMA:
+    """Exponential moving average seeded with the SMA of the first `period` values, as TA-Lib does"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self.count = 0
+        self.seed_total = 0.0
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        self.count += 1
+        if self.count < self.period:
+            self.seed_total += x
+        elif self.count == self.period:
+            self.value = (self.seed_total + x) / self.period
+        else:
+            self.value += (x - self.value) * self.k
+        return self.value
+
+    @property
+    def ready(self) -> bool:
+        return self.count >= self.period
+
+
+class StreamingRSI:
+    """Wilder RSI: averages seeded with the mean of the first `period` changes"""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev_close = None
+        self.count = 0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.value = NAN
+
+    def update(self, close: float) -> float:
+        if self.prev_close is None:
+            self.prev_close = close
+            return self.value
+
+        change = close - self.prev_close
+        self.prev_close = close
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+        self.count += 1
+
+        if self.count <= self.period:
+            self.avg_gain += gain / self.period
+            self.avg_loss += loss / self.period
+            if self.count < self.period:
+                return self.value
+        else:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+
+        total = self.avg_gain + self.avg_loss
+        self.value = 100.0 * self.avg_gain / total if total != 0 else 0.0
+        return self.value
+
+
+class StreamingMACD:
+    """MACD line, signal and histogram.
+
+    Like TA-Lib, the fast EMA starts `slow - fast` bars late so both EMAs are seeded
+    on the same bar, and nothing is reported until the signal line is seeded.
+    """
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast_offset = slow - fast
+        self.fast = StreamingEMA(fast)
+        self.slow = StreamingEMA(slow)
+        self.signal = StreamingEMA(signal)
+        self.count = 0
+        self.value = {'macd': NAN, 'signal': NAN, 'histogram': NAN}
+
+    def update(self, close: float) -> Dict[str, float]:
+        self.count += 1
+        slow = self.slow.update(close)
+        if self.count > self.fast_offset:
+            fast = self.fast.update(close)
+            if self.slow.ready:
+                macd = fast - slow
+                signal = self.signal.update(macd)
+                if self.signal.ready:
+                    self.value = {'macd': macd, 'signal': signal, 'histogram': macd - signal}
+        return self.value
+
+
+class StreamingBBands:
+    """Bollinger Bands from a rolling sum and sum of squares (population deviation, TA-Lib defaults)"""
+
+    def __init__(self, period: int = 20, nbdev: float = 2.0):
+        self.period = period
+        self.nbdev = nbdev
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.value = {'upper': NAN, 'middle': NAN, 'lower': NAN}
+
+    def update(self, close: float) -> Dict[str, float]:
+        if len(self.window) == self.period:
+            oldest = self.window[0]
+            self.total -= oldest
+            self.total_sq -= oldest * oldest
+        self.window.append(close)
+        self.total += close
+        self.total_sq += close * close
+
+        if len(self.window) == self.period:
+            middle = self.total / self.period
+            deviation = math.sqrt(max(self.total_sq / self.period - middle * middle, 0.0))
+            self.value = {
+                'upper': middle + self.nbdev * deviation,
+                'middle': middle,
+                'lower': middle - self.nbdev * deviation
+            }
+        return self.value
+
+
+class StreamingOBV:
+    """On-balance volume, starting from the first bar's volume like TA-Lib"""
+
+    def __init__(self):
+        self.prev_close = None
+        self.value = NAN
+
+    def update(self, close: float, volume: float) -> float:
+        if self.prev_close is None:
+            self.value = volume
+        elif close > self.prev_close:
+            self.value += volume
+        elif close < self.prev_close:
+            self.value -= volume
+        self.prev_close = close
+        return self.value
+
+
+class StreamingATR:
+    """Wilder average true range seeded with the mean of the first `period` true ranges"""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev_close = None
+        self.count = 0
+        self.seed_total = 0.0
+        self.value = NAN
+
+    def update(self, high: float, low: float, close: float) -> float:
+        if self.prev_close is None:
+            self.prev_close = close
+            return self.value
+
+        true_range = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        self.count += 1
+
+        if self.count < self.period:
+            self.seed_total += true_range
+        elif self.count == self.period:
+            self.value = (self.seed_total + true_range) / self.period
+        else:
+            self.value = (self.value * (self.period - 1) + true_range) / self.period
+        return self.value
+
+
+class StreamingIndicatorSet:
+    """Every indicator from TradingAgent._calculate_technical_indicators, updated one bar at a time"""
+
+    def __init__(self):
+        self.rsi = StreamingRSI(14)
+        self.macd = StreamingMACD()
+        self.bbands = StreamingBBands()
+        self.obv = StreamingOBV()
+        self.sma_20 = StreamingSMA(20)
+        self.sma_50 = StreamingSMA(50)
+        self.ema_20 = StreamingEMA(20)
+        self.atr = StreamingATR(14)
+        self.bars = 0
+        self.values: Optional[Dict[str, Any]] = None
+
+    def update(self, bar: Dict[str, float]) -> Dict[str, Any]:
+        """Consume one OHLCV bar and return the current indicator values"""
+        close = float(bar['Close'])
+        self.bars += 1
+        self.values = {
+            'RSI': self.rsi.update(close),
+            'MACD': dict(self.macd.update(close)),
+            'BB': dict(self.bbands.update(close)),
+            'OBV': self.obv.update(close, float(bar['Volume'])),
+            'SMA_20': self.sma_20.update(close),
+            'SMA_50': self.sma_50.update(close),
+            'EMA_20': self.ema_20.update(close),
+            'ATR': self.atr.update(float(bar['High']), float(bar['Low']), close)
+        }
+        return self.values
+
+    def update_frame(self, df) -> Optional[Dict[str, Any]]:
+        """Replay every row of an OHLCV frame, e.g. to warm up from history"""
+        for bar in df[['High', 'Low', 'Close', 'Volume']].to_dict('records'):
+            self.update(bar)
+        return self.values
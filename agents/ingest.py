@@ -0,0 +1,78 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+import logging
+import random
+import time
+import pandas as pd
+from .market_data import MarketDataStore
+
+logger = logging.getLogger(__name__)
+
+
+def load_universe(path: str) -> List[str]:
+    """Read ticker symbols from a file: one per line or comma separated, '#' starts a comment"""
+    tickers = []
+    with open(path) as f:
+        for line in f:
+            line = line.split('#', 1)[0]
+            for symbol in line.replace(',', ' ').split():
+                symbol = symbol.strip().upper()
+                if symbol and symbol not in tickers:
+                    tickers.append(symbol)
+    return tickers
+
+
+class BulkDownloader:
+    """Fetch many tickers through a MarketDataStore with a bounded worker pool and retries"""
+
+    def __init__(self, store: MarketDataStore, workers: int = 8, retries: int = 3, backoff: float = 1.0,
+                 sleep: Callable[[float], None] = time.sleep, timeframe: str = '1d'):
+        self.store = store
+        self.timeframe = timeframe
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self._sleep = sleep
+
+    def run(self, tickers: Iterable[str], start: datetime, end: datetime,
+            on_result: Optional[Callable[[str, pd.DataFrame], None]] = None) -> Dict[str, Any]:
+        """Download every ticker; failures are collected in the report instead of raised"""
+        tickers = list(dict.fromkeys(ticker.upper() for ticker in tickers))
+        report = {'succeeded': {}, 'failed': {}, 'elapsed': 0.0}
+        started = time.monotonic()
+
+        with self.store.batch_metadata(), ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self._download, ticker, start, end): ticker for ticker in tickers}
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    df = future.result()
+                except Exception as e:
+                    report['failed'][ticker] = str(e)
+                    logger.warning(f"Giving up on {ticker}: {str(e)}")
+                    continue
+
+                report['succeeded'][ticker] = len(df)
+                if on_result is not None:
+                    on_result(ticker, df)
+
+        report['elapsed'] = time.monotonic() - started
+        logger.info(f"Downloaded {len(report['succeeded'])}/{len(tickers)} tickers "
+                    f"in {report['elapsed']:.1f}s ({len(report['failed'])} failed)")
+        return report
+
+    def _download(self, ticker: str, start: datetime, end: datetime) -> pd.DataFrame:
+        """Fetch one ticker, retrying with exponential backoff and jitter"""
+        for attempt in range(self.retries + 1):
+            try:
+                df = self.store.get_history(ticker, start=start, end=end, timeframe=self.timeframe)
+                if df.empty:
+                    raise ValueError(f"No data returned for {ticker}")
+                return df
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * (2 ** attempt) * (1 + random.random())
+                logger.info(f"Retrying {ticker} in {delay:.1f}s after error: {str(e)}")
+                self._sleep(delay)
@@ -0,0 +1,171 @@
+from typing import Any, Callable, Dict, Optional
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from .market_data import DATA_DIR
+from .metrics import incr
+
+logger = logging.getLogger(__name__)
+
+# Words that do not change what strategy a request describes
+FILLER_WORDS = {'please', 'kindly', 'just', 'can', 'could', 'would', 'you', 'me', 'i', 'the', 'a', 'an'}
+
+# Comparison operators are meaningful, so they become words before punctuation is dropped
+OPERATOR_WORDS = {'<=': 'at most', '>=': 'at least', '!=': 'not equal to', '==': 'equal to',
+                  '<': 'below', '>': 'above', '=': 'equal to'}
+OPERATOR_PATTERN = re.compile('|'.join(re.escape(op) for op in OPERATOR_WORDS))
+
+
+def normalize_input(user_input: str) -> str:
+    """Canonical form of a request: lowercase, operators as words, no punctuation or filler words, single spaces"""
+    text = OPERATOR_PATTERN.sub(lambda m: f" {OPERATOR_WORDS[m.group()]} ", user_input.lower())
+    text = re.sub(r"[^\w\s.%-]", ' ', text)
+    text = re.sub(r'(?<!\d)\.|\.(?!\d)', ' ', text)
+    return ' '.join(word for word in text.split() if word not in FILLER_WORDS)
+
+
+class _InFlight:
+    """A computation other threads asking for the same key wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class LLMResponseCache:
+    """Persistent cache of LLM results with a TTL, LRU eviction and request coalescing.
+
+    Entries live in SQLite so they survive restarts and can be shared by several
+    processes on one machine. Concurrent requests for the same key share one computation.
+    """
+
+    def __init__(self, path: str = os.path.join(DATA_DIR, 'llm_cache.sqlite3'),
+                 ttl: float = 7 * 24 * 3600, max_entries: int = 10000,
+                 clock: Callable[[], float] = time.time):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0}
+
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, _InFlight] = {}
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._db.commit()
+
+    @staticmethod
+    def make_key(user_input: str, prompt_version: str, model: str = '', context: str = '') -> str:
+        """Key of a request; conversation context, when there is any, is part of it"""
+        parts = [normalize_input(user_input), str(prompt_version), model]
+        raw = '\x1f'.join(parts + [context] if context else parts)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value for a key, or None if missing or expired"""
+        now = self.clock()
+        with self._lock:
+            row = self._db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any):
+        now = self.clock()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now)
+            )
+            # Least recently used entries go first once the cache is full
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._db.commit()
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Return the cached value, or compute it once even if many threads ask at the same time"""
+        value = self.get(key)
+        if value is not None:
+            self.stats['hits'] += 1
+            incr('llm_cache.hits')
+            return value
+
+        with self._lock:
+            pending = self._in_flight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._in_flight[key] = _InFlight()
+
+        if not owner:
+            self.stats['coalesced'] += 1
+            incr('llm_cache.coalesced')
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+
+        try:
+            # Another owner may have finished between the first lookup and registering this one
+            pending.value = self.get(key)
+            if pending.value is not None:
+                self.stats['hits'] += 1
+                incr('llm_cache.hits')
+                return pending.value
+
+            self.stats['misses'] += 1
+            incr('llm_cache.misses')
+            pending.value = compute()
+            self.put(key, pending.value)
+            return pending.value
+        except BaseException as e:
+            # Failures are shared with waiters but never cached
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            pending.done.set()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_cache() -> LLMResponseCache:
+    """Process-wide cache shared by every agent"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMResponseCache()
+        return _default_cache
@@ -0,0 +1,391 @@
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import json
+import logging
+import os
+import threading
+import pandas as pd
+from .bar_store import BarStore
+from .metrics import incr, span
+from .rate_limit import TokenBucket
+from .timeframes import (
+    DEFAULT_TIMEFRAME, FETCH_TIMEFRAMES, MAX_FETCH_DAYS,
+    normalize_timeframe, resample_bars, resample_chunks, source_timeframe, timeframe_minutes
+)
+
+logger = logging.getLogger(__name__)
+
+# Default location of the bundled historical data
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+# Timezone yfinance reports US equity bars in
+MARKET_TZ = 'America/New_York'
+
+# Signature of a data provider: (ticker, start, end) -> OHLCV frame of daily bars.
+# Intraday bars are requested with an extra `interval` keyword, e.g. interval='5m'.
+Fetcher = Callable[..., pd.DataFrame]
+
+
+def fetch_yfinance_history(ticker: str, start: datetime, end: datetime, interval: str = '1d') -> pd.DataFrame:
+    """Fetch bars from Yahoo Finance"""
+    # Imported on first fetch; cached reads never need it
+    import yfinance as yf
+    stock = yf.Ticker(ticker)
+    return stock.history(start=start, end=end, interval=interval)
+
+
+def series_key(ticker: str, timeframe: str = DEFAULT_TIMEFRAME) -> str:
+    """Metadata and cache key of one ticker at one bar size; daily bars keep the bare ticker"""
+    return ticker if timeframe == DEFAULT_TIMEFRAME else f"{ticker}@{timeframe}"
+
+
+class MarketDataStore:
+    """Cache-first OHLCV store that only fetches the bars it does not already hold.
+
+    Daily bars live in data/bars/<TICKER>/; each intraday bar size the provider serves
+    has its own store under data/bars/<timeframe>/. Other bar sizes are resampled on the
+    fly from the largest stored size that divides them.
+    """
+
+    def __init__(self, data_dir: str = DATA_DIR, fetcher: Optional[Fetcher] = None,
+                 max_age: timedelta = timedelta(minutes=15), max_cache_bytes: int = 256 * 1024 * 1024,
+                 rate_limiter: Optional[TokenBucket] = None):
+        self.data_dir = data_dir
+        self.fetcher = fetcher or fetch_yfinance_history
+        self.rate_limiter = rate_limiter
+        self.max_age = max_age
+        self.max_cache_bytes = max_cache_bytes
+
+        # In-memory frames, least recently used first
+        self._frames = OrderedDict()
+        self._frame_sizes = {}
+        self._cache_bytes = 0
+        self._lock = threading.RLock()
+        self._ticker_locks = {}
+        self._listeners: List[Callable[[str, str, pd.DataFrame], None]] = []
+
+        os.makedirs(self.data_dir, exist_ok=True)
+        self.bars = BarStore(os.path.join(self.data_dir, 'bars'))
+        self._intraday_bars = {}
+        self.metadata = self._load_metadata()
+        self._metadata_batches = 0
+        self._metadata_dirty = False
+
+    @property
+    def metadata_path(self) -> str:
+        return os.path.join(self.data_dir, 'market_data.json')
+
+    def csv_path(self, ticker: str) -> str:
+        return os.path.join(self.data_dir, f'{ticker}_historical.csv')
+
+    def bar_store(self, timeframe: str = DEFAULT_TIMEFRAME) -> BarStore:
+        """Columnar store holding one fetched bar size"""
+        if timeframe == DEFAULT_TIMEFRAME:
+            return self.bars
+        with self._lock:
+            if timeframe not in self._intraday_bars:
+                self._intraday_bars[timeframe] = BarStore(os.path.join(self.data_dir, 'bars', timeframe))
+            return self._intraday_bars[timeframe]
+
+    def tickers(self) -> List[str]:
+        """Tickers with stored daily bars"""
+        return self.bars.tickers()
+
+    def add_listener(self, callback: Callable[[str, str, pd.DataFrame], None]):
+        """Call `callback(ticker, timeframe, bars)` with the stored frame whenever new bars are stored"""
+        self._listeners.append(callback)
+
+    def get_history(self, ticker: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                    days: Optional[int] = None, force_refresh: bool = False,
+                    timeframe: str = DEFAULT_TIMEFRAME) -> pd.DataFrame:
+        """Return bars for [start, end], fetching only what is missing locally"""
+        ticker = ticker.upper()
+        timeframe = normalize_timeframe(timeframe)
+        if timeframe not in FETCH_TIMEFRAMES:
+            source = self.get_history(ticker, start, end, days, force_refresh, timeframe=source_timeframe(timeframe))
+            return resample_bars(source, timeframe)
+
+        end = end or datetime.now()
+        if start is None:
+            start = end - timedelta(days=days or 365)
+        key = series_key(ticker, timeframe)
+
+        with span('market_data.get_history', ticker=ticker, timeframe=timeframe), self._ticker_lock(key):
+            df = self._load(ticker, timeframe)
+            meta = self.metadata.get(key)
+
+            if df is None or df.empty or meta is None:
+                df = self._fetch(ticker, start, end, timeframe)
+                if not df.empty:
+                    self._store(ticker, df, covered_from=start, covered_to=min(self._naive(end), datetime.now()),
+                                timeframe=timeframe)
+            else:
+                df = self._fill_gaps(ticker, df, meta, start, end, force_refresh, timeframe)
+
+        if df.empty:
+            return df
+        return df.loc[self._align(start, df.index):self._align(end, df.index)]
+
+    def iter_history(self, ticker: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                     timeframe: str = DEFAULT_TIMEFRAME, chunk_rows: int = 100_000) -> Iterator[pd.DataFrame]:
+        """Yield stored bars chunk by chunk without loading the whole range; nothing is fetched"""
+        ticker = ticker.upper()
+        timeframe = normalize_timeframe(timeframe)
+        source = source_timeframe(timeframe)
+        bars = self.bar_store(source)
+        if not bars.exists(ticker):
+            if source == DEFAULT_TIMEFRAME and self._import_csv(ticker) is not None:
+                bars = self.bars
+            else:
+                return
+
+        chunks = bars.iter_chunks(ticker, chunk_rows, start=start, end=end)
+        yield from (chunks if source == timeframe else resample_chunks(chunks, timeframe))
+
+    def refresh(self, ticker: str, days: int = 365, timeframe: str = DEFAULT_TIMEFRAME) -> pd.DataFrame:
+        """Fetch any bars newer than the last stored one, ignoring freshness"""
+        return self.get_history(ticker, days=days, force_refresh=True, timeframe=timeframe)
+
+    def export_csv(self, ticker: str, path: Optional[str] = None, timeframe: str = DEFAULT_TIMEFRAME) -> str:
+        """Write a ticker's stored bars as CSV for the frontend"""
+        ticker = ticker.upper()
+        timeframe = normalize_timeframe(timeframe)
+        if path is None:
+            path = self.csv_path(ticker) if timeframe == DEFAULT_TIMEFRAME \
+                else os.path.join(self.data_dir, f'{ticker}_{timeframe}_historical.csv')
+        self.bar_store(timeframe).export_csv(ticker, path)
+        return path
+
+    def freshness(self, ticker: str, timeframe: str = DEFAULT_TIMEFRAME) -> Dict[str, Any]:
+        """Per-ticker metadata: covered range, last fetch time and row count"""
+        return dict(self.metadata.get(series_key(ticker.upper(), normalize_timeframe(timeframe)), {}))
+
+    def _fill_gaps(self, ticker: str, df: pd.DataFrame, meta: Dict[str, Any], start: datetime, end: datetime,
+                   force_refresh: bool = False, timeframe: str = DEFAULT_TIMEFRAME) -> pd.DataFrame:
+        """Fetch the head and tail of the requested range that are not covered yet"""
+        covered_from = self._parse(meta['covered_from'])
+        covered_to = self._parse(meta['covered_to'])
+        head = tail = None
+
+        # Intraday data goes stale after one bar even if max_age allows longer
+        max_age = self.max_age
+        if timeframe != DEFAULT_TIMEFRAME:
+            max_age = min(max_age, timedelta(minutes=timeframe_minutes(timeframe)))
+
+        # Older bars than anything requested before
+        if self._naive(start) < covered_from:
+            head = self._fetch(ticker, start, df.index[0].to_pydatetime(), timeframe)
+            covered_from = self._naive(start)
+
+        # New bars since the last fetch, starting from the last stored bar so a partial bar is replaced
+        if force_refresh or self._naive(end) > covered_to + max_age:
+            tail = self._fetch(ticker, df.index[-1].to_pydatetime(), end, timeframe)
+            covered_to = max(covered_to, min(self._naive(end), datetime.now()))
+
+        if head is None and tail is None:
+            return df
+
+        parts = [part for part in (head, df, tail) if part is not None and not part.empty]
+        merged = pd.concat(parts)
+        merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+
+        # Only a head fetch rewrites the stored file; new tail bars are appended
+        self._store(ticker, merged, covered_from=covered_from, covered_to=covered_to,
+                    appended=None if head is not None else tail, timeframe=timeframe)
+        return merged
+
+    def _fetch(self, ticker: str, start: datetime, end: datetime,
+               timeframe: str = DEFAULT_TIMEFRAME) -> pd.DataFrame:
+        """Fetch a range, split into the largest windows the provider serves at this bar size"""
+        if timeframe in MAX_FETCH_DAYS:
+            start, end = self._naive(start), self._naive(end)
+            window = timedelta(days=MAX_FETCH_DAYS[timeframe])
+        else:
+            window = None
+        parts = []
+        window_start = start
+        while True:
+            window_end = end if window is None else min(window_start + window, end)
+            if self.rate_limiter is not None:
+                with span('market_data.rate_limit_wait'):
+                    self.rate_limiter.acquire()
+            logger.info(f"Fetching {ticker} {timeframe} from {window_start:%Y-%m-%d} to {window_end:%Y-%m-%d}")
+            with span('market_data.fetch', ticker=ticker, timeframe=timeframe):
+                if timeframe == DEFAULT_TIMEFRAME:
+                    part = self.fetcher(ticker, window_start, window_end)
+                else:
+                    part = self.fetcher(ticker, window_start, window_end, interval=timeframe)
+            incr('market_data.fetches')
+            if part is not None and not part.empty:
+                incr('market_data.fetch_rows', len(part))
+                incr('market_data.fetch_bytes', int(part.memory_usage(index=True).sum()))
+                parts.append(part)
+            if window_end >= end:
+                break
+            window_start = window_end
+
+        if not parts:
+            return pd.DataFrame()
+        df = pd.concat(parts) if len(parts) > 1 else parts[0]
+        if df.index.tz is None:
+            df.index = df.index.tz_localize(MARKET_TZ)
+        return df[~df.index.duplicated(keep='last')] if len(parts) > 1 else df
+
+    def _load(self, ticker: str, timeframe: str = DEFAULT_TIMEFRAME) -> Optional[pd.DataFrame]:
+        """Load a ticker from memory, falling back to disk"""
+        key = series_key(ticker, timeframe)
+        with self._lock:
+            if key in self._frames:
+                self._frames.move_to_end(key)
+                incr('market_data.memory_hits')
+                return self._frames[key]
+
+        bars = self.bar_store(timeframe)
+        if bars.exists(ticker):
+            df = bars.read(ticker)
+        elif timeframe == DEFAULT_TIMEFRAME:
+            df = self._import_csv(ticker)
+            if df is None:
+                incr('market_data.misses')
+                return None
+        else:
+            incr('market_data.misses')
+            return None
+
+        incr('market_data.disk_hits')
+        self._remember(key, df)
+        return df
+
+    def _import_csv(self, ticker: str) -> Optional[pd.DataFrame]:
+        """Convert a CSV written before the columnar store existed"""
+        path = self.csv_path(ticker)
+        if not os.path.exists(path):
+            return None
+
+        df = pd.read_csv(path, index_col=0)
+        df.index = pd.to_datetime(df.index, utc=True).tz_convert(MARKET_TZ)
+        if df.empty:
+            return df
+
+        # Bars in the file are trusted up to the last one
+        self.bars.write(ticker, df)
+        if ticker not in self.metadata:
+            self._update_metadata(ticker, df, covered_from=df.index[0].to_pydatetime(),
+                                  covered_to=df.index[-1].to_pydatetime())
+        return df
+
+    def _store(self, ticker: str, df: pd.DataFrame, covered_from: datetime, covered_to: datetime,
+               appended: Optional[pd.DataFrame] = None, timeframe: str = DEFAULT_TIMEFRAME):
+        bars = self.bar_store(timeframe)
+        if appended is not None:
+            bars.append(ticker, appended)
+        else:
+            bars.write(ticker, df)
+        key = series_key(ticker, timeframe)
+        self._update_metadata(key, df, covered_from, covered_to)
+        self._remember(key, df)
+        for listener in list(self._listeners):
+            try:
+                listener(ticker, timeframe, df)
+            except Exception as e:
+                logger.error(f"Market data listener failed for {ticker}: {str(e)}")
+
+    def _remember(self, ticker: str, df: pd.DataFrame):
+        """Keep a frame in memory, evicting least recently used ones over the size budget"""
+        size = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            if ticker in self._frames:
+                self._cache_bytes -= self._frame_sizes.pop(ticker)
+                del self._frames[ticker]
+            self._frames[ticker] = df
+            self._frame_sizes[ticker] = size
+            self._cache_bytes += size
+
+            while self._cache_bytes > self.max_cache_bytes and len(self._frames) > 1:
+                evicted, _ = self._frames.popitem(last=False)
+                self._cache_bytes -= self._frame_sizes.pop(evicted)
+                logger.debug(f"Evicted {evicted} from market data cache")
+
+    def _update_metadata(self, ticker: str, df: pd.DataFrame, covered_from: datetime, covered_to: datetime):
+        with self._lock:
+            self.metadata[ticker] = {
+                'covered_from': self._naive(covered_from).isoformat(),
+                'covered_to': self._naive(covered_to).isoformat(),
+                'last_fetch': datetime.now().isoformat(),
+                'first_bar': df.index[0].isoformat(),
+                'last_bar': self._naive(df.index[-1].to_pydatetime()).isoformat(),
+                'rows': len(df)
+            }
+            if self._metadata_batches:
+                self._metadata_dirty = True
+            else:
+                self._write_metadata()
+
+    @contextmanager
+    def batch_metadata(self) -> Iterator[None]:
+        """Defer metadata writes until the outermost batch exits, so bulk runs write the file once"""
+        with self._lock:
+            self._metadata_batches += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._metadata_batches -= 1
+                if not self._metadata_batches and self._metadata_dirty:
+                    self._write_metadata()
+
+    def _write_metadata(self):
+        with self._lock:
+            self._metadata_dirty = False
+            tmp_path = self.metadata_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.metadata, f, indent=2)
+            os.replace(tmp_path, self.metadata_path)
+
+    def _load_metadata(self) -> Dict[str, Any]:
+        if not os.path.exists(self.metadata_path):
+            return {}
+        try:
+            with open(self.metadata_path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable market data metadata: {str(e)}")
+            return {}
+
+    def _ticker_lock(self, ticker: str) -> threading.RLock:
+        with self._lock:
+            return self._ticker_locks.setdefault(ticker, threading.RLock())
+
+    @staticmethod
+    def _naive(value: datetime) -> datetime:
+        """Express a time as market wall-clock time so request times and bar times compare directly"""
+        timestamp = pd.Timestamp(value)
+        if timestamp.tz is not None:
+            timestamp = timestamp.tz_convert(MARKET_TZ).tz_localize(None)
+        return timestamp.to_pydatetime()
+
+    @staticmethod
+    def _parse(value: str) -> datetime:
+        return datetime.fromisoformat(value)
+
+    @staticmethod
+    def _align(value: datetime, index: pd.DatetimeIndex) -> pd.Timestamp:
+        timestamp = pd.Timestamp(value)
+        if timestamp.tz is None:
+            return timestamp.tz_localize(index.tz)
+        return timestamp.tz_convert(index.tz)
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def default_store() -> MarketDataStore:
+    """Process-wide store shared by every agent"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = MarketDataStore()
+        return _default_store
@@ -0,0 +1,284 @@
+from typing import Any, Callable, Dict, List, Optional
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from .expressions import strategy_text
+from .market_data import DATA_DIR
+from .metrics import incr, span
+
+logger = logging.getLogger(__name__)
+
+# Rough size of a prompt; about four characters per token for English text
+CHARS_PER_TOKEN = 4
+
+# Longest a single request is kept in the extractive summary
+SUMMARY_LINE_CHARS = 160
+
+# Strategy fields kept for past strategies
+STRATEGY_FIELDS = ['ticker', 'indicator', 'condition', 'threshold', 'indicators', 'conditions', 'thresholds', 'logic', 'expression', 'timeframe']
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class Message:
+    """One side of a conversation turn; `type` is 'human' or 'ai' as in langchain messages"""
+
+    def __init__(self, type: str, content: str):
+        self.type = type
+        self.content = content
+        self.tokens = estimate_tokens(content)
+
+    def to_dict(self) -> Dict[str, str]:
+        return {'type': self.type, 'content': self.content}
+
+    def __repr__(self) -> str:
+        return f"Message({self.type!r}, {self.content[:40]!r})"
+
+
+def extractive_summary(summary: str, messages: List[Message], max_tokens: int) -> str:
+    """Summary without an LLM: one line per earlier request, oldest dropped first to fit the budget"""
+    lines = summary.splitlines() if summary else []
+    for message in messages:
+        if message.type == 'human':
+            text = ' '.join(message.content.split())
+            if len(text) > SUMMARY_LINE_CHARS:
+                text = text[:SUMMARY_LINE_CHARS - 3] + '...'
+            lines.append(f"- User asked: {text}")
+    while len(lines) > 1 and estimate_tokens('\n'.join(lines)) > max_tokens:
+        lines.pop(0)
+    return '\n'.join(lines)
+
+
+def llm_summarizer(llm, prompts=None) -> Callable[[str, List[Message], int], str]:
+    """Summarizer that asks the LLM to fold turns into the running summary, falling back to extractive_summary"""
+    from .prompts import TradingPrompts
+    prompts = prompts or TradingPrompts()
+
+    def summarize(summary: str, messages: List[Message], max_tokens: int) -> str:
+        transcript = '\n'.join(f"{'User' if m.type == 'human' else 'Assistant'}: {m.content}" for m in messages)
+        try:
+            with span('llm.summarize'):
+                response = llm.invoke(prompts.format_summary_prompt(summary, transcript, max_tokens * CHARS_PER_TOKEN))
+            text = str(getattr(response, 'content', response)).strip()
+        except Exception as e:
+            logger.warning(f"Summarization failed, keeping an extractive summary: {str(e)}")
+            return extractive_summary(summary, messages, max_tokens)
+        incr('llm.calls')
+        return text if estimate_tokens(text) <= max_tokens else extractive_summary(summary, messages, max_tokens)
+
+    return summarize
+
+
+class ConversationMemory:
+    """Conversation history that stays within a token budget.
+
+    Recent turns are kept verbatim. Once they outgrow their share of `max_tokens`, the
+    oldest are folded into a running summary until they fill half of it again, so
+    summarization happens every few turns rather than on every one. Strategies the
+    conversation produced are kept as structured records, newest last. context() renders
+    the summary, the strategies and the recent turns for a prompt.
+
+    save_context(), clear() and chat_memory.messages follow langchain's buffer memories;
+    langchain_memory() wraps one for a langchain agent.
+    """
+
+    def __init__(self, max_tokens: int = 1500, summary_tokens: int = 300, max_strategies: int = 10,
+                 summarizer: Optional[Callable[[str, List[Message], int], str]] = None):
+        self.max_tokens = max_tokens
+        self.summary_tokens = summary_tokens
+        self.max_strategies = max_strategies
+        self.summarizer = summarizer or extractive_summary
+        self.messages: List[Message] = []
+        self.summary = ''
+        self.strategies: List[Dict[str, Any]] = []
+        self.turns = 0
+        self._lock = threading.RLock()
+
+    @property
+    def chat_memory(self) -> "ConversationMemory":
+        # Same attribute path as langchain's memories: memory.chat_memory.messages
+        return self
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, Any]):
+        """Record one turn, summarizing older turns if the window is over budget"""
+        user_input = inputs.get('input', next(iter(inputs.values()), ''))
+        output = outputs.get('output', next(iter(outputs.values()), ''))
+        with self._lock:
+            self.messages += [Message('human', str(user_input)), Message('ai', str(output))]
+            self.turns += 1
+            self._compact()
+
+    def add_strategy(self, strategy: Dict[str, Any], strategy_id: Optional[str] = None):
+        """Remember a strategy; an identical one moves to the end instead of being repeated"""
+        record = {field: strategy[field] for field in STRATEGY_FIELDS if strategy.get(field) is not None}
+        if strategy_id:
+            record['id'] = strategy_id
+        with self._lock:
+            same = [kept for kept in self.strategies if _without_id(kept) == _without_id(record)]
+            for kept in same:
+                self.strategies.remove(kept)
+            self.strategies.append(record)
+            del self.strategies[:-self.max_strategies]
+
+    def background(self) -> str:
+        """The summary and past strategies, without the recent turns"""
+        with self._lock:
+            parts = []
+            if self.summary:
+                parts.append(f"Summary of the earlier conversation:\n{self.summary}")
+            if self.strategies:
+                parts.append("Strategies discussed so far:\n" + '\n'.join(
+                    f"- {_describe(strategy)}" for strategy in self.strategies))
+            return '\n\n'.join(parts)
+
+    def context(self) -> str:
+        """Everything remembered, rendered for a prompt"""
+        with self._lock:
+            parts = [self.background()] if self.summary or self.strategies else []
+            if self.messages:
+                parts.append("Recent conversation:\n" + '\n'.join(
+                    f"{'User' if m.type == 'human' else 'Assistant'}: {m.content}" for m in self.messages))
+            return '\n\n'.join(parts)
+
+    def clear(self):
+        with self._lock:
+            self.messages = []
+            self.summary = ''
+            self.strategies = []
+            self.turns = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'messages': [m.to_dict() for m in self.messages], 'summary': self.summary,
+                    'strategies': list(self.strategies), 'turns': self.turns}
+
+    def load_dict(self, data: Dict[str, Any]) -> "ConversationMemory":
+        with self._lock:
+            self.messages = [Message(m['type'], m['content']) for m in data.get('messages', [])]
+            self.summary = data.get('summary', '')
+            self.strategies = list(data.get('strategies', []))
+            self.turns = data.get('turns', len(self.messages) // 2)
+        return self
+
+    def _window_budget(self) -> int:
+        """Tokens left for verbatim turns after the summary and strategies"""
+        return max(self.max_tokens - estimate_tokens(self.background()), self.max_tokens // 4)
+
+    def _compact(self):
+        budget = self._window_budget()
+        if sum(m.tokens for m in self.messages) <= budget:
+            return
+
+        # Fold whole turns, oldest first, until the window is at most half full; the newest turn always stays
+        folded = []
+        while len(self.messages) > 2 and sum(m.tokens for m in self.messages) > budget // 2:
+            folded += self.messages[:2]
+            self.messages = self.messages[2:]
+        if folded:
+            with span('memory.summarize'):
+                self.summary = self.summarizer(self.summary, folded, self.summary_tokens)
+            incr('memory.summarized_turns', len(folded) // 2)
+
+        # A single turn bigger than the whole budget is truncated
+        for message in self.messages:
+            limit = budget * CHARS_PER_TOKEN // 2
+            if message.tokens > budget // 2:
+                message.content = message.content[:limit] + '...'
+                message.tokens = estimate_tokens(message.content)
+
+
+def _without_id(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in record.items() if key != 'id'}
+
+
+def _describe(strategy: Dict[str, Any]) -> str:
+    """One line per strategy, using the expression it compiles to where possible"""
+    try:
+        condition = strategy_text(strategy)
+    except ValueError:
+        condition = json.dumps(_without_id(strategy), default=str)
+    timeframe = f" on {strategy['timeframe']} bars" if strategy.get('timeframe') else ''
+    return f"{strategy.get('ticker', '?')}: {condition}{timeframe}"
+
+
+def langchain_memory(memory: ConversationMemory, memory_key: str = 'chat_history'):
+    """Adapter letting a langchain agent executor read and write a ConversationMemory"""
+    from langchain.schema import AIMessage, BaseMemory, HumanMessage, SystemMessage
+
+    class ConversationMemoryAdapter(BaseMemory):
+        conversation: Any
+        memory_key: str = 'chat_history'
+
+        @property
+        def memory_variables(self) -> List[str]:
+            return [self.memory_key]
+
+        def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+            background = self.conversation.background()
+            messages = [SystemMessage(content=background)] if background else []
+            messages += [HumanMessage(content=m.content) if m.type == 'human' else AIMessage(content=m.content)
+                         for m in self.conversation.messages]
+            return {self.memory_key: messages}
+
+        def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]):
+            self.conversation.save_context({'input': inputs.get('input', '')}, outputs)
+
+        def clear(self):
+            self.conversation.clear()
+
+    return ConversationMemoryAdapter(conversation=memory, memory_key=memory_key)
+
+
+class SessionStore:
+    """Conversation memories persisted per session id in SQLite.
+
+    Lets a server keep only active sessions in memory and pick a conversation up again
+    later or in another process. Sessions idle for longer than `ttl` are deleted.
+    """
+
+    def __init__(self, path: str = os.path.join(DATA_DIR, 'sessions.sqlite3'), ttl: float = 30 * 24 * 3600,
+                 clock: Callable[[], float] = time.time):
+        self.path = path
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, memory TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated)")
+        self._db.commit()
+
+    def load(self, session_id: str, memory: Optional[ConversationMemory] = None) -> Optional[ConversationMemory]:
+        """The stored memory of a session, loaded into `memory` if given; None if unknown or expired"""
+        with self._lock:
+            row = self._db.execute("SELECT memory, updated FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None or self.clock() - row[1] > self.ttl:
+            return None
+        return (memory or ConversationMemory()).load_dict(json.loads(row[0]))
+
+    def save(self, session_id: str, memory: ConversationMemory):
+        now = self.clock()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO sessions (id, memory, updated) VALUES (?, ?, ?)",
+                             (session_id, json.dumps(memory.to_dict(), default=str), now))
+            self._db.execute("DELETE FROM sessions WHERE updated < ?", (now - self.ttl,))
+            self._db.commit()
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            deleted = self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount
+            self._db.commit()
+        return deleted > 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
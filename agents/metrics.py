@@ -0,0 +1,279 @@
+from typing import Any, Callable, Dict, Iterable, Optional
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Recent durations kept per span for percentiles
+RESERVOIR_SIZE = 1024
+
+# Name of the innermost open span in the current thread or task
+_current_span: ContextVar[Optional[str]] = ContextVar('current_span', default=None)
+
+
+class Metrics:
+    """Thread-safe timing spans and counters for the agent pipeline.
+
+    Spans record how long a stage took, keyed by name ('llm.call', 'market_data.fetch');
+    counters accumulate totals such as cache hits or fetched bytes. With `log_spans`
+    every finished span is also logged as one JSON line, including its parent span.
+    """
+
+    def __init__(self, enabled: bool = True, log_spans: bool = False, reservoir_size: int = RESERVOIR_SIZE,
+                 clock: Callable[[], float] = time.perf_counter):
+        self.enabled = enabled
+        self.log_spans = log_spans
+        self.reservoir_size = reservoir_size
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._timers: Dict[str, Dict[str, Any]] = {}
+
+    def incr(self, name: str, value: float = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float):
+        """Record one duration for a span name"""
+        if not self.enabled:
+            return
+        with self._lock:
+            timer = self._timers.get(name)
+            if timer is None:
+                timer = self._timers[name] = {'count': 0, 'total': 0.0, 'max': 0.0,
+                                              'recent': deque(maxlen=self.reservoir_size)}
+            timer['count'] += 1
+            timer['total'] += seconds
+            timer['max'] = max(timer['max'], seconds)
+            timer['recent'].append(seconds)
+
+    @contextmanager
+    def span(self, name: str, **fields):
+        """Time the enclosed block; extra fields are added to its log line"""
+        if not self.enabled:
+            yield
+            return
+        parent = _current_span.get()
+        token = _current_span.set(name)
+        started = self.clock()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            elapsed = self.clock() - started
+            _current_span.reset(token)
+            self.observe(name, elapsed)
+            if self.log_spans:
+                event = {'event': 'span', 'name': name, 'parent': parent,
+                         'duration_ms': round(elapsed * 1000, 3), **fields}
+                if error is not None:
+                    event['error'] = error
+                logger.info(json.dumps(event, default=str))
+
+    def timed(self, name: str) -> Callable:
+        """Decorator timing every call of a function as a span"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters and per-span count, total, mean, max and recent percentiles in seconds"""
+        with self._lock:
+            counters = dict(self._counters)
+            timers = {name: (timer['count'], timer['total'], timer['max'], np.array(timer['recent']))
+                      for name, timer in self._timers.items()}
+
+        spans = {}
+        for name, (count, total, longest, recent) in timers.items():
+            p50, p95, p99 = np.percentile(recent, [50, 95, 99]) if len(recent) else (0.0, 0.0, 0.0)
+            spans[name] = {'count': count, 'total': total, 'mean': total / count if count else 0.0,
+                           'max': longest, 'p50': float(p50), 'p95': float(p95), 'p99': float(p99)}
+        return {'counters': counters, 'spans': spans}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+
+    def log_snapshot(self, level: int = logging.INFO):
+        """Log the current snapshot as one JSON line"""
+        logger.log(level, json.dumps({'event': 'metrics', **self.snapshot()}))
+
+    def render_prometheus(self, prefix: str = 'trading_agent') -> str:
+        """Snapshot in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in sorted(snapshot['counters'].items()):
+            metric = _metric_name(prefix, name) + '_total'
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for name, span in sorted(snapshot['spans'].items()):
+            metric = _metric_name(prefix, name) + '_seconds'
+            lines.append(f"# TYPE {metric} summary")
+            for quantile in ('p50', 'p95', 'p99'):
+                lines.append(f'{metric}{{quantile="0.{quantile[1:]}"}} {span[quantile]}')
+            lines += [f"{metric}_sum {span['total']}", f"{metric}_count {span['count']}"]
+        return '\n'.join(lines) + '\n'
+
+
+def _metric_name(prefix: str, name: str) -> str:
+    return f"{prefix}_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    metrics: Metrics = None
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            body, content_type = self.metrics.render_prometheus(), 'text/plain; version=0.0.4'
+        elif self.path == '/metrics.json':
+            body, content_type = json.dumps(self.metrics.snapshot()), 'application/json'
+        else:
+            self.send_error(404)
+            return
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def serve_metrics(port: int = 9100, host: str = '127.0.0.1', metrics: Optional[Metrics] = None) -> ThreadingHTTPServer:
+    """Serve GET /metrics (Prometheus text) and /metrics.json from a background thread; call shutdown() to stop"""
+    handler = type('MetricsHandler', (_MetricsHandler,), {'metrics': metrics or default_metrics()})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+
+class SamplingProfiler:
+    """Samples the stacks of running threads at a fixed interval.
+
+    Samples are aggregated as collapsed stacks, one line per distinct stack with frames
+    root first and separated by ';', followed by the sample count. This is the input
+    format of flamegraph.pl, speedscope and most other flame-graph viewers.
+    """
+
+    def __init__(self, interval: float = 0.005, thread_ids: Optional[Iterable[int]] = None):
+        self.interval = interval
+        self.thread_ids = set(thread_ids) if thread_ids is not None else None
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "SamplingProfiler":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def collapsed(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def write(self, path: str):
+        with open(path, 'w') as f:
+            f.write(self.collapsed())
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or (self.thread_ids is not None and thread_id not in self.thread_ids):
+                    continue
+                self.stacks[self._collapse(names.get(thread_id, str(thread_id)), frame)] += 1
+            self.samples += 1
+
+    @staticmethod
+    def _collapse(thread_name: str, frame) -> str:
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        frames.append(thread_name)
+        return ';'.join(reversed(frames))
+
+
+@contextmanager
+def profile(path: str, interval: float = 0.005):
+    """Sample every thread while the block runs and write collapsed stacks to `path`"""
+    profiler = SamplingProfiler(interval).start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        profiler.write(path)
+        logger.info(f"Wrote {profiler.samples} profile samples to {path}")
+
+
+_default_metrics = None
+_default_metrics_lock = threading.Lock()
+
+
+def default_metrics() -> Metrics:
+    """Process-wide metrics; METRICS_LOG_SPANS=1 logs every span"""
+    global _default_metrics
+    with _default_metrics_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics(log_spans=os.getenv('METRICS_LOG_SPANS') == '1')
+        return _default_metrics
+
+
+def span(name: str, **fields):
+    return default_metrics().span(name, **fields)
+
+
+def timed(name: str) -> Callable:
+    """Decorator timing a function in the process-wide metrics"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with default_metrics().span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def incr(name: str, value: float = 1):
+    default_metrics().incr(name, value)
+
+
+def observe(name: str, seconds: float):
+    default_metrics().observe(name, seconds)
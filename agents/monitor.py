@@ -0,0 +1,258 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time as dt_time
+from zoneinfo import ZoneInfo
+import copy
+import logging
+import threading
+import time
+import numpy as np
+import pandas as pd
+from .expressions import Evaluator, SeriesSource, compile_strategy, flatten_indicators
+from .indicators import StreamingIndicatorSet
+from .market_data import MARKET_TZ, MarketDataStore
+from .signals import generate_signals
+from .timeframes import DEFAULT_TIMEFRAME, history_days, normalize_timeframe
+
+logger = logging.getLogger(__name__)
+
+# Regular US equity session
+MARKET_OPEN = dt_time(9, 30)
+MARKET_CLOSE = dt_time(16, 0)
+
+# History replayed into a ticker's indicators before it is first evaluated
+WARMUP_DAYS = 365
+
+# Recent bars of prices and indicators kept per ticker for crosses, lags and windows in strategies
+HISTORY_BARS = 256
+
+
+def is_market_open(now: Optional[datetime] = None) -> bool:
+    """Whether `now` falls in the regular weekday session (holidays are not modelled)"""
+    now = now or datetime.now(ZoneInfo(MARKET_TZ))
+    if now.tzinfo is not None:
+        now = now.astimezone(ZoneInfo(MARKET_TZ))
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+class StoreBarFeed:
+    """Bar feed backed by a MarketDataStore; freshness is handled by the store.
+
+    Daily bars are warmed up on `warmup_days`; intraday bars on the history an analysis
+    at that bar size loads, which is thousands of bars.
+    """
+
+    def __init__(self, store: MarketDataStore, warmup_days: int = WARMUP_DAYS):
+        self.store = store
+        self.warmup_days = warmup_days
+
+    def fetch(self, ticker: str, since: Optional[pd.Timestamp] = None,
+              timeframe: str = DEFAULT_TIMEFRAME) -> pd.DataFrame:
+        """Bars newer than `since`, or the warm-up history when `since` is None"""
+        if since is None:
+            days = self.warmup_days if timeframe == DEFAULT_TIMEFRAME else history_days(timeframe, 'analysis')
+            return self.store.get_history(ticker, days=days, timeframe=timeframe)
+        df = self.store.get_history(ticker, start=since.to_pydatetime(), timeframe=timeframe)
+        return df[df.index > since]
+
+
+class ReplayBarFeed:
+    """Replays stored frames bar by bar, for tests and offline simulation.
+
+    Frames are keyed by ticker for daily bars and by (ticker, timeframe) otherwise.
+    """
+
+    def __init__(self, frames: Dict[str, pd.DataFrame], start: int = 1):
+        self.frames = frames
+        self.cursor = start
+        self.fetches = defaultdict(int)
+
+    def advance(self, bars: int = 1) -> bool:
+        """Release the next bar(s); False once every frame is exhausted"""
+        self.cursor += bars
+        return any(self.cursor <= len(df) for df in self.frames.values())
+
+    def fetch(self, ticker: str, since: Optional[pd.Timestamp] = None,
+              timeframe: str = DEFAULT_TIMEFRAME) -> pd.DataFrame:
+        key = ticker if timeframe == DEFAULT_TIMEFRAME else (ticker, timeframe)
+        self.fetches[key] += 1
+        df = self.frames[key].iloc[:self.cursor]
+        return df if since is None else df[df.index > since]
+
+
+class TickerState:
+    """Incremental indicator state for one ticker.
+
+    The newest bar may still be forming (today's daily bar), so only older bars are
+    committed; the newest is applied to a copy of the committed state on each cycle.
+    The last `history` committed bars are kept as flat rows of prices and indicators.
+    """
+
+    def __init__(self, history: int = HISTORY_BARS):
+        self.committed = StreamingIndicatorSet()
+        self.volumes = deque(maxlen=10)
+        self.history = deque(maxlen=history)
+        self.last_committed = None
+        self.pending = None
+        self.pending_time = None
+
+    def update(self, bars: pd.DataFrame) -> Optional[Dict[str, Any]]:
+        """Apply new bars and return the latest indicators and volume statistics"""
+        if not bars.empty:
+            rows = bars[[column for column in ('Open', 'High', 'Low', 'Close', 'Volume') if column in bars]]
+            for timestamp, bar in zip(rows.index[:-1], rows.iloc[:-1].to_dict('records')):
+                self.volumes.append(float(bar['Volume']))
+                self.history.append(self._row(bar, self.committed.update(bar), self.volumes))
+                self.last_committed = timestamp
+            self.pending = rows.iloc[-1].to_dict()
+            self.pending_time = rows.index[-1]
+
+        if self.pending is None:
+            return None
+
+        current = copy.deepcopy(self.committed)
+        volumes = list(self.volumes)[-9:] + [float(self.pending['Volume'])]
+        indicators = current.update(self.pending)
+        rows = list(self.history) + [self._row(self.pending, indicators, volumes)]
+        return {
+            'indicators': indicators,
+            'stats': {
+                'volume': float(self.pending['Volume']),
+                'avg_volume_10d': sum(volumes) / len(volumes)
+            },
+            'series': {name: np.array([row[name] for row in rows], dtype=float) for name in rows[-1]},
+            'timestamp': self.pending_time
+        }
+
+    @staticmethod
+    def _row(bar: Dict[str, Any], indicators: Dict[str, Any], volumes) -> Dict[str, float]:
+        """One bar's prices and indicators under expression series names"""
+        volumes = list(volumes)
+        return {
+            **{column.lower(): float(value) for column, value in bar.items()},
+            **flatten_indicators(indicators),
+            'avg_volume': sum(volumes) / len(volumes)
+        }
+
+
+class StrategyMonitor:
+    """Evaluates active strategies on a schedule, fetching each ticker once per cycle and bar size"""
+
+    def __init__(self, strategies: Dict[str, Dict[str, Any]], feed, on_signal: Optional[Callable] = None,
+                 interval: float = 60.0, workers: int = 32, market_hours_only: bool = True,
+                 clock: Optional[Callable[[], datetime]] = None):
+        # Shared with TradingAgent.active_strategies, so newly saved strategies are picked up
+        self.strategies = strategies
+        self.feed = feed
+        self.on_signal = on_signal
+        self.interval = interval
+        self.workers = workers
+        self.market_hours_only = market_hours_only
+        self.clock = clock or (lambda: datetime.now(ZoneInfo(MARKET_TZ)))
+
+        self.states: Dict[Tuple[str, str], TickerState] = {}
+        self._active = set()
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def run_cycle(self) -> List[Dict[str, Any]]:
+        """Fetch, update and evaluate every ticker once; return newly triggered strategies"""
+        started = time.monotonic()
+        by_series = defaultdict(list)
+        for strategy_id, strategy in list(self.strategies.items()):
+            try:
+                timeframe = normalize_timeframe(strategy.get('timeframe'))
+            except ValueError as e:
+                logger.warning(f"Cannot monitor strategy {strategy_id}: {str(e)}")
+                continue
+            by_series[(strategy['ticker'].upper(), timeframe)].append((strategy_id, strategy))
+
+        events = []
+        keys = list(by_series)
+        results = self._executor.map(lambda key: self._update_ticker(*key), keys)
+        for (ticker, timeframe), snapshot in zip(keys, results):
+            if snapshot is not None:
+                events.extend(self._evaluate(ticker, snapshot, by_series[(ticker, timeframe)]))
+
+        # Strategies that were removed no longer hold a trigger
+        self._active &= set(self.strategies)
+
+        elapsed = time.monotonic() - started
+        if elapsed > self.interval:
+            logger.warning(f"Monitoring cycle took {elapsed:.1f}s, longer than the {self.interval:.0f}s interval")
+
+        for event in events:
+            if self.on_signal is not None:
+                try:
+                    self.on_signal(event)
+                except Exception as e:
+                    logger.error(f"Signal handler failed for {event['strategy_id']}: {str(e)}")
+        return events
+
+    def start(self):
+        """Run cycles in a background thread until stop() is called"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='strategy-monitor', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            if not self.market_hours_only or is_market_open(self.clock()):
+                try:
+                    self.run_cycle()
+                except Exception as e:
+                    logger.error(f"Monitoring cycle failed: {str(e)}")
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def _update_ticker(self, ticker: str, timeframe: str = DEFAULT_TIMEFRAME) -> Optional[Dict[str, Any]]:
+        state = self.states.get((ticker, timeframe))
+        if state is None:
+            state = self.states[(ticker, timeframe)] = TickerState()
+        try:
+            bars = self.feed.fetch(ticker, state.last_committed, timeframe=timeframe)
+        except Exception as e:
+            logger.warning(f"Could not fetch {ticker}: {str(e)}")
+            return None
+        return state.update(bars)
+
+    def _evaluate(self, ticker: str, snapshot: Dict[str, Any], strategies) -> List[Dict[str, Any]]:
+        """Check every strategy at the newest bar, computing shared sub-expressions once"""
+        signals = generate_signals(snapshot['indicators'], snapshot['stats'])
+        series = snapshot['series']
+        evaluator = Evaluator(SeriesSource({name: series[name] for name in ('open', 'high', 'low', 'close', 'volume')
+                                            if name in series}, series))
+        events = []
+        for strategy_id, strategy in strategies:
+            try:
+                triggered = bool(compile_strategy(strategy).evaluate(evaluator)[-1])
+            except ValueError as e:
+                logger.warning(f"Cannot evaluate strategy {strategy_id}: {str(e)}")
+                triggered = False
+            if not triggered:
+                self._active.discard(strategy_id)
+                continue
+
+            # Only the transition into the triggered state is reported
+            if strategy_id in self._active:
+                continue
+            self._active.add(strategy_id)
+            events.append({
+                'strategy_id': strategy_id,
+                'ticker': ticker,
+                'strategy': strategy,
+                'signals': signals,
+                'indicators': snapshot['indicators'],
+                'price': float(series['close'][-1]),
+                'timestamp': snapshot['timestamp']
+            })
+        return events
@@ -0,0 +1,185 @@
+from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import itertools
+import math
+import os
+import numpy as np
+import pandas as pd
+import talib
+from . import backtest
+from .expressions import Evaluator, SeriesSource, compile_strategy
+
+# Parameters a sweep can vary, with the strategy field each one overrides
+SWEEP_PARAMETERS = ['ticker', 'condition', 'threshold', 'rsi_period', 'horizon']
+
+# Columns of the results table, in order
+RESULT_COLUMNS = SWEEP_PARAMETERS + ['total_signals', 'avg_return', 'win_rate', 'sharpe_ratio']
+
+# Price columns shared with the workers, as the indicators and expressions need them
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Tasks per worker, so combinations of one ticker and RSI period still spread over every core
+TASKS_PER_WORKER = 4
+
+# Price arrays attached in each worker process, and the indicator series computed from them
+_worker_arrays = {}
+_worker_series = {}
+
+
+class SharedPriceArrays:
+    """OHLCV arrays for many tickers packed into one shared memory block"""
+
+    def __init__(self, frames: Dict[str, pd.DataFrame]):
+        self.layout = {}
+        offset = 0
+        for ticker, df in frames.items():
+            self.layout[ticker] = (offset, len(df))
+            offset += len(df)
+
+        rows = len(PRICE_COLUMNS)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, offset * rows * 8))
+        packed = np.ndarray((rows, offset), dtype=np.float64, buffer=self.shm.buf)
+        for ticker, df in frames.items():
+            start, length = self.layout[ticker]
+            for row, column in enumerate(PRICE_COLUMNS):
+                packed[row, start:start + length] = df[column].values.astype(float)
+        self.total = offset
+
+    @property
+    def spec(self) -> Tuple[str, int, Dict[str, Tuple[int, int]]]:
+        """What a worker needs to attach: block name, row length and per-ticker slices"""
+        return self.shm.name, self.total, self.layout
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _attach(spec: Tuple[str, int, Dict[str, Tuple[int, int]]]):
+    """Process pool initializer: map the shared block without copying it"""
+    name, total, layout = spec
+    shm = shared_memory.SharedMemory(name=name)
+    packed = np.ndarray((len(PRICE_COLUMNS), total), dtype=np.float64, buffer=shm.buf)
+    _worker_arrays['shm'] = shm
+    for ticker, (start, length) in layout.items():
+        _worker_arrays[ticker] = {column: packed[row, start:start + length] for row, column in enumerate(PRICE_COLUMNS)}
+
+
+def _detach():
+    shm = _worker_arrays.pop('shm', None)
+    _worker_arrays.clear()
+    _worker_series.clear()
+    if shm is not None:
+        shm.close()
+
+
+def _indicator_series(ticker: str, rsi_period: int) -> Dict[str, Any]:
+    """Indicator series of a ticker as backtest.strategy_signals computes them, with RSI over `rsi_period`"""
+    key = (ticker, rsi_period)
+    if key not in _worker_series:
+        prices = _worker_arrays[ticker]
+        series = backtest.calculate_indicator_series(pd.DataFrame(prices, copy=False))
+        if rsi_period != 14:
+            series['RSI'] = talib.RSI(prices['Close'], timeperiod=rsi_period)
+        series['avg_volume'] = backtest.rolling_mean(prices['Volume'], 10)
+        _worker_series[key] = series
+    return _worker_series[key]
+
+
+def _evaluate_group(template: Dict[str, Any], ticker: str, rsi_period: int,
+                    combos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Evaluate combinations sharing a ticker and RSI period, computing indicators and shared sub-expressions once"""
+    prices = _worker_arrays[ticker]
+    evaluator = Evaluator(SeriesSource(prices, _indicator_series(ticker, rsi_period)))
+    returns_by_horizon = {}
+
+    results = []
+    for combo in combos:
+        strategy = {**template, 'ticker': ticker, 'condition': combo['condition'], 'threshold': combo['threshold']}
+        strategy.pop('conditions', None)
+        strategy.pop('thresholds', None)
+        triggered = np.array(compile_strategy(strategy).evaluate(evaluator), dtype=bool)
+        triggered[:backtest.WARMUP_BARS] = False
+
+        horizon = combo['horizon']
+        if horizon not in returns_by_horizon:
+            returns_by_horizon[horizon] = backtest.forward_returns(prices['Close'], horizon)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            metrics = backtest.summarize_returns(returns_by_horizon[horizon][triggered])
+        results.append({**combo, **{key: float(value) for key, value in metrics.items()}})
+    return results
+
+
+class ParameterSweep:
+    """Backtest every combination of a parameter grid for a strategy template across processes.
+
+    Combinations are evaluated with the expression engine on the same indicator series
+    as backtest.backtest, so a swept row matches a direct backtest of that strategy for
+    any indicator. `rsi_period` recomputes the RSI series the strategy reads.
+    """
+
+    def __init__(self, template: Dict[str, Any], param_grid: Dict[str, List[Any]], workers: Optional[int] = None):
+        unknown = set(param_grid) - set(SWEEP_PARAMETERS)
+        if unknown:
+            raise ValueError(f"Unknown sweep parameters: {', '.join(sorted(unknown))}")
+
+        self.template = template
+        self.grid = {
+            'ticker': [template.get('ticker')],
+            'condition': [template.get('condition', 'below')],
+            'threshold': [template.get('threshold', 30)],
+            'rsi_period': [14],
+            'horizon': [backtest.HOLDING_PERIOD],
+        }
+        self.grid.update({key: list(values) for key, values in param_grid.items()})
+        self.grid['ticker'] = [ticker.upper() for ticker in self.grid['ticker']]
+        self.workers = workers or os.cpu_count() or 1
+
+    def combinations(self) -> List[Dict[str, Any]]:
+        keys = list(self.grid)
+        return [dict(zip(keys, values)) for values in itertools.product(*self.grid.values())]
+
+    def tasks(self) -> List[Tuple[str, int, List[Dict[str, Any]]]]:
+        """(ticker, RSI period, combinations) of each task.
+
+        Combinations sharing a ticker and RSI period share indicators, which each worker
+        computes once and caches; every group is split into enough tasks to keep all
+        workers busy.
+        """
+        groups = {}
+        for combo in self.combinations():
+            groups.setdefault((combo['ticker'], combo['rsi_period']), []).append(combo)
+        chunks = max(1, math.ceil(self.workers * TASKS_PER_WORKER / len(groups))) if self.workers > 1 else 1
+        tasks = []
+        for (ticker, period), combos in groups.items():
+            size = math.ceil(len(combos) / chunks)
+            tasks.extend((ticker, period, combos[i:i + size]) for i in range(0, len(combos), size))
+        return tasks
+
+    def run(self, frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        """Run the sweep over the given price frames and return results ranked by Sharpe ratio"""
+        missing = [ticker for ticker in self.grid['ticker'] if ticker not in frames]
+        if missing:
+            raise ValueError(f"No price data for: {', '.join(missing)}")
+
+        tasks = self.tasks()
+        shared = SharedPriceArrays({ticker: frames[ticker] for ticker in self.grid['ticker']})
+        try:
+            if self.workers == 1:
+                _attach(shared.spec)
+                batches = [_evaluate_group(self.template, *task) for task in tasks]
+            else:
+                with ProcessPoolExecutor(max_workers=self.workers, initializer=_attach,
+                                         initargs=(shared.spec,)) as executor:
+                    futures = [executor.submit(_evaluate_group, self.template, *task) for task in tasks]
+                    batches = [future.result() for future in futures]
+        finally:
+            _detach()
+            shared.close()
+
+        results = pd.DataFrame([row for batch in batches for row in batch], columns=RESULT_COLUMNS)
+
+        # A single signal has zero deviation; its Sharpe ratio is not meaningful for ranking
+        results['sharpe_ratio'] = results['sharpe_ratio'].replace([np.inf, -np.inf], np.nan)
+        return results.sort_values(['sharpe_ratio', 'avg_return'], ascending=False, ignore_index=True)
@@ -0,0 +1,239 @@
+from typing import Any, Dict, List
+import functools
+import numpy as np
+import pandas as pd
+
+
+def build_panel(frames: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
+    """Align per-ticker OHLCV frames into tickers x bars arrays on the union of their timestamps.
+
+    Bars a ticker does not have are NaN, so tickers with shorter histories
+    simply start later in the panel.
+    """
+    tickers = list(frames)
+    index = pd.DatetimeIndex([])
+    for df in frames.values():
+        # Universes usually share one calendar, so most frames need no union at all
+        if not df.index.equals(index):
+            index = df.index if index.empty else index.union(df.index)
+    index = pd.DatetimeIndex(index).sort_values()
+
+    panel = {'tickers': tickers, 'index': index}
+    for column in ('Open', 'High', 'Low', 'Close', 'Volume'):
+        panel[column] = np.vstack([
+            (frames[ticker][column] if frames[ticker].index.equals(index)
+             else frames[ticker][column].reindex(index)).values.astype(float)
+            for ticker in tickers
+        ]) if tickers else np.empty((0, 0))
+    return panel
+
+
+def _first_valid(values: np.ndarray) -> np.ndarray:
+    """Column of each row's first non-NaN value (the row length for all-NaN rows)"""
+    valid = ~np.isnan(values)
+    first = valid.argmax(axis=1)
+    first[~valid.any(axis=1)] = values.shape[1]
+    return first
+
+
+def _own_calendar(indicator):
+    """Compute an indicator on each ticker's own bars, as TA-Lib does per ticker.
+
+    A bar is missing from a row when any input is NaN there. Rows with missing bars after
+    their first one (a gap on the union calendar) have their bars packed to the right, so
+    every row only has leading NaNs; the results are put back in place and are NaN at the
+    missing bars. Panels without such gaps are passed through untouched.
+    """
+    @functools.wraps(indicator)
+    def wrapper(*args, **kwargs):
+        arrays = [i for i, arg in enumerate(args) if isinstance(arg, np.ndarray) and arg.ndim == 2]
+        valid = np.logical_and.reduce([~np.isnan(args[i]) for i in arrays])
+        if not valid.size or (np.diff(valid.astype(np.int8), axis=1) >= 0).all():
+            return indicator(*args, **kwargs)
+
+        # Missing bars first, then the row's bars in order
+        order = np.argsort(valid, axis=1, kind='stable')
+        packed_valid = np.take_along_axis(valid, order, axis=1)
+        packed = list(args)
+        for i in arrays:
+            packed[i] = np.where(packed_valid, np.take_along_axis(args[i], order, axis=1), np.nan)
+
+        def unpack(result):
+            out = np.full(result.shape, np.nan)
+            np.put_along_axis(out, order, result, axis=1)
+            out[~valid] = np.nan
+            return out
+
+        result = indicator(*packed, **kwargs)
+        return {key: unpack(value) for key, value in result.items()} if isinstance(result, dict) else unpack(result)
+    return wrapper
+
+
+def _seeded_average(values: np.ndarray, period: int, alpha: float, first: np.ndarray) -> np.ndarray:
+    """Exponential average per row, seeded with the mean of the row's first `period` valid values.
+
+    This is TA-Lib's seeding for EMA (alpha = 2 / (period + 1)) and Wilder smoothing
+    (alpha = 1 / period). Each step advances every row at once. A NaN input after the
+    seed leaves the average where it was, and the output is NaN at that bar.
+    """
+    rows, bars = values.shape
+    out = np.full((rows, bars), np.nan)
+    seed_at = first + period - 1
+    if rows == 0 or seed_at.min() >= bars:
+        return out
+
+    filled = np.nan_to_num(values)
+    sums = np.concatenate([np.zeros((rows, 1)), np.cumsum(filled, axis=1)], axis=1)
+    row_ids = np.arange(rows)
+    seeded = seed_at < bars
+    seeds = np.full(rows, np.nan)
+    seeds[seeded] = (sums[row_ids[seeded], seed_at[seeded] + 1] - sums[row_ids[seeded], first[seeded]]) / period
+
+    average = np.full(rows, np.nan)
+    for t in range(int(seed_at.min()), bars):
+        current = values[:, t]
+        present = ~np.isnan(current)
+        average = np.where(seed_at == t, seeds,
+                           np.where(present, average + alpha * (current - average), average))
+        out[:, t] = np.where(present, average, np.nan)
+    return out
+
+
+@_own_calendar
+def panel_sma(close: np.ndarray, period: int) -> np.ndarray:
+    """Simple moving average; NaN until a row has `period` valid bars"""
+    rows, bars = close.shape
+    out = np.full((rows, bars), np.nan)
+    if bars < period:
+        return out
+    valid = ~np.isnan(close)
+    sums = np.cumsum(np.nan_to_num(close), axis=1)
+    counts = np.cumsum(valid, axis=1)
+    window_sums = sums[:, period - 1:] - np.concatenate([np.zeros((rows, 1)), sums[:, :-period]], axis=1)
+    window_counts = counts[:, period - 1:] - np.concatenate([np.zeros((rows, 1)), counts[:, :-period]], axis=1)
+    out[:, period - 1:] = np.where(window_counts == period, window_sums / period, np.nan)
+    return out
+
+
+@_own_calendar
+def panel_ema(close: np.ndarray, period: int) -> np.ndarray:
+    return _seeded_average(close, period, 2.0 / (period + 1), _first_valid(close))
+
+
+@_own_calendar
+def panel_rsi(close: np.ndarray, period: int = 14) -> np.ndarray:
+    """Wilder RSI for every row"""
+    rows, bars = close.shape
+    out = np.full((rows, bars), np.nan)
+    if bars < 2:
+        return out
+    change = np.diff(close, axis=1)
+    gains = np.where(change > 0, change, 0.0)
+    losses = np.where(change < 0, -change, 0.0)
+    gains[np.isnan(change)] = np.nan
+    losses[np.isnan(change)] = np.nan
+
+    # Change j belongs to bar j + 1, so the first valid change is at the first valid bar's index
+    first = _first_valid(change)
+    avg_gain = _seeded_average(gains, period, 1.0 / period, first)
+    avg_loss = _seeded_average(losses, period, 1.0 / period, first)
+    total = avg_gain + avg_loss
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out[:, 1:] = np.where(total != 0, 100.0 * avg_gain / total, 0.0)
+    out[:, 1:][np.isnan(total)] = np.nan
+    return out
+
+
+@_own_calendar
+def panel_macd(close: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, np.ndarray]:
+    """MACD with TA-Lib's alignment: the fast EMA starts `slow - fast` bars late and
+    nothing is reported until the signal line is seeded"""
+    first = _first_valid(close)
+    slow_ema = _seeded_average(close, slow, 2.0 / (slow + 1), first)
+    fast_ema = _seeded_average(close, fast, 2.0 / (fast + 1), first + (slow - fast))
+    macd = fast_ema - slow_ema
+    signal_line = _seeded_average(macd, signal, 2.0 / (signal + 1), first + slow - 1)
+    macd = np.where(np.isnan(signal_line), np.nan, macd)
+    return {'macd': macd, 'signal': signal_line, 'histogram': macd - signal_line}
+
+
+@_own_calendar
+def panel_bbands(close: np.ndarray, period: int = 20, nbdev: float = 2.0) -> Dict[str, np.ndarray]:
+    """Bollinger Bands using the population deviation of each trailing window"""
+    rows, bars = close.shape
+    middle = np.full((rows, bars), np.nan)
+    deviation = np.full((rows, bars), np.nan)
+    if bars >= period:
+        windows = np.lib.stride_tricks.sliding_window_view(close, period, axis=1)
+        middle[:, period - 1:] = windows.mean(axis=2)
+        deviation[:, period - 1:] = windows.std(axis=2)
+    return {'upper': middle + nbdev * deviation, 'middle': middle, 'lower': middle - nbdev * deviation}
+
+
+@_own_calendar
+def panel_atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    """Wilder average true range for every row"""
+    rows, bars = close.shape
+    true_range = np.full((rows, bars), np.nan)
+    if bars > 1:
+        previous = close[:, :-1]
+        true_range[:, 1:] = np.maximum.reduce([
+            high[:, 1:] - low[:, 1:],
+            np.abs(high[:, 1:] - previous),
+            np.abs(low[:, 1:] - previous)
+        ])
+    return _seeded_average(true_range, period, 1.0 / period, _first_valid(true_range))
+
+
+@_own_calendar
+def panel_obv(close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    """On-balance volume, starting from each row's first valid bar"""
+    rows, bars = close.shape
+    flow = np.zeros((rows, bars))
+    if bars > 1:
+        flow[:, 1:] = np.sign(np.nan_to_num(np.diff(close, axis=1))) * np.nan_to_num(volume[:, 1:])
+    first = _first_valid(close)
+    has_data = first < bars
+    flow[np.arange(rows)[has_data], first[has_data]] = volume[np.arange(rows)[has_data], first[has_data]]
+    obv = np.cumsum(flow, axis=1)
+    obv[np.arange(bars)[None, :] < first[:, None]] = np.nan
+    return obv
+
+
+def panel_rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over up to `window` valid bars per row, like backtest.rolling_mean from each row's first bar"""
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0.0), axis=1)
+    counts = np.cumsum(valid, axis=1).astype(float)
+    if values.shape[1] > window:
+        sums[:, window:] -= sums[:, :-window].copy()
+        counts[:, window:] -= counts[:, :-window].copy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+    means[~valid] = np.nan
+    return means
+
+
+def calculate_panel_indicators(close: np.ndarray, high: np.ndarray, low: np.ndarray,
+                               volume: np.ndarray) -> Dict[str, Any]:
+    """Every indicator from TradingAgent._calculate_technical_indicators for a whole universe.
+
+    Inputs are tickers x bars arrays; outputs have the same shape and alignment,
+    keyed like backtest.calculate_indicator_series.
+    """
+    close, high, low, volume = (np.atleast_2d(np.asarray(a, dtype=float)) for a in (close, high, low, volume))
+    return {
+        'RSI': panel_rsi(close, 14),
+        'MACD': panel_macd(close),
+        'BB': panel_bbands(close),
+        'OBV': panel_obv(close, volume),
+        'SMA_20': panel_sma(close, 20),
+        'SMA_50': panel_sma(close, 50),
+        'EMA_20': panel_ema(close, 20),
+        'ATR': panel_atr(high, low, close, 14)
+    }
+
+
+def select_tickers(tickers: List[str], mask: np.ndarray) -> List[str]:
+    """Tickers whose entry in a boolean screen is set, e.g. panel['RSI'][:, -1] < 30"""
+    return [ticker for ticker, selected in zip(tickers, mask) if selected]
@@ -0,0 +1,243 @@
+from typing import Any, Dict, List
+import numpy as np
+import pandas as pd
+from . import backtest
+from .expressions import SeriesSource, StrategySet
+from .panel import build_panel, calculate_panel_indicators, panel_rolling_mean
+from .timeframes import bars_per_year, normalize_timeframe
+
+TRADE_COLUMNS = ['strategy_id', 'ticker', 'side', 'entry_time', 'entry_price', 'exit_time', 'exit_price',
+                 'shares', 'pnl', 'return', 'commission']
+
+
+def _forward_fill(values: np.ndarray) -> np.ndarray:
+    """Carry each row's last valid value forward across NaN gaps"""
+    index = np.where(np.isnan(values), 0, np.arange(values.shape[1])[None, :])
+    np.maximum.accumulate(index, axis=1, out=index)
+    return values[np.arange(values.shape[0])[:, None], index]
+
+
+def _group_by_bar(bar_of_trade: np.ndarray, bars: int) -> List[np.ndarray]:
+    """Indices of the trades falling on each bar, in trade order"""
+    order = np.argsort(bar_of_trade, kind='stable')
+    return np.split(order, np.searchsorted(bar_of_trade[order], np.arange(1, bars)))
+
+
+class PortfolioBacktest:
+    """Event-driven simulation of many strategies trading one shared cash account.
+
+    Strategies use the same dict format and trigger rules as TradingAgent. A strategy
+    holds at most one trade at a time: when it triggers, it enters on the next bar's open
+    (or the signal bar's close with execution='close'). It exits `holding_period` bars
+    later. Different strategies may hold the same ticker at once. Each trade is sized as
+    a fraction of current equity and pays commission and slippage on both sides. Long
+    entries never spend more cash than is available.
+
+    Optional per-strategy keys: 'side' ('long' or 'short'), 'holding_period' and
+    'position_size'. All strategies trade on one bar size, their 'timeframe'.
+    """
+
+    def __init__(self, strategies: Dict[str, Dict[str, Any]], initial_cash: float = 1_000_000.0,
+                 position_size: float = 0.1, commission: float = 0.0005, slippage: float = 0.0005,
+                 execution: str = 'next_open', warmup: int = backtest.WARMUP_BARS):
+        if execution not in ('next_open', 'close'):
+            raise ValueError("execution must be 'next_open' or 'close'")
+        timeframes = {normalize_timeframe(strategy.get('timeframe')) for strategy in strategies.values()}
+        if len(timeframes) > 1:
+            raise ValueError(f"Portfolio strategies must share one timeframe, got: {', '.join(sorted(timeframes))}")
+        self.strategies = strategies
+        self.timeframe = timeframes.pop() if timeframes else normalize_timeframe(None)
+        self.initial_cash = initial_cash
+        self.position_size = position_size
+        self.commission = commission
+        self.slippage = slippage
+        self.execution = execution
+        self.warmup = warmup
+
+    def run(self, frames: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
+        """Simulate every strategy over the union of the frames' timestamps"""
+        tickers = sorted({strategy['ticker'].upper() for strategy in self.strategies.values()})
+        missing = [ticker for ticker in tickers if ticker not in frames]
+        if missing:
+            raise ValueError(f"No price data for: {', '.join(missing)}")
+
+        panel = build_panel({ticker: frames[ticker] for ticker in tickers})
+        close = panel['Close']
+        fill_prices = close if self.execution == 'close' else panel['Open']
+
+        trades = self._plan_trades(panel)
+        return self._simulate(panel, trades, fill_prices)
+
+    def _plan_trades(self, panel: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """Entry and exit bars of every trade; they depend only on signals, not on cash"""
+        close = panel['Close']
+        bars = close.shape[1]
+        rows = {ticker: row for row, ticker in enumerate(panel['tickers'])}
+
+        # Every strategy's condition over the whole panel, sharing common sub-expressions
+        series = calculate_panel_indicators(close, panel['High'], panel['Low'], panel['Volume'])
+        source = SeriesSource.from_panel(panel, {**series, 'avg_volume': panel_rolling_mean(panel['Volume'], 10)})
+        masks = StrategySet(self.strategies).evaluate_panel(panel, source)
+        listed = np.argmax(~np.isnan(close), axis=1)
+        delay = 0 if self.execution == 'close' else 1
+
+        plan = {key: [] for key in ('strategy', 'row', 'entry', 'exit', 'sign', 'size')}
+        for number, (strategy_id, strategy) in enumerate(self.strategies.items()):
+            row = rows[strategy['ticker'].upper()]
+            triggered = np.array(masks[strategy_id], dtype=bool)
+            triggered[:listed[row] + self.warmup] = False
+
+            holding = int(strategy.get('holding_period', backtest.HOLDING_PERIOD))
+            sign = -1 if strategy.get('side', 'long') == 'short' else 1
+            size = float(strategy.get('position_size', self.position_size))
+
+            # One open trade per strategy: skip triggers until the previous trade has exited
+            next_free = 0
+            for signal_bar in np.flatnonzero(triggered):
+                entry = signal_bar + delay
+                if entry < next_free or entry >= bars - 1:
+                    continue
+                exit_bar = min(entry + holding, bars - 1)
+                for key, value in zip(plan, (number, row, entry, exit_bar, sign, size)):
+                    plan[key].append(value)
+                next_free = exit_bar
+
+        return {
+            'strategy': np.array(plan['strategy'], dtype=np.int64),
+            'row': np.array(plan['row'], dtype=np.int64),
+            'entry': np.array(plan['entry'], dtype=np.int64),
+            'exit': np.array(plan['exit'], dtype=np.int64),
+            'sign': np.array(plan['sign'], dtype=np.int64),
+            'size': np.array(plan['size'], dtype=float),
+        }
+
+    def _simulate(self, panel: Dict[str, Any], trades: Dict[str, np.ndarray],
+                  fill_prices: np.ndarray) -> Dict[str, Any]:
+        close = panel['Close']
+        rows, bars = close.shape
+        marks = np.nan_to_num(_forward_fill(close))
+        fills = np.where(np.isnan(fill_prices), marks, fill_prices)
+        # A forced exit on the final bar fills at its close
+        fills[:, -1] = marks[:, -1]
+
+        count = len(trades['entry'])
+        shares = np.zeros(count)
+        entry_price = np.zeros(count)
+        exit_price = np.zeros(count)
+        costs = np.zeros(count)
+
+        position = np.zeros(rows)
+        position_changes = np.zeros((bars, rows))
+        cash_after = np.full(bars, np.nan)
+        cash = self.initial_cash
+        traded_notional = 0.0
+
+        # Trades leaving and entering at each bar, as index arrays
+        exits_at = _group_by_bar(trades['exit'], bars)
+        entries_at = _group_by_bar(trades['entry'], bars)
+
+        for t in np.flatnonzero(np.bincount(np.concatenate([trades['entry'], trades['exit']]), minlength=bars)):
+            price = fills[:, t]
+
+            # Close trades first so their cash can fund new entries on the same bar
+            leaving = exits_at[t]
+            leaving = leaving[shares[leaving] != 0]
+            if len(leaving):
+                direction = -trades['sign'][leaving]
+                fill = price[trades['row'][leaving]] * (1 + self.slippage * direction)
+                notional = shares[leaving] * fill
+                fee = notional * self.commission
+                cash += np.sum(trades['sign'][leaving] * notional - fee)
+                np.subtract.at(position, trades['row'][leaving], trades['sign'][leaving] * shares[leaving])
+                np.subtract.at(position_changes[t], trades['row'][leaving], trades['sign'][leaving] * shares[leaving])
+                exit_price[leaving] = fill
+                costs[leaving] += fee
+                traded_notional += notional.sum()
+
+            entering = entries_at[t]
+            if len(entering):
+                equity = cash + position @ price
+                direction = trades['sign'][entering]
+                fill = price[trades['row'][entering]] * (1 + self.slippage * direction)
+                valid = fill > 0
+                notional = np.where(valid, equity * trades['size'][entering], 0.0)
+
+                # Scale long entries down so they never spend more cash than is available
+                longs = direction > 0
+                needed = np.sum(notional[longs]) * (1 + self.commission)
+                if needed > max(cash, 0.0):
+                    notional[longs] *= max(cash, 0.0) / needed
+
+                quantity = np.divide(notional, fill, out=np.zeros_like(notional), where=valid)
+                fee = notional * self.commission
+                cash -= np.sum(direction * notional + fee)
+                shares[entering] = quantity
+                entry_price[entering] = fill
+                costs[entering] += fee
+                np.add.at(position, trades['row'][entering], direction * quantity)
+                np.add.at(position_changes[t], trades['row'][entering], direction * quantity)
+                traded_notional += notional.sum()
+
+            cash_after[t] = cash
+
+        # Cash and positions only change at event bars; the curve marks them at every close
+        cash_curve = pd.Series(cash_after).ffill().fillna(self.initial_cash).values
+        holdings = np.cumsum(position_changes, axis=0)
+        equity = cash_curve + np.einsum('tr,rt->t', holdings, marks)
+
+        return self._report(panel, trades, shares, entry_price, exit_price, costs, equity, traded_notional)
+
+    def _report(self, panel, trades, shares, entry_price, exit_price, costs, equity, traded_notional) -> Dict[str, Any]:
+        index = panel['index']
+        strategy_ids = list(self.strategies)
+        executed = shares > 0
+
+        pnl = trades['sign'] * shares * (exit_price - entry_price) - costs
+        with np.errstate(divide='ignore', invalid='ignore'):
+            trade_returns = pnl / (shares * entry_price)
+        trade_log = pd.DataFrame({
+            'strategy_id': [strategy_ids[i] for i in trades['strategy'][executed]],
+            'ticker': [panel['tickers'][i] for i in trades['row'][executed]],
+            'side': np.where(trades['sign'][executed] > 0, 'long', 'short'),
+            'entry_time': index[trades['entry'][executed]],
+            'entry_price': entry_price[executed],
+            'exit_time': index[trades['exit'][executed]],
+            'exit_price': exit_price[executed],
+            'shares': shares[executed],
+            'pnl': pnl[executed],
+            'return': trade_returns[executed],
+            'commission': costs[executed],
+        }, columns=TRADE_COLUMNS)
+
+        equity_curve = pd.Series(equity, index=index, name='equity')
+        drawdown = equity_curve / equity_curve.cummax() - 1
+        # Returns, Sharpe ratio and turnover are annualized at the strategies' bar size
+        periods = bars_per_year(self.timeframe)
+        bar_returns = equity_curve.pct_change().dropna()
+        years = len(equity_curve) / periods if len(equity_curve) else 0
+        final = equity_curve.iloc[-1] if len(equity_curve) else self.initial_cash
+
+        metrics = {
+            'total_return': final / self.initial_cash - 1,
+            'cagr': (final / self.initial_cash) ** (1 / years) - 1 if years and final > 0 else 0.0,
+            'sharpe_ratio': bar_returns.mean() / bar_returns.std() * np.sqrt(periods) if bar_returns.std() > 0 else 0.0,
+            'max_drawdown': drawdown.min() if len(drawdown) else 0.0,
+            'turnover': traded_notional / equity_curve.mean() / years if years else 0.0,
+            'total_trades': int(executed.sum()),
+            'skipped_trades': int((~executed).sum()),
+            'win_rate': float((trade_log['pnl'] > 0).mean()) if len(trade_log) else 0.0,
+            'commissions': float(costs.sum()),
+        }
+
+        return {
+            'equity': equity_curve,
+            'drawdown': drawdown,
+            'trades': trade_log,
+            'metrics': metrics,
+        }
+
+
+def backtest_portfolio(strategies: Dict[str, Dict[str, Any]], frames: Dict[str, pd.DataFrame],
+                       **kwargs) -> Dict[str, Any]:
+    """Run a PortfolioBacktest in one call"""
+    return PortfolioBacktest(strategies, **kwargs).run(frames)
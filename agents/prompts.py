@@ -1,5 +1,10 @@
-from typing import Dict, Any
-from langchain.prompts import PromptTemplate
+from typing import TYPE_CHECKING, Dict, Any
+
+if TYPE_CHECKING:
+    from langchain.prompts import PromptTemplate
+
+# Bump whenever a template changes so cached LLM results from older prompts are not reused
+PROMPT_VERSION = "3"
 
 STRATEGY_EXTRACTION_TEMPLATE = """
 You are a professional trading assistant. Your task is to extract a well-defined trading strategy from the user's input.
@@ -13,13 +18,16 @@ Please extract the following components:
 4. Threshold values
 
 The strategy should be returned in the following format:
-{
+{{
     "ticker": "SYMBOL",
     "indicators": ["INDICATOR1", "INDICATOR2"],
     "conditions": ["CONDITION1", "CONDITION2"],
     "thresholds": [VALUE1, VALUE2],
+    "logic": "and",
     "timeframe": "TIMEFRAME"
-}
+}}
+
+Use "logic": "or" when any one of the conditions should trigger the alert, and "and" when all of them must hold.
 
 Current Context:
 {context}
@@ -50,10 +58,28 @@ Response should include:
 
 Response:"""
 
+CONVERSATION_SUMMARY_TEMPLATE = """
+Summarize this conversation between a trader and a trading assistant for the assistant's future reference.
+
+Summary so far:
+{summary}
+
+New conversation:
+{transcript}
+
+Keep the tickers, indicators, thresholds and preferences the trader mentioned, and drop pleasantries and
+backtest numbers. Extend the summary so far rather than restating it. Answer with the summary only, in at
+most {max_chars} characters.
+
+Summary:"""
+
 class TradingPrompts:
+    version = PROMPT_VERSION
+    
     @staticmethod
-    def create_strategy_extraction_prompt(user_input: str, context: Dict[str, Any] = None) -> PromptTemplate:
+    def create_strategy_extraction_prompt(user_input: str, context: Dict[str, Any] = None) -> "PromptTemplate":
         """Create a prompt for extracting trading strategy from user input"""
+        from langchain.prompts import PromptTemplate
         if context is None:
             context = {}
             
@@ -63,13 +89,20 @@ class TradingPrompts:
         )
     
     @staticmethod
-    def create_strategy_validation_prompt(strategy: Dict[str, Any]) -> PromptTemplate:
+    def create_strategy_validation_prompt(strategy: Dict[str, Any]) -> "PromptTemplate":
         """Create a prompt for validating a trading strategy"""
+        from langchain.prompts import PromptTemplate
         return PromptTemplate(
             input_variables=["strategy"],
             template=STRATEGY_VALIDATION_TEMPLATE
         )
     
+    @staticmethod
+    def format_summary_prompt(summary: str, transcript: str, max_chars: int) -> str:
+        """Prompt text asking the LLM to fold conversation turns into a running summary"""
+        return CONVERSATION_SUMMARY_TEMPLATE.format(summary=summary or "(none)", transcript=transcript,
+                                                    max_chars=max_chars)
+    
     @staticmethod
     def format_strategy_response(strategy: Dict[str, Any], validation_result: Dict[str, Any]) -> str:
         """Format the strategy and validation results into a user-friendly response"""
@@ -98,9 +131,21 @@ class TradingPrompts:
             
             if isinstance(results, dict) and 'error' not in results:
                 response.append(f"- Total Signals: {results['total_signals']}")
-                response.append(f"- Average Return: {results['avg_return']:.2f}%")
+                response.append(f"- Average Return: {results['avg_return']:.2%}")
                 response.append(f"- Win Rate: {results['win_rate']:.1%}")
                 response.append(f"- Sharpe Ratio: {results['sharpe_ratio']:.2f}")
+                if 'annualized_sharpe' in results:
+                    response.append(f"- Annualized Sharpe Ratio: {results['annualized_sharpe']:.2f}")
+                intervals = results.get('intervals') or {}
+                if 'avg_return' in intervals:
+                    confidence = results.get('confidence', 0.95)
+                    response.append(f"- {confidence:.0%} interval of the average return: "
+                                    f"{intervals['avg_return']['low']:.2%} to {intervals['avg_return']['high']:.2%}")
+                    response.append(f"- {confidence:.0%} interval of the annualized Sharpe ratio: "
+                                    f"{intervals['annualized_sharpe']['low']:.2f} to {intervals['annualized_sharpe']['high']:.2f}")
+                if results.get('tested_folds'):
+                    response.append(f"- Profitable in {results['profitable_folds']} of {results['tested_folds']} "
+                                    f"walk-forward test periods")
             elif isinstance(results, dict) and 'error' in results:
                 response.append(f"⚠️ {results['error']}")
             
@@ -0,0 +1,337 @@
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+import os
+import numpy as np
+import pandas as pd
+from . import backtest
+
+# Resamples or runs evaluated per task; large enough to amortize process overhead
+CHUNK_SIZE = 500
+
+# Bound on the elements of one resample matrix, so long trade lists are processed in slices
+MAX_MATRIX_ELEMENTS = 5_000_000
+
+# Statistics with a confidence interval in the report
+STATISTICS = ['avg_return', 'win_rate', 'annualized_sharpe']
+
+
+def trade_signals(df: pd.DataFrame, strategy: Dict[str, Any], horizon: int = backtest.HOLDING_PERIOD,
+                  warmup: int = backtest.WARMUP_BARS) -> Tuple[np.ndarray, np.ndarray]:
+    """Trigger mask after warm-up and forward return of every bar, as backtest.backtest evaluates them"""
+    triggered, returns = backtest.strategy_signals(df, strategy, horizon)
+    triggered[:warmup] = False
+    triggered &= np.isfinite(returns)
+    return triggered, returns
+
+
+def sample_statistics(counts: np.ndarray, sums: np.ndarray, squares: np.ndarray,
+                      wins: np.ndarray, periods: float) -> Dict[str, np.ndarray]:
+    """Per-sample statistics from trade counts, sums of returns and of squared returns, and wins"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = sums / counts
+        std = np.sqrt(np.maximum(squares / counts - mean ** 2, 0.0))
+        sharpe = np.where(std > 1e-12, mean / std, np.nan) * np.sqrt(periods)
+        return {'avg_return': mean, 'win_rate': wins / counts, 'annualized_sharpe': sharpe, 'trades': counts}
+
+
+def bootstrap_chunk(trades: np.ndarray, samples: int, block: int, periods: float, seed) -> Dict[str, np.ndarray]:
+    """Statistics of `samples` circular block-bootstrap resamples of the trade returns.
+
+    Signals on nearby bars share most of their holding period, so trades are drawn in
+    runs of `block` consecutive trades to keep that dependence in the resamples.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(trades)
+    blocks = -(-n // block)
+    offsets = np.arange(block)
+    results = []
+    # Rows per slice so that one index matrix stays under MAX_MATRIX_ELEMENTS
+    rows = max(1, MAX_MATRIX_ELEMENTS // max(1, blocks * block))
+    for start in range(0, samples, rows):
+        count = min(rows, samples - start)
+        starts = rng.integers(0, n, size=(count, blocks))
+        index = ((starts[:, :, None] + offsets) % n).reshape(count, -1)[:, :n]
+        drawn = trades[index]
+        results.append(sample_statistics(np.full(count, float(n)), drawn.sum(axis=1),
+                                         (drawn ** 2).sum(axis=1), (drawn > 0).sum(axis=1), periods))
+    return {key: np.concatenate([result[key] for result in results]) for key in results[0]}
+
+
+def monte_carlo_chunk(triggered: np.ndarray, returns: np.ndarray, runs: int, window: int, horizon: int,
+                      warmup: int, periods: float, seed) -> Dict[str, np.ndarray]:
+    """Statistics of backtests over `runs` windows of `window` bars starting at random bars.
+
+    Each window counts the signals from `warmup` bars after its start whose holding
+    period ends inside it. Prefix sums make every window O(1).
+    """
+    rng = np.random.default_rng(seed)
+    window = min(window, len(returns))
+    traded = np.where(triggered, returns, 0.0)
+    prefix = {name: np.concatenate([[0.0], np.cumsum(values)]) for name, values in (
+        ('counts', triggered.astype(float)), ('sums', traded), ('squares', traded ** 2), ('wins', traded > 0))}
+
+    starts = rng.integers(0, len(returns) - window + 1, size=runs)
+    lo = np.minimum(starts + warmup, len(returns))
+    hi = np.maximum(starts + window - horizon, lo)
+    totals = {name: values[hi] - values[lo] for name, values in prefix.items()}
+    statistics = sample_statistics(totals['counts'], totals['sums'], totals['squares'], totals['wins'], periods)
+    statistics['start'] = starts
+    return statistics
+
+
+def walk_forward(triggered: np.ndarray, returns: np.ndarray, splits: int, horizon: int, warmup: int,
+                 periods: float) -> List[Dict[str, Any]]:
+    """Anchored walk-forward: each fold's test window follows all the bars before it.
+
+    The history after warm-up is cut into `splits + 1` equal parts; fold i is tested on
+    part i + 1 with parts 0..i as its in-sample period. Trades whose holding period runs
+    past the end of a window are left out of it, so no window sees the next one's prices.
+    """
+    bounds = np.linspace(warmup, len(returns), splits + 2).astype(int)
+    index = np.arange(len(returns))
+
+    def window(lo: int, hi: int) -> Dict[str, Any]:
+        end = hi if hi == len(returns) else hi - horizon
+        return summary(returns[triggered & (index >= lo) & (index < end)], periods)
+
+    folds = []
+    for fold in range(splits):
+        folds.append({
+            'fold': fold,
+            'train': (int(bounds[0]), int(bounds[fold + 1])),
+            'test': (int(bounds[fold + 1]), int(bounds[fold + 2])),
+            'in_sample': window(bounds[0], bounds[fold + 1]),
+            'out_of_sample': window(bounds[fold + 1], bounds[fold + 2]),
+        })
+    return folds
+
+
+def summary(trades: np.ndarray, periods: float) -> Dict[str, Any]:
+    """backtest.summarize_returns as plain numbers"""
+    metrics = backtest.summarize_returns(trades, periods)
+    result = {key: float(value) for key, value in metrics.items()}
+    result['total_signals'] = int(metrics['total_signals'])
+    return result
+
+
+def interval(values: np.ndarray, confidence: float) -> Dict[str, float]:
+    """Median and central `confidence` interval of the finite values"""
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return {'low': float('nan'), 'median': float('nan'), 'high': float('nan')}
+    tail = (1 - confidence) / 2 * 100
+    low, median, high = np.percentile(values, [tail, 50, 100 - tail])
+    return {'low': float(low), 'median': float(median), 'high': float(high)}
+
+
+def _signals_task(df: pd.DataFrame, strategy: Dict[str, Any], horizon: int, warmup: int):
+    triggered, returns = trade_signals(df, strategy, horizon, warmup)
+    return triggered, np.where(np.isfinite(returns), returns, 0.0)
+
+
+class _InlineExecutor:
+    """Runs tasks as they are submitted, for workers=1"""
+
+    def submit(self, fn, *args) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class RobustnessAnalysis:
+    """Walk-forward, bootstrap and Monte Carlo analysis of strategies over cached history.
+
+    A single backtest is one draw of how a strategy might have done. This reports how
+    stable it is across time (walk-forward folds), how much its statistics depend on
+    which trades happened (block bootstrap of the trade returns) and on where the test
+    window starts (Monte Carlo over random windows), as confidence intervals.
+
+    Signals are computed once per strategy in a worker process; the resamples and runs
+    then work on the trade returns alone, in chunks of `chunk_size` spread across the
+    pool. iter_results() yields each chunk's result as it finishes. Every chunk has its
+    own seed, so results do not depend on the number of workers.
+    """
+
+    def __init__(self, strategies: Dict[str, Dict[str, Any]], walk_forward_splits: int = 5,
+                 bootstrap_samples: int = 2000, monte_carlo_runs: int = 2000, window_bars: Optional[int] = None,
+                 block: Optional[int] = None, confidence: float = 0.95, horizon: int = backtest.HOLDING_PERIOD,
+                 warmup: int = backtest.WARMUP_BARS, chunk_size: int = CHUNK_SIZE, workers: Optional[int] = None,
+                 seed: int = 0):
+        self.strategies = strategies
+        self.walk_forward_splits = walk_forward_splits
+        self.bootstrap_samples = bootstrap_samples
+        self.monte_carlo_runs = monte_carlo_runs
+        self.window_bars = window_bars
+        self.block = block
+        self.confidence = confidence
+        self.horizon = horizon
+        self.warmup = warmup
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count() or 1
+        self.seed = seed
+
+    def run(self, frames: Dict[str, pd.DataFrame],
+            on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Dict[str, Any]]:
+        """Full report per strategy id; partial results are passed to `on_result` as they arrive"""
+        reports = {}
+        for result in self.iter_results(frames):
+            if on_result is not None:
+                on_result(result)
+            if result['kind'] == 'report':
+                reports[result['strategy_id']] = result['report']
+        return reports
+
+    def iter_results(self, frames: Dict[str, pd.DataFrame]) -> Iterator[Dict[str, Any]]:
+        """Yield results as they finish: the point backtest, walk-forward folds, bootstrap and
+        Monte Carlo progress with the intervals so far, and finally each strategy's report"""
+        missing = sorted({strategy['ticker'].upper() for strategy in self.strategies.values()} - set(frames))
+        if missing:
+            raise ValueError(f"No price data for: {', '.join(missing)}")
+
+        executor = (_InlineExecutor() if self.workers == 1
+                    else ProcessPoolExecutor(max_workers=self.workers))
+        states = {}
+        with executor:
+            pending = {}
+            for position, (strategy_id, strategy) in enumerate(self.strategies.items()):
+                df = frames[strategy['ticker'].upper()]
+                future = executor.submit(_signals_task, df, strategy, self.horizon, self.warmup)
+                pending[future] = (strategy_id, 'signals', position)
+
+            while pending:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    strategy_id, kind, position = pending.pop(future)
+                    result = future.result()
+                    if kind == 'signals':
+                        state = states[strategy_id] = self._start(strategy_id, position, frames, *result)
+                        yield {'strategy_id': strategy_id, 'kind': 'backtest', 'backtest': state['report']['backtest']}
+                        for task_kind, fn, args in self._tasks(state, position):
+                            pending[executor.submit(fn, *args)] = (strategy_id, task_kind, position)
+                        continue
+
+                    state = states[strategy_id]
+                    yield self._collect(state, kind, result)
+                    state['remaining'] -= 1
+                    if state['remaining'] == 0:
+                        yield {'strategy_id': strategy_id, 'kind': 'report', 'report': self._finish(state)}
+
+    def _start(self, strategy_id: str, position: int, frames: Dict[str, pd.DataFrame],
+               triggered: np.ndarray, returns: np.ndarray) -> Dict[str, Any]:
+        strategy = self.strategies[strategy_id]
+        periods = backtest.periods_per_year(strategy, self.horizon)
+        trades = returns[triggered]
+        window = self.window_bars or max(len(returns) // 2, self.warmup + self.horizon + 1)
+        return {
+            'strategy_id': strategy_id,
+            'triggered': triggered,
+            'returns': returns,
+            'trades': trades,
+            'periods': periods,
+            'window': min(window, len(returns)),
+            'index': frames[strategy['ticker'].upper()].index,
+            'samples': {'bootstrap': [], 'monte_carlo': []},
+            'remaining': 0,
+            'report': {'backtest': summary(trades, periods)},
+        }
+
+    def _tasks(self, state: Dict[str, Any], position: int) -> List[Tuple[str, Callable, tuple]]:
+        """Walk-forward, bootstrap and Monte Carlo tasks for one strategy, with one seed per chunk"""
+        tasks = [('walk_forward', walk_forward, (state['triggered'], state['returns'], self.walk_forward_splits,
+                                                  self.horizon, self.warmup, state['periods']))]
+        trades = state['trades']
+        if len(trades) > 1:
+            block = self.block or max(1, int(round(len(trades) ** (1 / 3))))
+            for chunk, start in enumerate(range(0, self.bootstrap_samples, self.chunk_size)):
+                count = min(self.chunk_size, self.bootstrap_samples - start)
+                tasks.append(('bootstrap', bootstrap_chunk,
+                              (trades, count, block, state['periods'], [self.seed, position, 0, chunk])))
+        for chunk, start in enumerate(range(0, self.monte_carlo_runs, self.chunk_size)):
+            count = min(self.chunk_size, self.monte_carlo_runs - start)
+            tasks.append(('monte_carlo', monte_carlo_chunk,
+                          (state['triggered'], state['returns'], count, state['window'], self.horizon,
+                           self.warmup, state['periods'], [self.seed, position, 1, chunk])))
+        state['remaining'] = len(tasks)
+        return tasks
+
+    def _collect(self, state: Dict[str, Any], kind: str, result) -> Dict[str, Any]:
+        """Merge one finished task into the strategy's state and describe the progress"""
+        if kind == 'walk_forward':
+            for fold in result:
+                fold['test_period'] = (str(state['index'][fold['test'][0]]), str(state['index'][fold['test'][1] - 1]))
+            state['report']['walk_forward'] = self._walk_forward_report(result)
+            return {'strategy_id': state['strategy_id'], 'kind': 'walk_forward', **state['report']['walk_forward']}
+
+        state['samples'][kind].append(result)
+        merged = self._merge(state['samples'][kind])
+        total = self.bootstrap_samples if kind == 'bootstrap' else self.monte_carlo_runs
+        return {
+            'strategy_id': state['strategy_id'],
+            'kind': kind,
+            'completed': len(merged['avg_return']),
+            'total': total,
+            **{name: interval(merged[name], self.confidence) for name in STATISTICS},
+        }
+
+    @staticmethod
+    def _merge(chunks: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+        return {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]}
+
+    def _walk_forward_report(self, folds: List[Dict[str, Any]]) -> Dict[str, Any]:
+        tested = [fold['out_of_sample'] for fold in folds if fold['out_of_sample']['total_signals']]
+        return {
+            'folds': folds,
+            'profitable_folds': sum(fold['avg_return'] > 0 for fold in tested),
+            'tested_folds': len(tested),
+            'out_of_sample_return': float(np.mean([fold['avg_return'] for fold in tested])) if tested else 0.0,
+        }
+
+    def _finish(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        report = state['report']
+        for kind in ('bootstrap', 'monte_carlo'):
+            if not state['samples'][kind]:
+                report[kind] = {'samples': 0}
+                continue
+            merged = self._merge(state['samples'][kind])
+            report[kind] = {
+                'samples': len(merged['avg_return']),
+                'confidence': self.confidence,
+                **{name: interval(merged[name], self.confidence) for name in STATISTICS},
+                'probability_positive': float(np.mean(merged['avg_return'][np.isfinite(merged['avg_return'])] > 0))
+                                        if np.isfinite(merged['avg_return']).any() else float('nan'),
+            }
+            if kind == 'monte_carlo':
+                report[kind]['window_bars'] = state['window']
+                report[kind]['median_trades'] = float(np.median(merged['trades']))
+        return report
+
+
+def analyze(df: pd.DataFrame, strategy: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+    """Robustness report for one strategy, computed in this process"""
+    kwargs.setdefault('workers', 1)
+    ticker = strategy.get('ticker', 'TICKER').upper()
+    analysis = RobustnessAnalysis({'strategy': {**strategy, 'ticker': ticker}}, **kwargs)
+    return analysis.run({ticker: df})['strategy']
+
+
+def backtest_with_intervals(df: pd.DataFrame, strategy: Dict[str, Any], samples: int = 1000,
+                            **kwargs) -> Dict[str, Any]:
+    """backtest.backtest's metrics plus bootstrap intervals and walk-forward consistency, for a response"""
+    # The response reports no Monte Carlo statistics, so none are simulated
+    report = analyze(df, strategy, bootstrap_samples=samples, monte_carlo_runs=0, **kwargs)
+    return {
+        **report['backtest'],
+        'intervals': {name: report['bootstrap'][name] for name in STATISTICS if name in report['bootstrap']},
+        'confidence': kwargs.get('confidence', 0.95),
+        'profitable_folds': report['walk_forward']['profitable_folds'],
+        'tested_folds': report['walk_forward']['tested_folds'],
+    }
@@ -0,0 +1,335 @@
+from typing import Any, Dict, Optional
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from aiohttp import web
+from . import robustness
+from .data_server import SharedMarketData, default_root
+from .market_data import DATA_DIR, default_store
+from .memory import ConversationMemory, SessionStore
+from .metrics import default_metrics, incr, observe, profile, span
+from .timeframes import DEFAULT_TIMEFRAME, history_days, normalize_timeframe
+from .trading_agent import TradingAgent
+
+logger = logging.getLogger(__name__)
+
+# Shared-memory readers of each backtest worker process, by root
+_shared_stores: Dict[str, SharedMarketData] = {}
+
+class ServiceOverloaded(Exception):
+    """Raised when more requests are waiting than the service accepts"""
+
+
+class RequestTimeout(Exception):
+    """Raised when a request does not finish within its deadline"""
+
+
+class Session:
+    """Conversation state for one chat session"""
+
+    def __init__(self, session_id: str, clock=time.monotonic, memory: Optional[ConversationMemory] = None):
+        self.id = session_id
+        self.memory = memory or ConversationMemory()
+        self.last_active = clock()
+        # Messages within a session are answered in order
+        self.lock = asyncio.Lock()
+
+
+class TradingService:
+    """Asyncio front end serving many chat sessions from one TradingAgent.
+
+    Each request runs extraction on an I/O thread while the history for the tickers it
+    mentions is fetched in parallel, then backtests in a process pool. At most
+    `max_concurrent` requests run at once and at most `max_pending` wait; beyond that
+    requests are rejected with ServiceOverloaded instead of queueing without bound.
+    With a `session_store`, conversations are saved after every message, so a session
+    evicted from memory or served by another process picks up where it left off. When
+    the agent reads SharedMarketData, backtests of published tickers are sent to the
+    pool as (root, ticker, strategy) and each worker maps the bars itself, so no frame
+    is pickled.
+    """
+
+    def __init__(self, agent: Optional[TradingAgent] = None, max_concurrent: int = 32, max_pending: int = 128,
+                 request_timeout: float = 60.0, llm_timeout: float = 30.0, max_sessions: int = 1000,
+                 session_ttl: float = 3600.0, io_workers: int = 64,
+                 backtest_executor: Optional[Executor] = None, session_store: Optional[SessionStore] = None,
+                 clock=time.monotonic):
+        self.agent = agent or TradingAgent()
+        self.session_store = session_store
+        self.max_concurrent = max_concurrent
+        self.max_pending = max_pending
+        self.request_timeout = request_timeout
+        self.llm_timeout = llm_timeout
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.clock = clock
+
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.stats = {'served': 0, 'rejected': 0, 'timed_out': 0, 'failed': 0}
+
+        self._io = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix='trading-io')
+        self._owns_backtest_executor = backtest_executor is None
+        self._backtests = backtest_executor or ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._pending = 0
+
+    def session(self, session_id: Optional[str] = None) -> Session:
+        """Existing session by id, or a new one; idle and least recently used sessions are evicted"""
+        now = self.clock()
+        for stale_id in [sid for sid, s in self.sessions.items() if now - s.last_active > self.session_ttl]:
+            del self.sessions[stale_id]
+
+        session_id = session_id or uuid.uuid4().hex
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.sessions[session_id] = Session(session_id, self.clock, self.agent.new_memory())
+            if self.session_store is not None:
+                self.session_store.load(session_id, session.memory)
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        self.sessions.move_to_end(session_id)
+        session.last_active = now
+        return session
+
+    def end_session(self, session_id: str) -> bool:
+        found = self.sessions.pop(session_id, None) is not None
+        if self.session_store is not None:
+            found = self.session_store.delete(session_id) or found
+        return found
+
+    async def handle(self, user_input: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Answer one chat message; raises ServiceOverloaded or RequestTimeout"""
+        if self._pending >= self.max_concurrent + self.max_pending:
+            self.stats['rejected'] += 1
+            incr('server.rejected')
+            raise ServiceOverloaded(f"{self._pending} requests in progress")
+
+        session = self.session(session_id)
+        self._pending += 1
+        started = time.perf_counter()
+        try:
+            # The deadline covers waiting for the session and a concurrency slot, not just processing
+            result = await asyncio.wait_for(self._serve(session, user_input, started), self.request_timeout)
+        except asyncio.TimeoutError:
+            self.stats['timed_out'] += 1
+            incr('server.timed_out')
+            raise RequestTimeout(f"Request took longer than {self.request_timeout}s")
+        except Exception:
+            self.stats['failed'] += 1
+            incr('server.failed')
+            raise
+        finally:
+            self._pending -= 1
+
+        self.stats['served'] += 1
+        incr('server.served')
+        result['session_id'] = session.id
+        result['elapsed'] = time.perf_counter() - started
+        return result
+
+    async def _serve(self, session: Session, user_input: str, started: float) -> Dict[str, Any]:
+        # Queued messages of a busy session do not hold concurrency slots
+        async with session.lock:
+            async with self._semaphore:
+                observe('server.queue_wait', time.perf_counter() - started)
+                with span('server.process'):
+                    return await self._process(session, user_input)
+
+    async def _process(self, session: Session, user_input: str) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+
+        # Start loading daily history for any ticker the request names while extraction runs
+        prefetch = {
+            ticker: loop.run_in_executor(self._io, self._history, ticker)
+            for ticker in self.agent.fast_parser.find_tickers(user_input)
+        }
+        try:
+            try:
+                with span('server.extract_strategy'):
+                    strategy, messages = await asyncio.wait_for(
+                        loop.run_in_executor(self._io, self.agent._extract_strategy, user_input, session.memory),
+                        self.llm_timeout
+                    )
+            except asyncio.TimeoutError:
+                strategy, messages = None, [f"Strategy extraction timed out after {self.llm_timeout}s"]
+
+            if not strategy:
+                response = "\n".join(messages)
+                await self._remember(session, user_input, response)
+                return {'response': response, 'strategy': None, 'strategy_id': None}
+
+            validation_result = self.agent._validate_strategy(strategy)
+            strategy_id = None
+            if validation_result['is_valid']:
+                ticker = strategy['ticker']
+                timeframe = normalize_timeframe(strategy.get('timeframe'))
+                root = self._shared_root(ticker, timeframe)
+                with span('server.backtest'):
+                    if root is not None:
+                        validation_result['backtest_results'] = await self._backtest_shared(root, strategy)
+                    else:
+                        history = (prefetch.pop(ticker, None) if timeframe == DEFAULT_TIMEFRAME else None) \
+                            or loop.run_in_executor(self._io, self._history, ticker, timeframe)
+                        validation_result['backtest_results'] = await self._backtest(history, strategy)
+                strategy_id = self.agent._activate_strategy(strategy, session.id)
+                session.memory.add_strategy(strategy, strategy_id)
+
+            response = self.agent.prompts.format_strategy_response(strategy, validation_result)
+            await self._remember(session, user_input, response)
+            return {'response': response, 'strategy': strategy, 'strategy_id': strategy_id}
+        finally:
+            # Prefetches for tickers the strategy did not use still warm the store; do not leave them unobserved
+            for future in prefetch.values():
+                future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    async def _remember(self, session: Session, user_input: str, response: str):
+        """Add a turn to the session's memory and persist it"""
+        # Saving a turn can summarize older ones with the LLM, so it runs on an I/O thread
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._io, session.memory.save_context, {'input': user_input}, {'output': response})
+        if self.session_store is not None:
+            await loop.run_in_executor(self._io, self.session_store.save, session.id, session.memory)
+
+    def _history(self, ticker: str, timeframe: str = DEFAULT_TIMEFRAME):
+        """Bars a backtest runs over, as in TradingAgent._backtest_strategy"""
+        return self.agent.market_data.get_history(ticker, days=history_days(timeframe), timeframe=timeframe)
+
+    async def _backtest(self, history: asyncio.Future, strategy: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the CPU-bound backtest off the event loop once the history has loaded"""
+        try:
+            df = await history
+            if df.empty:
+                return {"error": f"No historical data found for {strategy['ticker']}"}
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._backtests, robustness.backtest_with_intervals, df, strategy)
+        except Exception as e:
+            return {"error": f"Error backtesting strategy: {str(e)}"}
+
+    async def _backtest_shared(self, root: str, strategy: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the backtest in the pool on bars the worker maps from shared memory"""
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._backtests, backtest_shared, root, strategy)
+        except Exception as e:
+            return {"error": f"Error backtesting strategy: {str(e)}"}
+
+    def _shared_root(self, ticker: str, timeframe: str) -> Optional[str]:
+        """Shared-memory directory publishing the ticker at this bar size, if the agent reads one"""
+        market_data = self.agent.market_data
+        if not isinstance(market_data, SharedMarketData) or market_data.version(ticker) is None:
+            return None
+        return market_data.root if market_data.meta.get('timeframe') == timeframe else None
+
+    def close(self):
+        self._io.shutdown(wait=False, cancel_futures=True)
+        if self._owns_backtest_executor:
+            self._backtests.shutdown(wait=False, cancel_futures=True)
+
+
+def backtest_shared(root: str, strategy: Dict[str, Any]) -> Dict[str, Any]:
+    """Process pool task: backtest a strategy on bars mapped from shared memory in this process"""
+    store = _shared_stores.get(root)
+    if store is None:
+        store = _shared_stores[root] = SharedMarketData(root)
+    timeframe = normalize_timeframe(strategy.get('timeframe'))
+    df = store.get_history(strategy['ticker'], days=history_days(timeframe), timeframe=timeframe)
+    if df.empty:
+        return {"error": f"No historical data found for {strategy['ticker']}"}
+    return robustness.backtest_with_intervals(df, strategy)
+
+
+def create_app(service: TradingService) -> web.Application:
+    """HTTP API: POST /chat {"message", "session_id"?}, DELETE /sessions/{id}, GET /stats and GET /metrics"""
+
+    async def chat(request: web.Request) -> web.Response:
+        try:
+            body = await request.json()
+            message = body['message']
+        except (ValueError, KeyError, TypeError):
+            return web.json_response({'error': 'Expected a JSON body with a "message" field'}, status=400)
+
+        try:
+            result = await service.handle(message, body.get('session_id'))
+        except ServiceOverloaded as e:
+            return web.json_response({'error': str(e)}, status=503, headers={'Retry-After': '1'})
+        except RequestTimeout as e:
+            return web.json_response({'error': str(e)}, status=504)
+        except Exception as e:
+            logger.error(f"Request failed: {str(e)}")
+            return web.json_response({'error': f"Error processing input: {str(e)}"}, status=500)
+        return web.json_response(result, dumps=_dumps)
+
+    async def end_session(request: web.Request) -> web.Response:
+        found = service.end_session(request.match_info['session_id'])
+        return web.json_response({'ended': found}, status=200 if found else 404)
+
+    async def stats(request: web.Request) -> web.Response:
+        return web.json_response({**service.stats, 'sessions': len(service.sessions), 'pending': service._pending})
+
+    async def metrics(request: web.Request) -> web.Response:
+        return web.Response(text=default_metrics().render_prometheus(), content_type='text/plain')
+
+    async def on_cleanup(app: web.Application):
+        service.close()
+
+    app = web.Application()
+    app.router.add_post('/chat', chat)
+    app.router.add_delete('/sessions/{session_id}', end_session)
+    app.router.add_get('/stats', stats)
+    app.router.add_get('/metrics', metrics)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def _dumps(value: Any) -> str:
+    # Backtest metrics are numpy scalars
+    return json.dumps(value, default=float)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the trading agent over HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--max-concurrent', type=int, default=32)
+    parser.add_argument('--max-pending', type=int, default=128)
+    parser.add_argument('--timeout', type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument('--log-spans', action='store_true', help="Log every timing span as a JSON line")
+    parser.add_argument('--profile', metavar='PATH', help="Sample stacks while serving and write collapsed stacks to PATH")
+    parser.add_argument('--shared-data', nargs='?', const=default_root(), metavar='ROOT',
+                        help="Read bars published by agents.data_server instead of keeping a private copy")
+    parser.add_argument('--sessions', nargs='?', const=os.path.join(DATA_DIR, 'sessions.sqlite3'), metavar='PATH',
+                        help="Persist conversation memory per session in a SQLite file")
+    parser.add_argument('--llm-summaries', action='store_true',
+                        help="Summarize older conversation turns with the LLM instead of extractively")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    default_metrics().log_spans = args.log_spans or default_metrics().log_spans
+
+    async def app_factory():
+        # The service's semaphore and locks belong to the running loop
+        market_data = SharedMarketData(args.shared_data, fallback=default_store()) if args.shared_data else None
+        agent = TradingAgent(market_data=market_data, llm_summaries=args.llm_summaries)
+        return create_app(TradingService(
+            agent=agent,
+            max_concurrent=args.max_concurrent,
+            max_pending=args.max_pending,
+            request_timeout=args.timeout,
+            session_store=SessionStore(args.sessions) if args.sessions else None
+        ))
+
+    if args.profile:
+        with profile(args.profile):
+            web.run_app(app_factory(), host=args.host, port=args.port)
+    else:
+        web.run_app(app_factory(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+from typing import Any, Dict, List, Tuple
+
+# Signal labels
+RSI_OVERSOLD = 'Oversold - Potential Buy'
+RSI_OVERBOUGHT = 'Overbought - Potential Sell'
+RSI_NEUTRAL = 'Neutral'
+MACD_BULLISH = 'Bullish'
+MACD_BEARISH = 'Bearish'
+VOLUME_HIGH = 'Unusual volume - High'
+VOLUME_LOW = 'Unusual volume - Low'
+VOLUME_NORMAL = 'Normal'
+
+
+def generate_signals(indicators: Dict[str, Any], stats: Dict[str, Any]) -> Dict[str, str]:
+    """Generate trading signals based on technical indicators"""
+    signals = {}
+
+    # RSI signals
+    if indicators['RSI'] < 30:
+        signals['RSI'] = RSI_OVERSOLD
+    elif indicators['RSI'] > 70:
+        signals['RSI'] = RSI_OVERBOUGHT
+    else:
+        signals['RSI'] = RSI_NEUTRAL
+
+    # MACD signals
+    if indicators['MACD']['macd'] > indicators['MACD']['signal']:
+        signals['MACD'] = MACD_BULLISH
+    else:
+        signals['MACD'] = MACD_BEARISH
+
+    # Volume signals
+    if stats['volume'] > stats['avg_volume_10d'] * 1.5:
+        signals['Volume'] = VOLUME_HIGH
+    elif stats['volume'] < stats['avg_volume_10d'] * 0.5:
+        signals['Volume'] = VOLUME_LOW
+    else:
+        signals['Volume'] = VOLUME_NORMAL
+
+    return signals
+
+
+# Labels each indicator's conditions match, for label-based checks
+CONDITION_LABELS = {
+    'RSI': {'below': 'Oversold', 'above': 'Overbought'},
+    'MACD': {'above': MACD_BULLISH, 'below': MACD_BEARISH},
+    'Volume': {'above': VOLUME_HIGH, 'below': VOLUME_LOW},
+}
+
+
+def strategy_entries(strategy: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """(indicator, condition) of each of a strategy's conditions"""
+    indicators = strategy.get('indicators') or [strategy['indicator']]
+    conditions = strategy.get('conditions') or [strategy['condition']]
+    if len(conditions) == 1:
+        conditions = conditions * len(indicators)
+    return list(zip(indicators, conditions))
+
+
+def should_trigger_signal(signal: Dict[str, str], strategy: Dict[str, Any]) -> bool:
+    """Check if current signals match strategy conditions.
+
+    This uses the fixed signal labels, so thresholds are not applied; expressions.compile_strategy
+    evaluates the strategy itself.
+    """
+    matches = []
+    for indicator, condition in strategy_entries(strategy):
+        label = CONDITION_LABELS.get(indicator, {}).get(condition)
+        matches.append(label is not None and indicator in signal and label in signal[indicator])
+
+    if str(strategy.get('logic', 'and')).lower() == 'or':
+        return any(matches)
+    return all(matches)
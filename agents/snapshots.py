@@ -0,0 +1,261 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+from collections import defaultdict
+from datetime import datetime, timedelta
+import heapq
+import logging
+import math
+import threading
+import time
+import numpy as np
+import pandas as pd
+from .expressions import Evaluator, SeriesSource, compile_expression
+from .metrics import incr, span
+from .monitor import WARMUP_DAYS, StoreBarFeed, TickerState
+from .signals import generate_signals
+from .timeframes import bars_per_year
+
+logger = logging.getLogger(__name__)
+
+# Daily returns in the annualized volatility, about the two months the analyzer used to load
+VOLATILITY_BARS = 40
+
+# Price fields of a snapshot's series, the rest being indicators
+PRICE_SERIES = ('open', 'high', 'low', 'close', 'volume')
+
+# How long current() trusts a snapshot when the store sets no max_age
+DEFAULT_MAX_AGE = timedelta(minutes=1)
+
+
+class SnapshotIndex:
+    """Latest indicators, statistics and signals of tracked tickers, kept current as bars land.
+
+    Each ticker is warmed up on `warmup_days` of history, so slow indicators such as
+    SMA_50 and MACD are settled, and then updated one bar at a time with the monitor's
+    TickerState. Updates arrive from the store as it stores new bars (MarketDataStore
+    listeners) and from refresh(), which start() runs on a schedule for stores without
+    listeners. current() also re-checks a ticker for new bars once it was last checked
+    more than `max_age` ago (the store's own max_age by default), so answers never lag
+    the store even when nothing else refreshes the index. A snapshot is replaced, never
+    modified, so get() is a dict lookup and callers may keep what it returns. The last
+    bars of prices and indicators behind it are kept apart in `series`.
+
+    Screening runs over the current snapshots: by signal label through a reverse index,
+    by any statistic or indicator with top(), and by strategy expressions over the last
+    bars of prices and indicators with screen().
+    """
+
+    def __init__(self, store, feed=None, warmup_days: int = WARMUP_DAYS, max_age: Optional[timedelta] = None,
+                 clock: Callable[[], datetime] = datetime.now, timer: Callable[[], float] = time.monotonic):
+        self.store = store
+        self.feed = feed or StoreBarFeed(store, warmup_days)
+        self.timeframe = '1d'
+        if max_age is None:
+            max_age = getattr(store, 'max_age', None) or DEFAULT_MAX_AGE
+        self.max_age = max_age.total_seconds()
+        self.clock = clock
+        self.timer = timer
+
+        self.snapshots: Dict[str, Dict[str, Any]] = {}
+        self.series: Dict[str, Dict[str, np.ndarray]] = {}
+        self._states: Dict[str, TickerState] = {}
+        # When each ticker was last fetched, by `timer`
+        self._checked: Dict[str, float] = {}
+        self._by_signal: Dict[tuple, set] = defaultdict(set)
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        if hasattr(store, 'add_listener'):
+            store.add_listener(self._on_bars)
+
+    def track(self, tickers: Iterable[str]) -> List[str]:
+        """Start indexing tickers, warming each up from history; returns those that have data"""
+        indexed = []
+        for ticker in dict.fromkeys(ticker.upper() for ticker in tickers):
+            with self._lock:
+                if ticker not in self._states:
+                    self._states[ticker] = TickerState(history=VOLATILITY_BARS)
+            self._update(ticker)
+            if ticker in self.snapshots:
+                indexed.append(ticker)
+        return indexed
+
+    def untrack(self, ticker: str):
+        ticker = ticker.upper()
+        with self._lock:
+            self._states.pop(ticker, None)
+            self._checked.pop(ticker, None)
+            self._replace(ticker, None)
+
+    def tracked(self) -> List[str]:
+        with self._lock:
+            return list(self._states)
+
+    def get(self, ticker: str) -> Optional[Dict[str, Any]]:
+        """Current snapshot of a tracked ticker, shaped like TradingAgent._analyze_stock_data's result"""
+        return self.snapshots.get(ticker.upper())
+
+    def current(self, ticker: str) -> Optional[Dict[str, Any]]:
+        """Snapshot of a ticker, tracking it on first use and fetching new bars once it is `max_age` old"""
+        ticker = ticker.upper()
+        checked = self._checked.get(ticker)
+        if checked is None or self.timer() - checked >= self.max_age:
+            if ticker in self._states:
+                self._update(ticker)
+            else:
+                self.track([ticker])
+        return self.snapshots.get(ticker)
+
+    def with_signal(self, indicator: str, label: str) -> List[str]:
+        """Tickers whose current signal for `indicator` is `label`, e.g. ('RSI', RSI_OVERSOLD)"""
+        with self._lock:
+            return sorted(self._by_signal.get((indicator, label), ()))
+
+    def top(self, n: int, by: str = 'volatility', ascending: bool = False) -> List[Dict[str, Any]]:
+        """The `n` snapshots with the highest (or lowest) statistic or indicator `by`"""
+        ranked = [(value, snapshot) for snapshot in list(self.snapshots.values())
+                  for value in [self._value(snapshot, by)] if value is not None and not math.isnan(value)]
+        pick = heapq.nsmallest if ascending else heapq.nlargest
+        return [snapshot for _, snapshot in pick(n, ranked, key=lambda item: item[0])]
+
+    def screen(self, expression: Union[str, Any], sort_by: Optional[str] = None, limit: Optional[int] = None,
+               ascending: bool = False) -> List[Dict[str, Any]]:
+        """Snapshots whose newest bar satisfies a strategy expression such as "rsi < 30 and volume spike" """
+        compiled = compile_expression(expression) if isinstance(expression, str) else expression
+        matches = []
+        with span('snapshots.screen', tickers=len(self.snapshots)):
+            for ticker, snapshot in list(self.snapshots.items()):
+                series = self.series[ticker]
+                source = SeriesSource({name: series[name] for name in PRICE_SERIES if name in series}, series)
+                try:
+                    if bool(compiled.evaluate(Evaluator(source))[-1]):
+                        matches.append(snapshot)
+                except ValueError as e:
+                    logger.warning(f"Cannot screen {snapshot['ticker']}: {str(e)}")
+        if sort_by is not None:
+            matches = [s for s in matches if self._value(s, sort_by) is not None]
+            matches.sort(key=lambda s: self._value(s, sort_by), reverse=not ascending)
+        return matches[:limit] if limit is not None else matches
+
+    def refresh(self) -> int:
+        """Apply bars newer than each ticker's last update; returns how many snapshots changed"""
+        return sum(self._update(ticker) is not None for ticker in self.tracked())
+
+    def start(self, interval: float = 60.0):
+        """Refresh every `interval` seconds in a background thread until stop() is called"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name='snapshot-index', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Snapshot refresh failed: {str(e)}")
+
+    def _on_bars(self, ticker: str, timeframe: str, df: pd.DataFrame):
+        """Store listener: apply newly stored bars of a tracked ticker"""
+        with self._lock:
+            state = self._states.get(ticker)
+            # Warm-up goes through _update, which loads only `warmup_days`
+            if state is None or state.last_committed is None or timeframe != self.timeframe:
+                return
+            self._apply(ticker, state, df[df.index > state.last_committed])
+
+    def _update(self, ticker: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            state = self._states.get(ticker)
+            since = None if state is None else state.last_committed
+        if state is None:
+            return None
+        try:
+            bars = self.feed.fetch(ticker, since)
+        except Exception as e:
+            logger.warning(f"Could not fetch {ticker}: {str(e)}")
+            return None
+        with self._lock:
+            # Bars applied by a listener meanwhile are skipped
+            if state.last_committed is not None and not bars.empty:
+                bars = bars[bars.index > state.last_committed]
+            if self._states.get(ticker) is not state:
+                return None
+            self._checked[ticker] = self.timer()
+            return self._apply(ticker, state, bars)
+
+    def _apply(self, ticker: str, state: TickerState, bars: pd.DataFrame) -> Optional[Dict[str, Any]]:
+        if ticker in self.snapshots and _unchanged(state, bars):
+            return None
+        with span('snapshots.update', ticker=ticker, bars=len(bars)):
+            current = state.update(bars)
+        if current is None:
+            return None
+        incr('snapshots.updates')
+        snapshot = self._snapshot(ticker, current)
+        self._replace(ticker, snapshot, current['series'])
+        return snapshot
+
+    def _snapshot(self, ticker: str, current: Dict[str, Any]) -> Dict[str, Any]:
+        """Analyzer-shaped snapshot from TickerState output"""
+        series = current['series']
+        close = series['close']
+        returns = close[1:] / close[:-1] - 1
+        stats = {
+            'current_price': float(close[-1]),
+            'daily_return': float(returns[-1] * 100) if len(returns) else float('nan'),
+            'volume': current['stats']['volume'],
+            'avg_volume_10d': current['stats']['avg_volume_10d'],
+            # Annualized volatility
+            'volatility': float(np.std(returns, ddof=1) * np.sqrt(bars_per_year(self.timeframe)))
+                          if len(returns) > 1 else float('nan'),
+        }
+        return {
+            'ticker': ticker,
+            'timeframe': self.timeframe,
+            'timestamp': self.clock().isoformat(),
+            'as_of': str(current['timestamp']),
+            'technical_indicators': current['indicators'],
+            'statistics': stats,
+            'signals': generate_signals(current['indicators'], stats),
+        }
+
+    def _replace(self, ticker: str, snapshot: Optional[Dict[str, Any]],
+                 series: Optional[Dict[str, np.ndarray]] = None):
+        previous = self.snapshots.get(ticker)
+        for key in (previous or {}).get('signals', {}).items():
+            self._by_signal[key].discard(ticker)
+        if snapshot is None:
+            self.snapshots.pop(ticker, None)
+            self.series.pop(ticker, None)
+            return
+        for key in snapshot['signals'].items():
+            self._by_signal[key].add(ticker)
+        self.series[ticker] = series
+        self.snapshots[ticker] = snapshot
+
+    def _value(self, snapshot: Dict[str, Any], name: str) -> Optional[float]:
+        """A statistic or indicator of a snapshot by name, e.g. 'volatility', 'RSI' or 'macd_hist'"""
+        if name in snapshot['statistics']:
+            return snapshot['statistics'][name]
+        value = snapshot['technical_indicators'].get(name)
+        if isinstance(value, (int, float)):
+            return float(value)
+        series = self.series.get(snapshot['ticker'], {}).get(name)
+        return float(series[-1]) if series is not None else None
+
+
+def _unchanged(state: TickerState, bars: pd.DataFrame) -> bool:
+    """Whether the bars add nothing to the state: none, or only its pending bar as it was"""
+    if bars.empty:
+        return state.pending is not None
+    if len(bars) > 1 or bars.index[-1] != state.pending_time:
+        return False
+    bar = bars.iloc[-1]
+    return all(bar[column] == value for column, value in state.pending.items())
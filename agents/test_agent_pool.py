@@ -0,0 +1,65 @@
+import subprocess
+import sys
+import threading
+import pytest
+from agents.agent_pool import AgentPool
+from agents.llm_cache import LLMResponseCache
+from agents.market_data import MarketDataStore
+from agents.test_llm_cache import FakeLLM
+from agents.trading_agent import TradingAgent
+
+
+def test_analysis_paths_do_not_import_langchain():
+    script = (
+        "import sys\n"
+        "from agents.trading_agent import TradingAgent\n"
+        "agent = TradingAgent()\n"
+        "agent._extract_strategy('RSI below 30 on NVDA')\n"
+        "print(sorted(m for m in ('langchain', 'openai', 'yfinance') if m in sys.modules))\n"
+    )
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == '[]'
+
+
+def test_components_are_built_once_on_first_use(tmp_path):
+    agent = TradingAgent(market_data=MarketDataStore(data_dir=str(tmp_path)), llm=FakeLLM(),
+                         llm_cache=LLMResponseCache(path=str(tmp_path / 'cache.sqlite3')))
+    assert agent._agent is None and agent._memory is None
+
+    executors = []
+    threads = [threading.Thread(target=lambda: executors.append(agent.agent)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(executor is executors[0] for executor in executors)
+    assert [tool.name for tool in agent.tools] == ['StockDataAnalyzer', 'StrategyValidator', 'BacktestStrategy']
+
+
+def test_pool_lends_warm_agents(tmp_path):
+    store = MarketDataStore(data_dir=str(tmp_path))
+    cache = LLMResponseCache(path=str(tmp_path / 'cache.sqlite3'))
+    pool = AgentPool(size=2, factory=lambda: TradingAgent(market_data=store, llm=FakeLLM(), llm_cache=cache))
+    assert pool.wait_ready(timeout=30)
+    assert all(agent._agent is not None for agent in pool.agents)
+
+    with pool.acquire() as first, pool.acquire() as second:
+        assert first is not second
+        first.memory.save_context({'input': 'hi'}, {'output': 'hello'})
+        with pytest.raises(TimeoutError):
+            with pool.acquire(timeout=0.01):
+                pass
+
+    # Memory does not leak to the next borrower
+    assert first.memory.chat_memory.messages == []
+
+
+def test_pool_reports_build_failures():
+    def broken():
+        raise ValueError("no API key")
+
+    pool = AgentPool(size=1, factory=broken)
+    with pytest.raises(RuntimeError, match="no API key"):
+        with pool.acquire(timeout=5):
+            pass
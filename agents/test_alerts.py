@@ -0,0 +1,208 @@
+import email
+import socketserver
+import threading
+import time
+from datetime import datetime
+from agents.alerts import AlertPipeline, SMTPSender
+from agents.llm_cache import LLMResponseCache
+from agents.market_data import MarketDataStore
+from agents.monitor import ReplayBarFeed, StrategyMonitor
+from agents.test_backtest import load_history
+from agents.test_llm_cache import FakeLLM
+from agents.trading_agent import TradingAgent
+
+RSI = {'indicator': 'RSI', 'condition': 'below', 'threshold': 30}
+
+
+class RecordingSender:
+    """Sender that records batches, failing the first `failures` sends"""
+
+    def __init__(self, failures=0, delay=0.0):
+        self.failures = failures
+        self.delay = delay
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def send(self, recipient, alerts):
+        time.sleep(self.delay)
+        with self.lock:
+            if self.failures > 0:
+                self.failures -= 1
+                raise ConnectionError("mail server unavailable")
+            self.sent.append((recipient, alerts))
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """Minimal local SMTP server keeping the messages it accepts; rejects the first `failures` with 451"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, failures=0):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.failures = failures
+        self.messages = []
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.reply("220 stand-in ready")
+        recipients = []
+        for raw in self.rfile:
+            command = raw.decode().strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply("250 stand-in")
+            elif command.startswith('MAIL FROM'):
+                recipients = []
+                self.reply("250 OK")
+            elif command.startswith('RCPT TO'):
+                recipients.append(raw.decode().split(':', 1)[1].strip().strip('<>'))
+                self.reply("250 OK")
+            elif command == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                for line in self.rfile:
+                    if line in (b'.\r\n', b'.\n'):
+                        break
+                    lines.append(line)
+                if self.server.failures > 0:
+                    self.server.failures -= 1
+                    self.reply("451 Try again later")
+                else:
+                    self.server.messages.append((recipients, email.message_from_bytes(b''.join(lines))))
+                    self.reply("250 Queued")
+            elif command == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+def signal(strategy_id, ticker, email, **strategy):
+    return {'strategy_id': strategy_id, 'ticker': ticker, 'price': 100.0, 'timestamp': '2025-01-16',
+            'signals': {'RSI': 'oversold'}, 'strategy': {'ticker': ticker, 'email': email, **(strategy or RSI)}}
+
+
+def test_a_market_move_sends_each_recipient_one_message():
+    now = [0.0]
+    sender = RecordingSender()
+    pipeline = AlertPipeline(sender, cooldown=3600, batch_window=30, clock=lambda: now[0])
+    tickers = [f"T{i:02d}" for i in range(40)]
+    users = [f"user{i}@example.com" for i in range(10)]
+
+    def selloff():
+        # Every user follows every ticker; some saved the same strategy twice
+        for user in users:
+            for ticker in tickers:
+                pipeline.submit(signal(f"{ticker}_{user}", ticker, user))
+            pipeline.submit(signal(f"{tickers[0]}_{user}_again", tickers[0], user))
+
+    selloff()
+    pipeline._dispatch()
+    assert sender.sent == [] and pipeline.pending() == 400
+    now[0] += 30
+    pipeline.flush(timeout=5)
+    assert sorted(recipient for recipient, _ in sender.sent) == users
+    assert all(len(alerts) == 40 for _, alerts in sender.sent)
+    assert pipeline.stats['deduplicated'] == 10
+
+    # The same firings within the cooldown are dropped; after it they are sent again
+    now[0] += 600
+    selloff()
+    pipeline.flush(timeout=5)
+    assert len(sender.sent) == 10
+    now[0] += 3600
+    pipeline.submit(signal('x', 'T00', users[0]))
+    pipeline.flush(timeout=5)
+    assert len(sender.sent) == 11 and sender.sent[-1][1][0]['condition'] == "T00: rsi < 30"
+
+
+def test_batches_are_split_at_max_batch():
+    sender = RecordingSender()
+    pipeline = AlertPipeline(sender, max_batch=25, batch_window=3600)
+    for i in range(60):
+        pipeline.submit(signal(f"s{i}", f"T{i}", 'a@example.com'))
+    pipeline._dispatch()
+    pipeline.flush(timeout=5)
+    assert sorted(len(alerts) for _, alerts in sender.sent) == [10, 25, 25]
+
+
+def test_failed_sends_are_retried_then_given_up():
+    sender = RecordingSender(failures=2)
+    pipeline = AlertPipeline(sender, retries=2, sleep=lambda delay: None)
+    pipeline.submit(signal('a', 'NVDA', 'a@example.com'))
+    pipeline.flush(timeout=5)
+    assert len(sender.sent) == 1 and pipeline.stats['sent'] == 1
+
+    # A batch that never gets through clears its cooldown, so the next firing is tried again
+    sender.failures = 10
+    pipeline.submit(signal('b', 'AMD', 'a@example.com'))
+    pipeline.flush(timeout=5)
+    assert pipeline.stats['failed'] == 1
+    sender.failures = 0
+    pipeline.submit(signal('b', 'AMD', 'a@example.com'))
+    pipeline.flush(timeout=5)
+    assert [alerts[0]['ticker'] for _, alerts in sender.sent] == ['NVDA', 'AMD']
+
+
+def test_submitting_never_blocks_the_monitor():
+    sender = RecordingSender(delay=0.5)
+    pipeline = AlertPipeline(sender, batch_window=0, workers=2, max_queue=100)
+    pipeline.start()
+    started = time.perf_counter()
+    accepted = [pipeline.submit(signal(f"s{i}", f"T{i}", f"user{i}@example.com")) for i in range(1000)]
+    assert time.perf_counter() - started < 0.5
+    assert accepted.count(True) >= 100 and pipeline.stats['dropped'] == accepted.count(False)
+    pipeline.stop(timeout=0)
+
+
+def test_alerts_are_delivered_over_smtp():
+    server = SMTPStandIn(failures=1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        sender = SMTPSender(host='127.0.0.1', port=server.server_address[1], from_addr='alerts@example.com')
+        pipeline = AlertPipeline(sender, batch_window=0.05, sleep=lambda delay: None)
+        pipeline.start()
+        pipeline.submit(signal('a', 'NVDA', 'a@example.com'))
+        pipeline.submit(signal('b', 'AMD', 'a@example.com, b@example.com',
+                               indicator='MACD', condition='crosses_above', threshold=None))
+        deadline = time.monotonic() + 5
+        while len(server.messages) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        pipeline.stop(timeout=5)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    received = {recipients[0]: message for recipients, message in server.messages}
+    assert sorted(received) == ['a@example.com', 'b@example.com']
+    assert received['a@example.com']['Subject'] == "2 trading alerts: NVDA, AMD"
+    assert "NVDA: rsi < 30 at 100.00" in received['a@example.com'].get_payload()
+    assert received['b@example.com']['Subject'] == "Trading alert: AMD: macd crosses_above macd_signal"
+
+
+def test_agent_wires_alerts_into_a_running_monitor(tmp_path):
+    agent = TradingAgent(market_data=MarketDataStore(data_dir=str(tmp_path / 'data')), llm=FakeLLM(),
+                         llm_cache=LLMResponseCache(path=str(tmp_path / 'cache.sqlite3')))
+    agent.active_strategies['up'] = {'ticker': 'NVDA', 'expression': 'close > 0', 'email': 'a@example.com'}
+    # A monitor whose background thread never runs a cycle: its clock is on a Saturday
+    agent.monitor = StrategyMonitor(agent.active_strategies, ReplayBarFeed({'NVDA': load_history('NVDA')}),
+                                    clock=lambda: datetime(2025, 1, 18, 12, 0))
+    received = []
+    agent.start_monitoring(on_signal=received.append)
+
+    sender = RecordingSender()
+    pipeline = AlertPipeline(sender, batch_window=0)
+    agent.start_monitoring(on_signal=received.append, alerts=pipeline)
+    agent.monitor.run_cycle()
+    pipeline.flush(timeout=5)
+    assert len(received) == 1 and [recipient for recipient, _ in sender.sent] == ['a@example.com']
+
+    # Restarting without alerts stops the pipeline and no longer submits to it
+    agent.start_monitoring(on_signal=received.append)
+    agent.active_strategies['up_again'] = dict(agent.active_strategies['up'])
+    agent.monitor.run_cycle()
+    assert len(received) == 2 and pipeline.stats['submitted'] == 1
+    agent.stop_monitoring()
@@ -0,0 +1,86 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import talib
+from agents.trading_agent import TradingAgent
+from agents import backtest
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+def load_history(ticker):
+    df = pd.read_csv(os.path.join(DATA_DIR, f'{ticker}_historical.csv'), index_col=0)
+    df.index = pd.to_datetime(df.index, utc=True)
+    return df
+
+
+def legacy_indicators(data):
+    # The per-window computation the vectorized engine replaced
+    close = data['Close'].values
+    volume = data['Volume'].values.astype(float)
+    macd, signal, hist = talib.MACD(close)
+    return {
+        'RSI': talib.RSI(close, timeperiod=14)[-1],
+        'MACD': {'macd': macd[-1], 'signal': signal[-1], 'histogram': hist[-1]},
+        'OBV': talib.OBV(close, volume)[-1],
+    }
+
+
+def legacy_backtest(agent, df, strategy):
+    performance = []
+    total = 0
+    for i in range(20, len(df)):
+        window = df.iloc[:i+1]
+        stats = {
+            'volume': window['Volume'].iloc[-1],
+            'avg_volume_10d': window['Volume'].tail(10).mean()
+        }
+        signal = agent._generate_signals(legacy_indicators(window), stats)
+        if agent._should_trigger_signal(signal, strategy):
+            total += 1
+            performance.append(df['Close'].iloc[min(i+5, len(df)-1)] / df['Close'].iloc[i] - 1)
+    return {
+        'total_signals': total,
+        'avg_return': np.mean(performance) if performance else 0,
+        'win_rate': len([p for p in performance if p > 0]) / len(performance) if performance else 0,
+        'sharpe_ratio': np.mean(performance) / np.std(performance) if performance else 0
+    }
+
+
+@pytest.mark.parametrize('ticker', ['NVDA', 'SPY'])
+@pytest.mark.parametrize('condition', ['below', 'above'])
+def test_vectorized_backtest_matches_window_loop(ticker, condition):
+    agent = TradingAgent.__new__(TradingAgent)
+    df = load_history(ticker).tail(252)
+    # The legacy signal labels fix the RSI cuts at 30 and 70
+    threshold = 30 if condition == 'below' else 70
+    strategy = {'ticker': ticker, 'indicator': 'RSI', 'condition': condition, 'threshold': threshold}
+
+    expected = legacy_backtest(agent, df, strategy)
+    result = backtest.backtest(df, strategy)
+
+    assert result['total_signals'] == expected['total_signals']
+    for key in ('avg_return', 'win_rate', 'sharpe_ratio'):
+        assert result[key] == pytest.approx(expected[key], rel=1e-12)
+
+
+def test_latest_values_match_last_window():
+    agent = TradingAgent.__new__(TradingAgent)
+    df = load_history('AMD')
+    indicators = agent._calculate_technical_indicators(df)
+    expected = legacy_indicators(df)
+
+    assert indicators['RSI'] == pytest.approx(expected['RSI'])
+    assert indicators['MACD']['signal'] == pytest.approx(expected['MACD']['signal'])
+    assert indicators['OBV'] == pytest.approx(expected['OBV'])
+
+
+def test_bollinger_band_strategy_triggers_below_lower_band():
+    df = load_history('SMH')
+    result = backtest.backtest(df, {'ticker': 'SMH', 'indicator': 'BB', 'condition': 'below', 'threshold': 'lower'})
+
+    upper, middle, lower = talib.BBANDS(df['Close'].values, timeperiod=20)
+    below = df['Close'].values < lower
+    below[:backtest.WARMUP_BARS] = False
+    assert result['total_signals'] == np.count_nonzero(below) > 0
@@ -0,0 +1,66 @@
+import os
+import numpy as np
+import pandas as pd
+from agents.bar_store import BarStore
+from agents.test_backtest import DATA_DIR, load_history
+
+
+def history():
+    df = load_history('SPY')
+    df.index = df.index.tz_convert('America/New_York')
+    return df
+
+
+def test_round_trip_keeps_types_and_timestamps(tmp_path):
+    df = history()
+    store = BarStore(str(tmp_path))
+    store.write('SPY', df)
+
+    loaded = store.read('SPY')
+
+    assert loaded.index.equals(df.index)
+    assert loaded['Volume'].dtype == np.int64
+    assert loaded['Close'].dtype == np.float64
+    pd.testing.assert_frame_equal(loaded, df, check_names=False, check_index_type=False)
+
+
+def test_append_replaces_overlapping_tail(tmp_path):
+    df = history()
+    store = BarStore(str(tmp_path))
+    store.write('SPY', df.iloc[:-10])
+
+    revised = df.iloc[-11:].copy()
+    revised.iloc[0, revised.columns.get_loc('Close')] = 1.0
+    store.append('SPY', revised)
+
+    loaded = store.read('SPY')
+    assert len(loaded) == len(df)
+    assert loaded['Close'].iloc[-11] == 1.0
+    assert loaded.index.is_monotonic_increasing
+
+
+def test_column_slice_and_date_range(tmp_path):
+    df = history()
+    store = BarStore(str(tmp_path))
+    store.write('SPY', df)
+
+    closes = store.column('SPY', 'Close', 100, 110)
+    assert isinstance(closes, np.memmap)
+    np.testing.assert_array_equal(closes, df['Close'].values[100:110])
+
+    window = store.read('SPY', columns=['Close'], start=df.index[50], end=df.index[59])
+    assert list(window.columns) == ['Close']
+    assert len(window) == 10
+
+
+def test_csv_export_matches_frontend_layout(tmp_path):
+    df = history()
+    store = BarStore(str(tmp_path / 'bars'))
+    store.write('SPY', df)
+    store.export_csv('SPY', str(tmp_path / 'SPY_historical.csv'))
+
+    exported = (tmp_path / 'SPY_historical.csv').read_text().splitlines()
+    with open(os.path.join(DATA_DIR, 'SPY_historical.csv')) as f:
+        original = f.read().splitlines()
+    assert exported[0] == original[0]
+    assert exported[1].split(',')[0] == original[1].split(',')[0] == '2022-01-18 00:00:00-05:00'
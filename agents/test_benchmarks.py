@@ -0,0 +1,29 @@
+import pytest
+from benchmarks.suite import compare
+
+
+def result(median):
+    return {'median': median, 'min': median * 0.9, 'mean': median * 1.1}
+
+
+def test_compare_flags_regressions_beyond_the_threshold():
+    baseline = {'backtest': result(1.0), 'indicators': result(1.0), 'parse': result(1.0), 'load': result(1.0)}
+    results = {'backtest': result(1.3), 'indicators': result(1.2), 'parse': result(0.7), 'load': result(1.0)}
+    rows = {row['name']: row for row in compare(results, baseline, threshold=0.25)}
+
+    assert rows['backtest']['status'] == 'regression' and rows['backtest']['ratio'] == pytest.approx(1.3)
+    assert rows['indicators']['status'] == 'ok'
+    assert rows['parse']['status'] == 'improvement'
+    assert rows['load']['status'] == 'ok'
+    assert compare(results, baseline, threshold=0.35)[0]['status'] == 'ok'
+
+
+def test_compare_reports_missing_and_new_benchmarks():
+    baseline = {'backtest': result(1.0), 'removed': result(1.0)}
+    results = {'backtest': result(1.0), 'added': result(1.0)}
+    rows = compare(results, baseline)
+
+    assert [row['name'] for row in rows] == ['added', 'backtest', 'removed']
+    assert rows[0] == {'name': 'added', 'status': 'new'}
+    assert rows[2] == {'name': 'removed', 'status': 'missing'}
+    assert 'ratio' not in rows[2]
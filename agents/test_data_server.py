@@ -0,0 +1,184 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from agents import robustness
+from agents.data_server import MarketDataServer, SharedMarketData
+from agents.llm_cache import LLMResponseCache
+from agents.market_data import MarketDataStore
+from agents.server import TradingService
+from agents.test_llm_cache import FakeLLM
+from agents.test_market_data import history
+from agents.trading_agent import TradingAgent
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+START, END = pd.Timestamp('2000-01-01'), pd.Timestamp('2030-01-01')
+
+
+def assert_same_bars(result, expected):
+    pd.testing.assert_frame_equal(result, expected[COLUMNS].astype(float), check_freq=False, check_index_type=False)
+
+
+def test_clients_read_published_bars_in_place(tmp_path):
+    df = history()
+    with MarketDataServer(store=MarketDataStore(data_dir=str(tmp_path / 'data')), root=str(tmp_path / 'shm')) as server:
+        server.publish('NVDA', df.iloc[:-10])
+        client = SharedMarketData(root=server.root)
+        before = client.get_history('NVDA', START, END)
+        assert_same_bars(before, df.iloc[:-10])
+        assert np.shares_memory(before['Close'].values, client.arrays('NVDA')['Close'])
+
+        # New bars are appended in place; bars already read do not move
+        server.publish('NVDA', df)
+        assert client.version('NVDA')['generation'] == 1 and client.version('NVDA')['rows'] == len(df)
+        assert_same_bars(client.get_history('NVDA', START, END), df)
+        assert_same_bars(before, df.iloc[:-10])
+
+        # A revised bar goes to a new generation, leaving frames read earlier untouched
+        revised = df.copy()
+        revised.iloc[-1, revised.columns.get_loc('Close')] += 1.0
+        server.publish('NVDA', revised)
+        assert client.version('NVDA')['generation'] == 2
+        assert_same_bars(client.get_history('NVDA', START, END), revised)
+        assert_same_bars(before, df.iloc[:-10])
+
+        assert not server.publish('NVDA', revised)
+        window = client.get_history('NVDA', df.index[100], df.index[109])
+        assert list(window.index) == list(df.index[100:110])
+
+
+def test_sliding_windows_append_in_place(tmp_path):
+    df = history()
+    with MarketDataServer(store=MarketDataStore(data_dir=str(tmp_path / 'data')), root=str(tmp_path / 'shm')) as server:
+        server.publish('NVDA', df.iloc[:-1])
+        client = SharedMarketData(root=server.root)
+        # A refresh window that moved on by a bar drops the first bar and adds a new one
+        assert server.publish('NVDA', df.iloc[1:])
+        version = client.version('NVDA')
+        assert (version['generation'], version['rows']) == (1, len(df))
+        assert_same_bars(client.get_history('NVDA', START, END), df)
+        assert not server.publish('NVDA', df.iloc[5:])
+
+        # Backfilled history is a new generation
+        server.publish('NVDA', pd.concat([df.iloc[:1].shift(-1, freq='D'), df]))
+        assert client.version('NVDA')['generation'] == 2
+
+
+def test_named_slots_are_skipped_until_first_published(tmp_path):
+    with MarketDataServer(store=MarketDataStore(data_dir=str(tmp_path / 'data')), root=str(tmp_path / 'shm')) as server:
+        server._slot('NVDA')
+        client = SharedMarketData(root=server.root)
+        assert client.version('NVDA') is None
+        assert client.get_history('NVDA', START, END).empty
+
+
+def test_unpublished_tickers_use_the_fallback_store(tmp_path):
+    df = history()
+    store = MarketDataStore(data_dir=str(tmp_path / 'data'), fetcher=lambda ticker, start, end: df)
+    with MarketDataServer(store=store, root=str(tmp_path / 'shm')) as server:
+        client = SharedMarketData(root=server.root, fallback=store)
+        result = client.get_history('AMD', START, END)
+        assert len(result) == len(df) and 'AMD' in client.tickers()
+        assert SharedMarketData(root=server.root).get_history('AMD', START, END).empty
+
+
+def test_clients_are_notified_of_new_bars(tmp_path):
+    df = history()
+    with MarketDataServer(store=MarketDataStore(data_dir=str(tmp_path / 'data')), root=str(tmp_path / 'shm')) as server:
+        client = SharedMarketData(root=server.root)
+        epoch = client.epoch
+        threading.Timer(0.05, server.publish, args=('NVDA', df)).start()
+        assert client.wait_for_update(epoch, timeout=5) > epoch
+        assert client.version('NVDA')['rows'] == len(df)
+        assert client.wait_for_update(timeout=0.01) == client.epoch
+
+
+def read_until(root, final_rows, results):
+    # Every frame must be one published state: finished bars at i + 0.5 and the newest bar either
+    # forming (i) or finished, in every column
+    client = SharedMarketData(root=root)
+    results.put(('ready', 0))
+    seen = set()
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        df = client.get_history('SYN', START, END)
+        if df.empty:
+            continue
+        close = df['Close'].values
+        consistent = (np.array_equal(close[:-1], np.arange(len(df) - 1) + 0.5)
+                      and close[-1] in (len(df) - 1, len(df) - 0.5)
+                      and (df[COLUMNS].values == close[:, None]).all())
+        if not consistent:
+            results.put(('torn', len(df)))
+            return
+        seen.add(len(df))
+        if len(df) == final_rows and close[-1] == final_rows - 0.5:
+            break
+    results.put(('ok', len(seen)))
+
+
+def test_worker_processes_see_consistent_snapshots(tmp_path):
+    workers, versions = 4, 400
+    index = pd.date_range('2000-01-01', periods=100 + versions, freq='D', tz='America/New_York')
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    with MarketDataServer(store=MarketDataStore(data_dir=str(tmp_path / 'data')), root=str(tmp_path / 'shm')) as server:
+        readers = [context.Process(target=read_until, args=(server.root, 100 + versions - 1, results))
+                   for _ in range(workers)]
+        for reader in readers:
+            reader.start()
+        assert [results.get(timeout=60)[0] for _ in readers] == ['ready'] * workers
+
+        # Each new bar is appended in place, then revised, which publishes a new generation
+        for rows in range(100, 100 + versions):
+            close = np.arange(rows) + 0.5
+            close[-1] -= 0.5
+            server.publish('SYN', pd.DataFrame({column: close for column in COLUMNS}, index=index[:rows]))
+            close[-1] += 0.5
+            server.publish('SYN', pd.DataFrame({column: close for column in COLUMNS}, index=index[:rows]))
+            time.sleep(0.001)
+        outcomes = [results.get(timeout=60) for _ in readers]
+        for reader in readers:
+            reader.join(timeout=10)
+
+    assert all(outcome[0] == 'ok' for outcome in outcomes), outcomes
+    assert all(outcome[1] > 1 for outcome in outcomes), outcomes
+
+
+class RecordingPool(ProcessPoolExecutor):
+    """Process pool keeping the arguments of every task submitted to it"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.submitted = []
+
+    def submit(self, fn, *args, **kwargs):
+        self.submitted.append(args)
+        return super().submit(fn, *args, **kwargs)
+
+
+def test_server_backtests_read_shared_bars_in_the_workers(tmp_path):
+    df = history()
+    # Bars ending today, so the backtest's window relative to now covers them
+    df.index = df.index + (pd.Timestamp.now(tz=df.index.tz).normalize() - df.index[-1].normalize())
+    strategy = {'ticker': 'NVDA', 'indicator': 'RSI', 'condition': 'below', 'threshold': 40}
+    with MarketDataServer(store=MarketDataStore(data_dir=str(tmp_path / 'data')), root=str(tmp_path / 'shm')) as server:
+        server.publish('NVDA', df)
+        agent = TradingAgent(market_data=SharedMarketData(root=server.root), llm=FakeLLM(),
+                             llm_cache=LLMResponseCache(path=str(tmp_path / 'cache.sqlite3')))
+        pool = RecordingPool(max_workers=1)
+        service = TradingService(agent, backtest_executor=pool)
+        try:
+            root = service._shared_root('NVDA', '1d')
+            assert root == server.root and service._shared_root('AMD', '1d') is None
+            result = asyncio.run(service._backtest_shared(root, strategy))
+        finally:
+            service.close()
+            pool.shutdown()
+
+        expected = robustness.backtest_with_intervals(agent.market_data.get_history('NVDA', days=365), strategy)
+        assert result['total_signals'] == expected['total_signals'] > 0
+        assert pool.submitted == [(root, strategy)]
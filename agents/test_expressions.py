@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+import talib
+from agents import backtest
+from agents.expressions import (
+    ExpressionError, Evaluator, SeriesSource, StrategySet, compile_expression, compile_strategy, strategy_text
+)
+from agents.monitor import ReplayBarFeed, StrategyMonitor
+from agents.panel import build_panel
+from agents.test_backtest import load_history
+from agents.trading_agent import TradingAgent
+
+
+def source(close, volume=None):
+    close = np.asarray(close, dtype=float)
+    volume = np.ones_like(close) if volume is None else np.asarray(volume, dtype=float)
+    return SeriesSource({'open': close, 'high': close, 'low': close, 'close': close, 'volume': volume})
+
+
+def test_equivalent_expressions_compile_to_one_node():
+    assert compile_expression("30 > RSI").node == compile_expression("rsi < 30").node
+    assert (compile_expression("MACD bullish cross and RSI < 30").node
+            == compile_expression("rsi < 30 AND (macd crosses above signal)").node)
+    assert compile_expression("sma(20) > sma(50)").node == compile_expression("sma_20 > sma_50").node
+    assert compile_expression("volume spike").node == compile_expression("volume > 1.5x avg_volume").node
+
+
+@pytest.mark.parametrize('text', ["rsi", "rsi and 3", "rsi <", "price > foo", "rsi < 30 within 0 bars",
+                                  "highest(close) > 1", "rsi(14, 3) < 30"])
+def test_invalid_expressions_are_rejected(text):
+    with pytest.raises(ExpressionError):
+        compile_expression(text)
+
+
+def test_crosses_lags_and_windows():
+    close = [1, 2, 3, 2, 1, 2, 3, 4, 3, 2]
+    evaluator = Evaluator(source(close))
+    crosses = compile_expression("close crosses above 2").evaluate(evaluator)
+    assert list(np.flatnonzero(crosses)) == [2, 6]
+    assert list(np.flatnonzero(compile_expression("close > close[1]").evaluate(evaluator))) == [1, 2, 5, 6, 7]
+    assert list(np.flatnonzero(compile_expression("close crosses above 2 within 2 bars").evaluate(evaluator))) == [2, 3, 6, 7]
+    assert list(np.flatnonzero(compile_expression("close >= 2 for 3 bars").evaluate(evaluator))) == [3, 7, 8, 9]
+    assert list(np.flatnonzero(compile_expression("close > highest(close, 3)").evaluate(evaluator))) == [6, 7]
+    assert list(np.flatnonzero(compile_expression("close between 2 and 3 and not close > 2").evaluate(evaluator))) == [1, 3, 5, 9]
+    # Shared sub-expressions are computed once per evaluator
+    assert ('cmp', '>', ('series', 'close'), ('const', 2.0)) in evaluator.cache
+
+
+def test_strategies_use_their_thresholds_and_indicators():
+    df = load_history('NVDA')
+    close = df['Close'].values
+    volume = df['Volume'].values.astype(float)
+    macd, signal, _ = talib.MACD(close)
+    upper, _, lower = talib.BBANDS(close, timeperiod=20)
+    rsi = talib.RSI(close, timeperiod=14)
+
+    def triggered(strategy):
+        return backtest.strategy_signals(df, {'ticker': 'NVDA', **strategy})[0]
+
+    with np.errstate(invalid='ignore'):
+        cross = (macd > signal) & ~(np.roll(macd, 1) > np.roll(signal, 1))
+        cross[0] = False
+        spike = volume > 1.5 * backtest.rolling_mean(volume, 10)
+        expected = {
+            'macd_cross': cross,
+            'volume_spike': spike,
+            'bb_upper': close > upper,
+            'rsi_or_volume': (rsi < 40) | spike,
+            'rsi_and_macd': (rsi > 60) & (macd > signal),
+        }
+    strategies = {
+        'macd_cross': {'indicator': 'MACD', 'condition': 'crosses_above', 'threshold': None},
+        'volume_spike': {'indicator': 'Volume', 'condition': 'above', 'threshold': '1.5x_average'},
+        'bb_upper': {'indicator': 'BB', 'condition': 'above', 'threshold': 'upper'},
+        'rsi_or_volume': {'indicators': ['RSI', 'Volume'], 'conditions': ['below', 'above'],
+                          'thresholds': [40, '1.5x_average'], 'logic': 'or'},
+        'rsi_and_macd': {'indicators': ['RSI', 'MACD'], 'conditions': ['above', 'above'],
+                         'thresholds': [60, 'signal']},
+    }
+    for name, strategy in strategies.items():
+        mask = triggered(strategy)
+        np.testing.assert_array_equal(mask, expected[name], err_msg=name)
+        assert mask.any(), name
+
+
+def test_panel_evaluation_matches_each_ticker():
+    frames = {ticker: load_history(ticker) for ticker in ('SPY', 'NVDA', 'AMD')}
+    strategies = {
+        'nvda': {'ticker': 'NVDA', 'expression': "rsi < 35 and volume > avg_volume"},
+        'amd': {'ticker': 'AMD', 'expression': "macd crosses_below macd_signal or rsi > 70"},
+        'spy': {'ticker': 'SPY', 'expression': "close crosses_above sma(50) within 3 bars"},
+    }
+    panel = build_panel(frames)
+    masks = StrategySet(strategies).evaluate_panel(panel)
+
+    for strategy_id, strategy in strategies.items():
+        df = frames[strategy['ticker']]
+        row = panel['tickers'].index(strategy['ticker'])
+        listed = ~np.isnan(panel['Close'][row])
+        expected = compile_strategy(strategy).evaluate(SeriesSource.from_frame(df))
+        # Indicators are allowed to settle for a few bars after the seeded start of a panel row
+        np.testing.assert_array_equal(masks[strategy_id][listed][60:], expected[60:], err_msg=strategy_id)
+
+
+def test_monitor_fires_on_macd_crosses():
+    df = load_history('NVDA').tail(300)
+    strategy = {'ticker': 'NVDA', 'indicator': 'MACD', 'condition': 'crosses_above', 'threshold': None}
+    feed = ReplayBarFeed({'NVDA': df}, start=1)
+    received = []
+    monitor = StrategyMonitor({'cross': strategy}, feed, on_signal=received.append, workers=1)
+    while True:
+        monitor.run_cycle()
+        if not feed.advance():
+            break
+
+    triggered = backtest.strategy_signals(df, strategy)[0]
+    assert [event['timestamp'] for event in received] == list(df.index[triggered])
+    assert received
+
+
+def test_validation_reports_bad_conditions():
+    agent = TradingAgent.__new__(TradingAgent)
+    valid = agent._validate_strategy({'ticker': 'NVDA', 'expression': "rsi < 30 and macd bullish cross"})
+    assert valid['is_valid']
+
+    result = agent._validate_strategy({'ticker': 'NVDA', 'expression': "rsi < banana"})
+    assert not result['is_valid'] and 'banana' in result['messages'][0]
+
+    result = agent._validate_strategy({'ticker': 'NVDA', 'indicator': 'RSI', 'condition': 'below', 'threshold': 30,
+                                       'indicators': ['RSI', 'Volume'], 'conditions': ['below', 'above'],
+                                       'thresholds': [30, 'a lot']})
+    assert not result['is_valid']
+    assert strategy_text({'indicators': ['RSI', 'MACD'], 'conditions': ['below', 'crosses_above'],
+                          'thresholds': [30, 'signal'], 'logic': 'or'}) == "(rsi < 30) OR (macd crosses_above macd_signal)"
@@ -0,0 +1,66 @@
+import time
+import pytest
+from agents.fast_parser import FastStrategyParser, normalize_strategy
+from agents.test_llm_cache import FakeLLM, make_agent
+
+
+@pytest.mark.parametrize('user_input, expected', [
+    ("RSI below 30 on NVDA", ('NVDA', 'RSI', 'below', 30)),
+    ("Alert me when Nvidia's RSI drops below 25", ('NVDA', 'RSI', 'below', 25)),
+    ("Tell me when $TSLA is overbought on RSI", ('TSLA', 'RSI', 'above', 70)),
+    ("Advanced Micro Devices RSI above 72.5", ('AMD', 'RSI', 'above', 72.5)),
+    ("Notify me when the MACD crosses above the signal line for Apple", ('AAPL', 'MACD', 'crosses_above', 'signal')),
+    ("SMH volume spikes 1.5x average", ('SMH', 'Volume', 'above', '1.5x_average')),
+    ("Volume on SPY 50% above average", ('SPY', 'Volume', 'above', '1.5x_average')),
+    ("NVDA volume is 20% below average", ('NVDA', 'Volume', 'below', '0.8x_average')),
+])
+def test_simple_requests(user_input, expected):
+    strategy = FastStrategyParser().parse(user_input)
+    assert (strategy['ticker'], strategy['indicator'], strategy['condition'], strategy['threshold']) == expected
+    assert strategy['indicators'] == [expected[1]]
+    assert strategy['timeframe'] == '1d'
+
+
+@pytest.mark.parametrize('user_input', [
+    "RSI below 30 on NVDA and MACD crosses above",  # compound condition
+    "RSI below 30 on NVDA or AMD",                  # two tickers
+    "RSI below 30",                                 # no ticker
+    "Buy NVDA when it looks cheap",                 # no indicator
+    "NVDA RSI between 30 and 40",                   # unsupported condition
+    "RSI below 30 on XYZW",                         # unknown symbol without a cashtag
+    "NVDA RSI is not below 30",                     # negated condition
+    "NVDA RSI isn't above 70",                      # negated condition
+    "NVDA RSI climbs above 30 after being under it",  # two conditions
+    "NVDA RSI above 30, under 70",                  # two conditions without a connective
+    "NVDA drops 5% with RSI below 30",              # price clause joined by "with"
+    "NVDA RSI below 30 but MACD bullish",           # clause joined by "but"
+])
+def test_ambiguous_requests_fall_back(user_input):
+    assert FastStrategyParser().parse(user_input) is None
+
+
+def test_known_tickers_and_company_names():
+    parser = FastStrategyParser(known_tickers=['XYZW'])
+    assert parser.parse("RSI below 30 on XYZW")['ticker'] == 'XYZW'
+
+    parser.add_ticker('PLTR', 'Palantir')
+    assert parser.parse("palantir RSI above 80")['ticker'] == 'PLTR'
+
+
+def test_normalize_llm_format():
+    strategy = normalize_strategy({'ticker': 'nvda', 'indicators': ['RSI'], 'conditions': ['below'], 'thresholds': [30]})
+    assert (strategy['ticker'], strategy['indicator'], strategy['condition'], strategy['threshold']) == ('NVDA', 'RSI', 'below', 30)
+
+
+def test_agent_skips_llm_for_simple_requests(tmp_path):
+    llm = FakeLLM()
+    agent = make_agent(tmp_path, llm)
+
+    started = time.perf_counter()
+    strategy, messages = agent._extract_strategy("RSI below 30 on NVDA")
+    assert time.perf_counter() - started < 0.05
+    assert strategy['ticker'] == 'NVDA' and messages == []
+    assert llm.calls == 0
+
+    agent._extract_strategy("RSI below 30 on NVDA and volume above 2x average")
+    assert llm.calls == 1
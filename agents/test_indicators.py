@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+import talib
+from agents.backtest import calculate_indicator_series
+from agents.indicators import StreamingIndicatorSet
+from agents.test_backtest import load_history
+
+# Bars after which every indicator, including the MACD signal line, is seeded
+WARMUP = 60
+
+
+@pytest.mark.parametrize('ticker', ['NVDA', 'SPY'])
+def test_streaming_matches_talib_after_warmup(ticker):
+    df = load_history(ticker)
+    expected = calculate_indicator_series(df)
+    streaming = StreamingIndicatorSet()
+
+    for i, bar in enumerate(df[['High', 'Low', 'Close', 'Volume']].to_dict('records')):
+        values = streaming.update(bar)
+        if i < WARMUP:
+            continue
+        for name in ('RSI', 'OBV', 'SMA_20', 'SMA_50', 'EMA_20', 'ATR'):
+            assert values[name] == pytest.approx(expected[name][i], rel=1e-9), name
+        for group in ('MACD', 'BB'):
+            for key, value in values[group].items():
+                assert value == pytest.approx(expected[group][key][i], rel=1e-9, abs=1e-9), (group, key)
+
+
+def test_values_are_nan_until_seeded():
+    df = load_history('AMD')
+    closes = df['Close'].values
+    streaming = StreamingIndicatorSet()
+    rsi = talib.RSI(closes, timeperiod=14)
+    macd, _, _ = talib.MACD(closes)
+
+    for i, bar in enumerate(df[['High', 'Low', 'Close', 'Volume']].head(40).to_dict('records')):
+        values = streaming.update(bar)
+        assert np.isnan(values['RSI']) == np.isnan(rsi[i])
+        assert np.isnan(values['MACD']['macd']) == np.isnan(macd[i])
@@ -0,0 +1,69 @@
+from datetime import timedelta
+import threading
+from agents.ingest import BulkDownloader, load_universe
+from agents.market_data import MarketDataStore
+from agents.rate_limit import TokenBucket
+from agents.test_market_data import FakeProvider, history
+
+
+class FlakyProvider(FakeProvider):
+    def __init__(self, frames, failures):
+        super().__init__(frames)
+        self.failures = dict(failures)
+        self.lock = threading.Lock()
+
+    def __call__(self, ticker, start, end):
+        with self.lock:
+            if self.failures.get(ticker, 0) > 0:
+                self.failures[ticker] -= 1
+                raise ConnectionError(f"{ticker} unavailable")
+        return super().__call__(ticker, start, end)
+
+
+def test_partial_failures_are_reported(tmp_path):
+    full = history()
+    frames = {ticker: full for ticker in ('AAA', 'BBB', 'CCC', 'DDD')}
+    provider = FlakyProvider(frames, {'BBB': 1, 'CCC': 10})
+    store = MarketDataStore(data_dir=str(tmp_path), fetcher=provider)
+    downloader = BulkDownloader(store, workers=3, retries=2, sleep=lambda delay: None)
+
+    written = []
+    end = full.index[-1].tz_localize(None).to_pydatetime()
+    report = downloader.run(['aaa', 'BBB', 'CCC', 'DDD'], end - timedelta(days=365), end,
+                            on_result=lambda ticker, df: written.append(ticker))
+
+    assert sorted(report['succeeded']) == ['AAA', 'BBB', 'DDD']
+    assert list(report['failed']) == ['CCC']
+    assert sorted(written) == ['AAA', 'BBB', 'DDD']
+    assert store.bars.tickers() == ['AAA', 'BBB', 'DDD']
+
+
+def test_bulk_run_writes_metadata_once(tmp_path):
+    full = history()
+    tickers = ['T%02d' % i for i in range(20)]
+    store = MarketDataStore(data_dir=str(tmp_path), fetcher=FakeProvider({ticker: full for ticker in tickers}))
+    writes = []
+    write_metadata = store._write_metadata
+    store._write_metadata = lambda: writes.append(1) or write_metadata()
+
+    end = full.index[-1].tz_localize(None).to_pydatetime()
+    report = BulkDownloader(store, workers=4).run(tickers, end - timedelta(days=365), end)
+
+    assert len(report['succeeded']) == len(tickers) and len(writes) == 1
+    reloaded = MarketDataStore(data_dir=str(tmp_path))
+    assert sorted(reloaded.metadata) == sorted(store.metadata) and len(reloaded.metadata) == len(tickers)
+
+
+def test_token_bucket_spaces_out_calls():
+    now = [0.0]
+    bucket = TokenBucket(rate=2, capacity=1, clock=lambda: now[0],
+                         sleep=lambda delay: now.__setitem__(0, now[0] + delay))
+    for _ in range(5):
+        bucket.acquire()
+    assert now[0] == 2.0
+
+
+def test_load_universe(tmp_path):
+    path = tmp_path / 'universe.txt'
+    path.write_text("# semis\nnvda, AMD\nSPY  # index\n\nAMD\n")
+    assert load_universe(str(path)) == ['NVDA', 'AMD', 'SPY']
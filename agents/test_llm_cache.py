@@ -0,0 +1,90 @@
+import json
+import threading
+import time
+from typing import Any, List, Optional
+from langchain_core.language_models.llms import LLM
+from agents.fast_parser import normalize_strategy
+from agents.llm_cache import LLMResponseCache, normalize_input
+from agents.trading_agent import TradingAgent
+
+STRATEGY = {'ticker': 'NVDA', 'indicator': 'RSI', 'condition': 'below', 'threshold': 30}
+
+
+class FakeLLM(LLM):
+    """Local stand-in for the chat model that counts calls"""
+    response: str = json.dumps(STRATEGY)
+    delay: float = 0.0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return 'fake'
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, **kwargs: Any) -> str:
+        self.calls += 1
+        time.sleep(self.delay)
+        return f"Here is the strategy:\n{self.response}"
+
+
+def make_agent(tmp_path, llm):
+    return TradingAgent(llm=llm, llm_cache=LLMResponseCache(path=str(tmp_path / 'cache.sqlite3')))
+
+
+def test_reworded_requests_share_one_llm_call(tmp_path):
+    llm = FakeLLM()
+    agent = make_agent(tmp_path, llm)
+
+    first, _ = agent._extract_strategy("Alert me when NVIDIA RSI goes below 30 and volume spikes")
+    second, _ = agent._extract_strategy("  alert me when nvidia RSI goes below 30 and volume spikes!")
+    third, _ = agent._extract_strategy("Please alert me when NVIDIA RSI goes below 30 and volume spikes.")
+
+    assert first == second == third == normalize_strategy(STRATEGY)
+    assert llm.calls == 1
+    assert agent.llm_cache.stats['hits'] == 2
+
+
+def test_concurrent_identical_requests_are_coalesced(tmp_path):
+    llm = FakeLLM(delay=0.2)
+    agent = make_agent(tmp_path, llm)
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(agent._extract_strategy("RSI below 30 on NVDA or MACD turns negative")[0]))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert llm.calls == 1
+    assert results == [normalize_strategy(STRATEGY)] * 8
+
+
+def test_ttl_lru_and_persistence(tmp_path):
+    now = [1000.0]
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = LLMResponseCache(path=path, ttl=60, max_entries=2, clock=lambda: now[0])
+
+    cache.put('a', {'n': 1})
+    now[0] += 1
+    cache.put('b', {'n': 2})
+    now[0] += 1
+    assert cache.get('a') == {'n': 1}
+    now[0] += 1
+    cache.put('c', {'n': 3})
+
+    # 'b' was least recently used
+    assert cache.get('b') is None
+    assert LLMResponseCache(path=path, clock=lambda: now[0]).get('c') == {'n': 3}
+
+    now[0] += 61
+    assert cache.get('a') is None
+
+
+def test_prompt_version_is_part_of_the_key():
+    assert LLMResponseCache.make_key('RSI below 30', '1') != LLMResponseCache.make_key('RSI below 30', '2')
+    assert normalize_input('Track 1.5x volume, please.') == 'track 1.5x volume'
+    assert normalize_input('NVDA RSI<30') == normalize_input('nvda rsi below 30')
+    assert LLMResponseCache.make_key("Alert me when NVDA RSI < 30 and MACD > 0", 'v', 'm') != \
+        LLMResponseCache.make_key("Alert me when NVDA RSI > 30 and MACD < 0", 'v', 'm')
+    assert LLMResponseCache.make_key("AAPL RSI is not > 70", 'v') != LLMResponseCache.make_key("AAPL RSI is not < 70", 'v')
+    assert LLMResponseCache.make_key("AAPL RSI >= 70", 'v') != LLMResponseCache.make_key("AAPL RSI > 70", 'v')
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+import pandas as pd
+from agents.market_data import MarketDataStore, MARKET_TZ
+from agents.test_backtest import load_history
+
+
+class FakeProvider:
+    def __init__(self, frames):
+        self.frames = frames
+        self.calls = []
+
+    def __call__(self, ticker, start, end):
+        self.calls.append((ticker, start, end))
+        df = self.frames[ticker]
+        lo = pd.Timestamp(start).tz_localize(MARKET_TZ) if pd.Timestamp(start).tz is None else pd.Timestamp(start)
+        hi = pd.Timestamp(end).tz_localize(MARKET_TZ) if pd.Timestamp(end).tz is None else pd.Timestamp(end)
+        return df.loc[lo:hi].copy()
+
+
+def history():
+    df = load_history('NVDA')
+    df.index = df.index.tz_convert(MARKET_TZ)
+    return df
+
+
+def test_second_request_is_served_from_cache(tmp_path):
+    full = history()
+    end = full.index[-1].tz_localize(None).to_pydatetime()
+    provider = FakeProvider({'NVDA': full})
+    store = MarketDataStore(data_dir=str(tmp_path), fetcher=provider, max_age=timedelta(days=1))
+
+    first = store.get_history('NVDA', end=end, days=365)
+    second = store.get_history('NVDA', end=end, days=60)
+
+    assert len(provider.calls) == 1
+    assert second.index[-1] == first.index[-1]
+    assert len(second) < len(first)
+    assert store.freshness('NVDA')['rows'] == len(first)
+
+
+def test_only_missing_tail_is_fetched(tmp_path):
+    full = history()
+    split = full.index[-30].tz_localize(None).to_pydatetime()
+    provider = FakeProvider({'NVDA': full.loc[:full.index[-30]]})
+    store = MarketDataStore(data_dir=str(tmp_path), fetcher=provider, max_age=timedelta(0))
+    store.get_history('NVDA', end=split, days=365)
+
+    provider.frames['NVDA'] = full
+    end = full.index[-1].tz_localize(None).to_pydatetime() + timedelta(hours=1)
+    df = store.get_history('NVDA', end=end, days=365)
+
+    tail_start = provider.calls[-1][1]
+    assert pd.Timestamp(tail_start).tz_convert(MARKET_TZ) == full.index[-30]
+    assert df.index[-1] == full.index[-1]
+    assert not df.index.duplicated().any()
+
+
+def test_existing_csv_is_reused_and_frames_are_evicted(tmp_path):
+    full = history()
+    full.to_csv(tmp_path / 'NVDA_historical.csv')
+    full.to_csv(tmp_path / 'AMD_historical.csv')
+    provider = FakeProvider({'NVDA': full, 'AMD': full})
+    store = MarketDataStore(data_dir=str(tmp_path), fetcher=provider, max_cache_bytes=1)
+
+    end = full.index[-1].tz_localize(None).to_pydatetime()
+    start = datetime(2023, 1, 1)
+    store.get_history('NVDA', start=start, end=end)
+    store.get_history('AMD', start=start, end=end)
+
+    assert provider.calls == []
+    assert list(store._frames) == ['AMD']
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+from typing import Any, List, Optional
+from agents.llm_cache import LLMResponseCache
+from agents.memory import ConversationMemory, SessionStore, estimate_tokens, langchain_memory
+from agents.test_llm_cache import FakeLLM
+from agents.test_server import SlowStore, make_service
+from agents.trading_agent import TradingAgent
+
+REQUEST = "Alert me when NVDA RSI drops below 30 and volume spikes"
+
+
+class RecordingLLM(FakeLLM):
+    """FakeLLM that keeps the prompts it was sent"""
+    prompts: List[str] = []
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, **kwargs: Any) -> str:
+        self.prompts.append(prompt)
+        return super()._call(prompt, stop, **kwargs)
+
+
+def test_context_stays_bounded_over_a_long_conversation():
+    memory = ConversationMemory(max_tokens=400, summary_tokens=100)
+    sizes = []
+    for i in range(200):
+        memory.save_context({'input': f"Alert me when TICK{i} RSI drops below {i % 50} and volume spikes"},
+                            {'output': "Strategy validated. Backtest Results: " + "x" * 200})
+        sizes.append(estimate_tokens(memory.context()))
+
+    assert max(sizes) <= 400 + 50
+    assert max(sizes[100:]) - min(sizes[100:]) < 300
+    assert memory.turns == 200
+    # The newest requests are verbatim, older ones are in the summary
+    assert "TICK199" in memory.messages[-2].content
+    assert "TICK198" in memory.summary and "TICK0 " not in memory.context()
+
+
+def test_strategies_are_kept_once_and_newest_last():
+    memory = ConversationMemory(max_strategies=2)
+    rsi = {'ticker': 'NVDA', 'indicator': 'RSI', 'condition': 'below', 'threshold': 30}
+    macd = {'ticker': 'AMD', 'indicator': 'MACD', 'condition': 'crosses_above', 'threshold': None}
+    memory.add_strategy(rsi, 'a')
+    memory.add_strategy(macd, 'b')
+    memory.add_strategy(rsi, 'c')
+    assert [s['id'] for s in memory.strategies] == ['b', 'c']
+    memory.add_strategy({'ticker': 'SPY', 'expression': 'close > sma(50)'})
+    assert [s['ticker'] for s in memory.strategies] == ['NVDA', 'SPY']
+    assert "NVDA: rsi < 30" in memory.context() and "SPY: close > sma(50)" in memory.context()
+
+
+def test_extraction_prompt_carries_the_conversation(tmp_path):
+    llm = RecordingLLM(prompts=[])
+    agent = TradingAgent(market_data=SlowStore(str(tmp_path / 'data')), llm=llm,
+                         llm_cache=LLMResponseCache(path=str(tmp_path / 'cache.sqlite3')))
+    agent.process_user_input(REQUEST)
+    agent.process_user_input(REQUEST)
+
+    # The second request sees the first turn and the strategy it produced, so it is not a cache hit
+    assert llm.calls == 2
+    assert "Current Context:\n\n" in llm.prompts[0]
+    assert "NVDA: rsi < 30" in llm.prompts[1] and f"User: {REQUEST}" in llm.prompts[1]
+    assert len(agent.memory.chat_memory.messages) == 4
+
+    variables = langchain_memory(agent.memory).load_memory_variables({})['chat_history']
+    assert variables[0].type == 'system' and variables[1].content == REQUEST
+
+
+def test_session_store_round_trip_and_expiry(tmp_path):
+    now = [1000.0]
+    store = SessionStore(path=str(tmp_path / 'sessions.sqlite3'), ttl=60, clock=lambda: now[0])
+    memory = ConversationMemory()
+    memory.save_context({'input': "RSI below 30 on NVDA"}, {'output': "ok"})
+    memory.add_strategy({'ticker': 'NVDA', 'indicator': 'RSI', 'condition': 'below', 'threshold': 30}, 'id1')
+    store.save('s1', memory)
+
+    loaded = SessionStore(path=str(tmp_path / 'sessions.sqlite3'), ttl=60, clock=lambda: now[0]).load('s1')
+    assert loaded.to_dict() == memory.to_dict()
+    now[0] += 61
+    assert store.load('s1') is None
+    store.save('s2', memory)
+    assert len(store) == 1 and store.delete('s2') and not store.delete('s2')
+
+
+def test_server_sessions_resume_from_the_store(tmp_path):
+    store = SessionStore(path=str(tmp_path / 'sessions.sqlite3'))
+    service = make_service(tmp_path, session_store=store)
+    asyncio.run(service.handle(REQUEST, "user1"))
+    service.close()
+
+    # A new service, as after a restart, continues the conversation
+    service = make_service(tmp_path, session_store=store)
+    session = service.session("user1")
+    assert len(session.memory.chat_memory.messages) == 2
+    assert session.memory.strategies[0]['id'].endswith('_user1')
+    assert service.end_session("user1") and store.load("user1") is None
+    service.close()
+
+
+def test_server_summarizes_with_the_llm_off_the_event_loop(tmp_path):
+    service = make_service(tmp_path)
+    service.agent.llm_summaries = True
+    threads = []
+
+    def summarizer(summary, messages, max_tokens):
+        threads.append(threading.current_thread())
+        return f"{summary}\n- {len(messages)} messages".strip()
+
+    session = service.session("user1")
+    session.memory.max_tokens = 40
+    assert session.memory.summarizer.__qualname__.startswith('llm_summarizer')
+    session.memory.summarizer = summarizer
+    for i in range(4):
+        asyncio.run(service.handle(f"Alert me when NVDA RSI drops below {20 + i} and volume spikes", "user1"))
+    assert threads and threading.main_thread() not in threads
+    assert session.memory.summary
+    service.close()
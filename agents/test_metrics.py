@@ -0,0 +1,110 @@
+import json
+import logging
+import threading
+import time
+import urllib.request
+import pandas as pd
+import pytest
+from agents.llm_cache import LLMResponseCache
+from agents.market_data import MarketDataStore
+from agents.metrics import Metrics, SamplingProfiler, default_metrics, serve_metrics
+from agents.test_llm_cache import FakeLLM
+from agents.test_market_data import history
+from agents.trading_agent import TradingAgent
+
+
+def test_spans_and_counters_are_aggregated(caplog):
+    metrics = Metrics(log_spans=True)
+    with caplog.at_level(logging.INFO, logger='agents.metrics'):
+        with metrics.span('outer'):
+            for _ in range(3):
+                with metrics.span('inner', ticker='NVDA'):
+                    metrics.incr('bytes', 100)
+        with pytest.raises(ValueError):
+            with metrics.span('outer'):
+                raise ValueError("boom")
+
+    snapshot = metrics.snapshot()
+    assert snapshot['counters'] == {'bytes': 300}
+    assert snapshot['spans']['inner']['count'] == 3
+    assert snapshot['spans']['outer']['count'] == 2
+    assert snapshot['spans']['outer']['max'] >= snapshot['spans']['inner']['max']
+
+    events = [json.loads(record.getMessage()) for record in caplog.records]
+    assert [event['name'] for event in events] == ['inner', 'inner', 'inner', 'outer', 'outer']
+    assert events[0]['parent'] == 'outer' and events[0]['ticker'] == 'NVDA'
+    assert events[-1]['error'] == 'ValueError'
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics(enabled=False)
+    with metrics.span('stage'):
+        metrics.incr('calls')
+    assert metrics.snapshot() == {'counters': {}, 'spans': {}}
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    metrics = Metrics()
+    metrics.incr('llm_cache.hits', 2)
+    metrics.observe('llm.call', 0.25)
+    server = serve_metrics(port=0, metrics=metrics)
+    try:
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        text = urllib.request.urlopen(f"{base}/metrics").read().decode()
+        data = json.loads(urllib.request.urlopen(f"{base}/metrics.json").read())
+    finally:
+        server.shutdown()
+
+    assert 'trading_agent_llm_cache_hits_total 2' in text
+    assert 'trading_agent_llm_call_seconds_count 1' in text
+    assert data['spans']['llm.call']['p50'] == 0.25
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampling_profiler_writes_collapsed_stacks(tmp_path):
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name='busy')
+    worker.start()
+    try:
+        with SamplingProfiler(interval=0.001, thread_ids=[worker.ident]) as profiler:
+            time.sleep(0.2)
+    finally:
+        stop.set()
+        worker.join()
+
+    path = tmp_path / 'profile.folded'
+    profiler.write(str(path))
+    lines = path.read_text().splitlines()
+    assert profiler.samples > 0 and lines
+    stack, count = lines[0].rsplit(' ', 1)
+    assert stack.startswith('busy;') and 'busy_loop (test_metrics.py' in stack
+    assert int(count) > 0
+
+
+def test_agent_pipeline_is_instrumented(tmp_path):
+    # The checked-in history, shifted to end today, stands in for the provider
+    df = history()
+    df.index = df.index + (pd.Timestamp.now(tz=df.index.tz).normalize() - df.index[-1].normalize())
+    store = MarketDataStore(data_dir=str(tmp_path / 'data'), fetcher=lambda ticker, start, end: df)
+    agent = TradingAgent(market_data=store, llm=FakeLLM(),
+                         llm_cache=LLMResponseCache(path=str(tmp_path / 'cache.sqlite3')))
+    metrics = default_metrics()
+    metrics.reset()
+
+    agent.process_user_input("Alert me when NVDA RSI drops below 30")
+    agent.process_user_input("Alert me when NVIDIA RSI goes below 30 and volume spikes")
+
+    snapshot = metrics.snapshot()
+    for name in ('agent.process_user_input', 'agent.extract_strategy', 'agent.backtest_strategy',
+                 'parser.fast', 'llm.call', 'market_data.get_history', 'market_data.fetch',
+                 'indicators.calculate', 'backtest.run'):
+        assert snapshot['spans'][name]['count'] >= 1, name
+    counters = snapshot['counters']
+    assert counters['parser.fast_hits'] == 1 and counters['parser.fast_misses'] == 1
+    assert counters['llm.calls'] == 1 and counters['llm_cache.misses'] == 1
+    assert counters['market_data.fetch_bytes'] > 0
+    assert counters['market_data.memory_hits'] >= 1
@@ -0,0 +1,70 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import numpy as np
+from agents import backtest
+from agents.monitor import ReplayBarFeed, StrategyMonitor, is_market_open
+from agents.test_backtest import load_history
+from agents.test_timeframes import minute_bars
+from agents.timeframes import resample_bars
+
+
+def test_replay_triggers_match_backtest_transitions():
+    frames = {ticker: load_history(ticker) for ticker in ('NVDA', 'AMD')}
+    strategies = {
+        'nvda_oversold': {'ticker': 'NVDA', 'indicator': 'RSI', 'condition': 'below', 'threshold': 30},
+        'nvda_overbought': {'ticker': 'NVDA', 'indicator': 'RSI', 'condition': 'above', 'threshold': 70},
+        'amd_overbought': {'ticker': 'AMD', 'indicator': 'RSI', 'condition': 'above', 'threshold': 70},
+    }
+    feed = ReplayBarFeed(frames, start=1)
+    received = []
+    monitor = StrategyMonitor(strategies, feed, on_signal=received.append, workers=2)
+
+    cycles = 0
+    while True:
+        monitor.run_cycle()
+        cycles += 1
+        if not feed.advance():
+            break
+
+    # One fetch per ticker per cycle, however many strategies share it
+    assert feed.fetches == {'NVDA': cycles, 'AMD': cycles}
+
+    for strategy_id, strategy in strategies.items():
+        df = frames[strategy['ticker']]
+        series = backtest.calculate_indicator_series(df)
+        volume = df['Volume'].values.astype(float)
+        masks = backtest.generate_signal_masks(series, volume, backtest.rolling_mean(volume, 10))
+        triggered = backtest.strategy_mask(masks, strategy, len(df))
+        rising = triggered & ~np.concatenate([[False], triggered[:-1]])
+
+        fired = [event['timestamp'] for event in received if event['strategy_id'] == strategy_id]
+        assert fired == list(df.index[rising])
+        assert fired
+
+
+def test_intraday_strategies_are_evaluated_on_their_own_bars():
+    daily = load_history('NVDA')
+    bars = resample_bars(minute_bars(sessions=5), '15m')
+    strategies = {
+        'daily': {'ticker': 'NVDA', 'indicator': 'RSI', 'condition': 'below', 'threshold': 40},
+        'intraday': {'ticker': 'NVDA', 'indicator': 'RSI', 'condition': 'below', 'threshold': 40, 'timeframe': '15m'},
+    }
+    feed = ReplayBarFeed({'NVDA': daily, ('NVDA', '15m'): bars}, start=1)
+    received = []
+    monitor = StrategyMonitor(strategies, feed, on_signal=received.append, workers=2)
+    for _ in range(len(bars)):
+        monitor.run_cycle()
+        feed.advance()
+
+    assert feed.fetches == {'NVDA': len(bars), ('NVDA', '15m'): len(bars)}
+    triggered, _ = backtest.strategy_signals(bars, strategies['intraday'])
+    rising = triggered & ~np.concatenate([[False], triggered[:-1]])
+    fired = [event['timestamp'] for event in received if event['strategy_id'] == 'intraday']
+    assert fired == list(bars.index[rising]) and fired
+
+
+def test_market_hours():
+    tz = ZoneInfo('America/New_York')
+    assert is_market_open(datetime(2024, 6, 3, 10, 0, tzinfo=tz))
+    assert not is_market_open(datetime(2024, 6, 3, 16, 0, tzinfo=tz))
+    assert not is_market_open(datetime(2024, 6, 1, 11, 0, tzinfo=tz))
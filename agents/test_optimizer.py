@@ -0,0 +1,71 @@
+import pytest
+from agents import backtest
+from agents.optimizer import ParameterSweep
+from agents.test_backtest import load_history
+
+
+def frames():
+    return {ticker: load_history(ticker).tail(252) for ticker in ('NVDA', 'AMD')}
+
+
+def test_default_parameters_reproduce_backtest():
+    data = frames()
+    template = {'ticker': 'NVDA', 'indicator': 'RSI', 'condition': 'below', 'threshold': 30}
+    results = ParameterSweep(template, {'ticker': ['NVDA', 'AMD']}, workers=1).run(data)
+
+    for ticker in ('NVDA', 'AMD'):
+        expected = backtest.backtest(data[ticker], {**template, 'ticker': ticker})
+        row = results[results['ticker'] == ticker].iloc[0]
+        assert row['total_signals'] == expected['total_signals']
+        assert row['win_rate'] == pytest.approx(expected['win_rate'])
+
+
+def test_process_pool_matches_in_process_run():
+    grid = {
+        'ticker': ['NVDA', 'AMD'],
+        'condition': ['below', 'above'],
+        'threshold': [25, 30, 35, 65, 70],
+        'rsi_period': [7, 14],
+        'horizon': [3, 5, 10],
+    }
+    template = {'ticker': 'NVDA', 'indicator': 'RSI', 'condition': 'below', 'threshold': 30}
+    data = frames()
+
+    serial = ParameterSweep(template, grid, workers=1).run(data)
+    parallel = ParameterSweep(template, grid, workers=2).run(data)
+
+    assert len(serial) == 2 * 2 * 5 * 2 * 3
+    assert serial.equals(parallel)
+    ranked = serial['sharpe_ratio'].dropna()
+    assert ranked.is_monotonic_decreasing
+
+
+@pytest.mark.parametrize('template, grid', [
+    ({'indicator': 'MACD', 'condition': 'crosses_above', 'threshold': 'signal'}, {'horizon': [3, 5]}),
+    ({'indicator': 'Volume', 'condition': 'above', 'threshold': '1.5x_average'},
+     {'threshold': ['1.2x_average', '2x_average']}),
+    ({'indicator': 'BB', 'condition': 'below', 'threshold': 'lower'}, {'condition': ['below', 'above']}),
+])
+def test_any_indicator_matches_backtest(template, grid):
+    data = frames()
+    template = {'ticker': 'NVDA', **template}
+    results = ParameterSweep(template, grid, workers=2).run(data)
+    for row in results.to_dict('records'):
+        strategy = {**template, 'condition': row['condition'], 'threshold': row['threshold']}
+        expected = backtest.backtest(data['NVDA'], strategy, horizon=row['horizon'])
+        assert row['total_signals'] == expected['total_signals'] > 0
+        assert row['avg_return'] == pytest.approx(expected['avg_return'])
+
+
+def test_one_ticker_grid_is_split_across_workers():
+    template = {'ticker': 'NVDA', 'indicator': 'RSI', 'condition': 'below', 'threshold': 30}
+    sweep = ParameterSweep(template, {'threshold': list(range(20, 45)), 'horizon': [3, 5, 10]}, workers=4)
+    tasks = sweep.tasks()
+    assert len(tasks) >= 4
+    assert sorted(combo['threshold'] for *_, combos in tasks for combo in combos) == \
+        sorted(combo['threshold'] for combo in sweep.combinations())
+
+
+def test_unknown_parameter_is_rejected():
+    with pytest.raises(ValueError):
+        ParameterSweep({'ticker': 'NVDA', 'indicator': 'RSI'}, {'stop_loss': [0.05]})
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from agents.backtest import calculate_indicator_series
+from agents.panel import build_panel, calculate_panel_indicators, select_tickers
+from agents.test_backtest import load_history
+
+TICKERS = ['SPY', 'SMH', 'NVDA', 'AMD']
+
+
+def compare(actual, expected):
+    np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+    mask = ~np.isnan(expected)
+    np.testing.assert_allclose(actual[mask], expected[mask], rtol=1e-9, atol=1e-6)
+
+
+def test_panel_matches_per_ticker_talib():
+    frames = {ticker: load_history(ticker) for ticker in TICKERS}
+    # A ticker that only listed part way through the panel
+    frames['NEW'] = frames['NVDA'].iloc[300:]
+
+    panel = build_panel(frames)
+    result = calculate_panel_indicators(panel['Close'], panel['High'], panel['Low'], panel['Volume'])
+
+    for row, ticker in enumerate(panel['tickers']):
+        offset = len(panel['index']) - len(frames[ticker])
+        expected = calculate_indicator_series(frames[ticker])
+        for name, value in expected.items():
+            if isinstance(value, dict):
+                for key, series in value.items():
+                    compare(result[name][key][row, offset:], series)
+            else:
+                compare(result[name][row, offset:], value)
+        assert np.isnan(result['RSI'][row, :offset]).all()
+
+
+def test_gaps_on_the_union_calendar_match_each_tickers_own_bars():
+    frames = {ticker: load_history(ticker) for ticker in TICKERS}
+    # Bars missing from one ticker part way through, e.g. a trading halt
+    frames['NVDA'] = frames['NVDA'].drop(frames['NVDA'].index[[100, 400, 401, 402]])
+
+    panel = build_panel(frames)
+    result = calculate_panel_indicators(panel['Close'], panel['High'], panel['Low'], panel['Volume'])
+
+    for row, ticker in enumerate(panel['tickers']):
+        positions = panel['index'].get_indexer(frames[ticker].index)
+        missing = np.setdiff1d(np.arange(len(panel['index'])), positions)
+        for name, value in calculate_indicator_series(frames[ticker]).items():
+            for key, series in (value.items() if isinstance(value, dict) else [(None, value)]):
+                actual = result[name][key] if key else result[name]
+                compare(actual[row, positions], series)
+                assert np.isnan(actual[row, missing]).all()
+
+
+def test_screen_is_one_array_operation():
+    frames = {ticker: load_history(ticker) for ticker in TICKERS}
+    panel = build_panel(frames)
+    result = calculate_panel_indicators(panel['Close'], panel['High'], panel['Low'], panel['Volume'])
+
+    at = 400
+    oversold = select_tickers(panel['tickers'], result['RSI'][:, at] < 50)
+    expected = [ticker for ticker in TICKERS if calculate_indicator_series(frames[ticker])['RSI'][at] < 50]
+    assert oversold == expected
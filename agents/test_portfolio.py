@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from agents import backtest
+from agents.portfolio import PortfolioBacktest, backtest_portfolio
+from agents.test_backtest import load_history
+
+TICKERS = ['SPY', 'SMH', 'NVDA', 'AMD']
+
+
+def frames():
+    return {ticker: load_history(ticker) for ticker in TICKERS}
+
+
+def test_single_strategy_compounds_forward_returns():
+    df = load_history('NVDA')
+    strategy = {'ticker': 'NVDA', 'indicator': 'RSI', 'condition': 'below', 'threshold': 30}
+    result = backtest_portfolio({'nvda': strategy}, {'NVDA': df}, position_size=1.0,
+                                commission=0.0, slippage=0.0, execution='close')
+
+    # Expected trades: the vectorized backtest's triggers, skipping those inside an open trade
+    series = backtest.calculate_indicator_series(df)
+    volume = df['Volume'].values.astype(float)
+    triggered = backtest.strategy_mask(
+        backtest.generate_signal_masks(series, volume, backtest.rolling_mean(volume, 10)), strategy, len(df))
+    triggered[:backtest.WARMUP_BARS] = False
+    entries, next_free = [], 0
+    for bar in np.flatnonzero(triggered):
+        if next_free <= bar < len(df) - 1:
+            entries.append(bar)
+            next_free = min(bar + backtest.HOLDING_PERIOD, len(df) - 1)
+
+    trades = result['trades']
+    assert list(trades['entry_time']) == list(df.index[entries])
+    returns = backtest.forward_returns(df['Close'].values)[entries]
+    np.testing.assert_allclose(trades['return'].values, returns, rtol=1e-9)
+    assert result['equity'].iloc[-1] == pytest.approx(1_000_000 * np.prod(1 + returns))
+
+
+def test_cash_is_conserved_across_overlapping_strategies():
+    strategies = {
+        f"{ticker}_{condition}_{side}": {'ticker': ticker, 'indicator': 'RSI', 'condition': condition,
+                                         'threshold': 30, 'side': side, 'holding_period': holding}
+        for ticker in TICKERS
+        for condition, side, holding in (('below', 'long', 5), ('above', 'short', 10), ('above', 'long', 3))
+    }
+    result = PortfolioBacktest(strategies, position_size=0.4).run(frames())
+    trades, metrics = result['trades'], result['metrics']
+
+    # Every trade is closed by the last bar, so the final equity is cash plus realized profit
+    assert result['equity'].iloc[-1] == pytest.approx(1_000_000 + trades['pnl'].sum())
+    assert metrics['commissions'] == pytest.approx(trades['commission'].sum())
+    assert set(trades['side']) == {'long', 'short'}
+    assert (trades['exit_time'] > trades['entry_time']).all()
+    assert (result['drawdown'] <= 0).all() and metrics['max_drawdown'] < 0
+    assert metrics['turnover'] > 0 and metrics['total_trades'] == len(trades)
+
+
+def test_long_entries_are_limited_by_cash():
+    strategies = {f"{ticker}_below": {'ticker': ticker, 'indicator': 'RSI', 'condition': 'below', 'threshold': 30}
+                  for ticker in TICKERS}
+    result = backtest_portfolio(strategies, frames(), position_size=1.0)
+    notional = (result['trades']['shares'] * result['trades']['entry_price']).values
+    # Four strategies each asking for all of equity never spend more than the account holds
+    assert notional.max() <= result['equity'].max()
+    assert result['metrics']['cagr'] > -1
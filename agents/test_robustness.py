@@ -0,0 +1,99 @@
+import json
+import time
+import warnings
+import numpy as np
+import pytest
+from agents import backtest, robustness
+from agents.fast_parser import normalize_strategy
+from agents.prompts import TradingPrompts
+from agents.robustness import (
+    RobustnessAnalysis, analyze, backtest_with_intervals, bootstrap_chunk, monte_carlo_chunk, summary, trade_signals
+)
+from agents.test_backtest import load_history
+
+RSI = {'ticker': 'NVDA', 'indicator': 'RSI', 'condition': 'below', 'threshold': 40}
+
+
+def test_backtest_reports_an_annualized_sharpe_ratio():
+    df = load_history('NVDA')
+    result = backtest.backtest(df, RSI)
+    assert result['annualized_sharpe'] == pytest.approx(result['sharpe_ratio'] * np.sqrt(252 / 5))
+
+    report = analyze(df, RSI)
+    assert report['backtest']['total_signals'] == result['total_signals']
+    assert report['backtest']['avg_return'] == pytest.approx(result['avg_return'])
+    assert report['backtest']['annualized_sharpe'] == pytest.approx(result['annualized_sharpe'])
+
+
+def test_trades_without_spread_have_a_zero_sharpe_ratio():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        for trades in (np.array([0.02]), np.array([0.01, 0.01, 0.01])):
+            assert backtest.summarize_returns(trades, 50)['annualized_sharpe'] == 0
+            assert summary(trades, 50)['annualized_sharpe'] == 0
+
+
+def test_monte_carlo_windows_match_direct_backtests():
+    df = load_history('NVDA')
+    triggered, returns = trade_signals(df, RSI)
+    periods = backtest.periods_per_year(RSI)
+    runs = monte_carlo_chunk(triggered, returns, 50, 200, 5, 20, periods, seed=1)
+    index = np.arange(len(returns))
+    for start, avg_return, trades in zip(runs['start'], runs['avg_return'], runs['trades']):
+        expected = summary(returns[triggered & (index >= start + 20) & (index < start + 195)], periods)
+        assert trades == expected['total_signals']
+        assert avg_return == pytest.approx(expected['avg_return']) or trades == 0
+
+
+def test_bootstrap_intervals_cover_the_mean():
+    rng = np.random.default_rng(0)
+    trades = rng.normal(0.01, 0.02, size=400)
+    samples = bootstrap_chunk(trades, 2000, 1, 50.4, seed=2)
+    low, high = np.percentile(samples['avg_return'], [2.5, 97.5])
+    assert low < 0.01 < high
+    # About two standard errors either side
+    assert high - low == pytest.approx(4 * 0.02 / np.sqrt(400), rel=0.2)
+
+
+def test_results_stream_in_and_do_not_depend_on_workers():
+    frames = {ticker: load_history(ticker) for ticker in ('NVDA', 'AMD', 'SPY')}
+    strategies = {f"{ticker}_{threshold}": {**RSI, 'ticker': ticker, 'threshold': threshold}
+                  for ticker in frames for threshold in (35, 45)}
+    kwargs = dict(bootstrap_samples=3000, monte_carlo_runs=3000, chunk_size=1000)
+
+    streamed = []
+    serial = RobustnessAnalysis(strategies, workers=1, **kwargs).run(frames, on_result=streamed.append)
+    started = time.perf_counter()
+    parallel = RobustnessAnalysis(strategies, workers=2, **kwargs).run(frames)
+    assert time.perf_counter() - started < 10
+
+    # NaN Sharpe ratios of folds without spread compare equal as JSON
+    assert json.dumps(serial, sort_keys=True) == json.dumps(parallel, sort_keys=True)
+    for strategy_id in strategies:
+        events = [event for event in streamed if event['strategy_id'] == strategy_id]
+        assert events[0]['kind'] == 'backtest' and events[-1]['kind'] == 'report'
+        assert [event['completed'] for event in events if event['kind'] == 'bootstrap'] == [1000, 2000, 3000]
+        report = serial[strategy_id]
+        assert report['bootstrap']['samples'] == report['monte_carlo']['samples'] == 3000
+        assert len(report['walk_forward']['folds']) == 5
+        assert report['bootstrap']['avg_return']['low'] <= report['backtest']['avg_return'] \
+            <= report['bootstrap']['avg_return']['high']
+
+
+def test_walk_forward_windows_do_not_overlap():
+    df = load_history('SPY')
+    report = analyze(df, RSI, walk_forward_splits=4)
+    folds = report['walk_forward']['folds']
+    assert [fold['test'][0] for fold in folds[1:]] == [fold['test'][1] for fold in folds[:-1]]
+    assert all(fold['train'] == (20, fold['test'][0]) for fold in folds)
+    tested = sum(fold['out_of_sample']['total_signals'] for fold in folds)
+    assert tested + folds[0]['in_sample']['total_signals'] <= report['backtest']['total_signals']
+
+
+def test_response_reports_confidence_intervals(monkeypatch):
+    monkeypatch.setattr(robustness, 'monte_carlo_chunk', lambda *args: pytest.fail("Monte Carlo runs are not reported"))
+    results = backtest_with_intervals(load_history('NVDA'), RSI)
+    validation = {'is_valid': True, 'messages': [], 'backtest_results': results}
+    response = TradingPrompts.format_strategy_response(normalize_strategy(RSI), validation)
+    assert "95% interval of the average return" in response
+    assert "walk-forward test periods" in response
@@ -0,0 +1,119 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from agents.llm_cache import LLMResponseCache
+from agents.market_data import MarketDataStore
+from agents.server import RequestTimeout, ServiceOverloaded, TradingService, create_app
+from agents.test_backtest import load_history
+from agents.test_llm_cache import FakeLLM
+from agents.trading_agent import TradingAgent
+
+
+class SlowStore(MarketDataStore):
+    """Store serving the checked-in history after a fixed delay"""
+
+    def __init__(self, data_dir, delay=0.0):
+        super().__init__(data_dir=data_dir)
+        self.delay = delay
+        self.requests = []
+
+    def get_history(self, ticker, start=None, end=None, days=None, force_refresh=False, timeframe='1d'):
+        self.requests.append((time.perf_counter(), ticker, timeframe))
+        time.sleep(self.delay)
+        return load_history(ticker).tail(days or 365)
+
+
+def make_service(tmp_path, llm_delay=0.0, store_delay=0.0, **kwargs):
+    agent = TradingAgent(
+        market_data=SlowStore(str(tmp_path / 'data'), store_delay),
+        llm=FakeLLM(delay=llm_delay),
+        llm_cache=LLMResponseCache(path=str(tmp_path / 'cache.sqlite3'))
+    )
+    kwargs.setdefault('backtest_executor', ThreadPoolExecutor(2))
+    return TradingService(agent, **kwargs)
+
+
+def test_sessions_are_served_concurrently(tmp_path):
+    service = make_service(tmp_path, llm_delay=0.3, store_delay=0.3, backtest_executor=ProcessPoolExecutor(2))
+
+    async def run():
+        return await asyncio.gather(*[
+            service.handle(f"Alert me when NVDA RSI drops below {20 + i} and volume spikes", f"user{i}")
+            for i in range(10)
+        ])
+
+    started = time.perf_counter()
+    results = asyncio.run(run())
+    elapsed = time.perf_counter() - started
+    service.close()
+
+    # Ten requests each waiting 0.3s on the LLM and 0.3s on data would take 6s one after another
+    assert elapsed < 2.0
+    # History was requested while the LLM calls were still running
+    assert len(service.agent.market_data.requests) == 10
+    assert all(at - started < 0.2 for at, *_ in service.agent.market_data.requests)
+    assert all('Backtest Results' in result['response'] for result in results)
+    assert len({result['strategy_id'] for result in results}) == 10
+    assert len(service.agent.active_strategies) == 10
+
+    # Each session keeps only its own conversation
+    for i in range(10):
+        messages = service.sessions[f"user{i}"].memory.chat_memory.messages
+        assert len(messages) == 2 and f"below {20 + i}" in messages[0].content
+
+
+def test_overload_is_rejected(tmp_path):
+    service = make_service(tmp_path, llm_delay=0.3, max_concurrent=1, max_pending=1)
+
+    async def run():
+        return await asyncio.gather(*[
+            service.handle(f"NVDA RSI below 30 and MACD turning {i}", f"user{i}") for i in range(3)
+        ], return_exceptions=True)
+
+    results = asyncio.run(run())
+    service.close()
+
+    assert sum(isinstance(result, ServiceOverloaded) for result in results) == 1
+    assert service.stats == {'served': 2, 'rejected': 1, 'timed_out': 0, 'failed': 0}
+
+
+def test_request_timeout(tmp_path):
+    service = make_service(tmp_path, llm_delay=0.5, request_timeout=0.1)
+    with pytest.raises(RequestTimeout):
+        asyncio.run(service.handle("NVDA RSI below 30 and volume above average"))
+    service.close()
+    assert service.stats['timed_out'] == 1
+
+
+def test_request_timeout_covers_queueing(tmp_path):
+    service = make_service(tmp_path, llm_delay=0.4, max_concurrent=1, request_timeout=0.7)
+
+    async def run():
+        return await asyncio.gather(*[
+            service.handle(f"NVDA RSI below 30 and MACD turning {i}", f"user{i}") for i in range(2)
+        ], return_exceptions=True)
+
+    # The second request waits 0.4s for a slot and would then take another 0.4s
+    results = asyncio.run(run())
+    service.close()
+    assert isinstance(results[1], RequestTimeout)
+    assert service.stats['served'] == 1 and service.stats['timed_out'] == 1
+
+
+def test_http_api(tmp_path):
+    service = make_service(tmp_path)
+
+    async def run():
+        async with TestClient(TestServer(create_app(service))) as client:
+            ok = await client.post('/chat', json={'message': "RSI below 30 on NVDA", 'session_id': 'abc'})
+            bad = await client.post('/chat', json={'text': 'hello'})
+            ended = await client.delete('/sessions/abc')
+            return ok.status, await ok.json(), bad.status, ended.status
+
+    ok_status, body, bad_status, ended_status = asyncio.run(run())
+    assert ok_status == 200
+    assert body['session_id'] == 'abc' and body['strategy']['ticker'] == 'NVDA'
+    assert bad_status == 400
+    assert ended_status == 200
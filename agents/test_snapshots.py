@@ -0,0 +1,125 @@
+from datetime import timedelta
+import time
+import pytest
+from agents import backtest
+from agents.llm_cache import LLMResponseCache
+from agents.market_data import MarketDataStore
+from agents.monitor import ReplayBarFeed
+from agents.signals import RSI_OVERSOLD
+from agents.snapshots import SnapshotIndex
+from agents.test_backtest import load_history
+from agents.test_llm_cache import FakeLLM
+from agents.test_market_data import FakeProvider, history
+from agents.trading_agent import TradingAgent
+
+TICKERS = ('NVDA', 'AMD', 'SPY')
+
+
+class StoreFeed:
+    """Warm-up history from a store as of a fixed end date"""
+
+    def __init__(self, store, end):
+        self.store = store
+        self.end = end
+
+    def fetch(self, ticker, since=None):
+        return self.store.get_history(ticker, end=self.end, days=365)
+
+
+def assert_matches_recompute(snapshot, df):
+    expected = backtest.latest_values(backtest.calculate_indicator_series(df))
+    assert snapshot['as_of'] == str(df.index[-1])
+    for name, value in expected.items():
+        assert snapshot['technical_indicators'][name] == pytest.approx(value, rel=1e-6), name
+    returns = df['Close'].pct_change().tail(40)
+    assert snapshot['statistics']['volatility'] == pytest.approx(returns.std() * 252 ** 0.5)
+    assert snapshot['statistics']['avg_volume_10d'] == pytest.approx(df['Volume'].tail(10).mean())
+
+
+def test_snapshots_follow_replayed_bars():
+    frames = {ticker: load_history(ticker) for ticker in TICKERS}
+    feed = ReplayBarFeed(frames, start=300)
+    index = SnapshotIndex(store=None, feed=feed)
+    assert index.track(TICKERS) == list(TICKERS)
+    for ticker in TICKERS:
+        assert_matches_recompute(index.get(ticker), frames[ticker].iloc[:300])
+
+    # Each refresh applies only the bars released since the last one
+    for _ in range(20):
+        feed.advance(5)
+        assert index.refresh() == len(TICKERS)
+    assert index.refresh() == 0
+    for ticker in TICKERS:
+        assert_matches_recompute(index.get(ticker), frames[ticker].iloc[:400])
+
+
+def test_new_bars_in_the_store_update_tracked_tickers(tmp_path):
+    full = history()
+    split = full.index[-30].tz_localize(None).to_pydatetime()
+    provider = FakeProvider({'NVDA': full.loc[:full.index[-30]]})
+    store = MarketDataStore(data_dir=str(tmp_path), fetcher=provider, max_age=timedelta(0))
+    index = SnapshotIndex(store, feed=StoreFeed(store, split))
+    warm = store.get_history('NVDA', end=split, days=365)
+    index.track(['nvda'])
+    assert_matches_recompute(index.get('NVDA'), warm)
+
+    provider.frames['NVDA'] = full
+    store.get_history('NVDA', end=full.index[-1].tz_localize(None).to_pydatetime() + timedelta(hours=1), days=365)
+    assert_matches_recompute(index.get('NVDA'), full.loc[warm.index[0]:])
+
+
+def test_screening_by_signal_statistic_and_expression():
+    frames = {ticker: load_history(ticker) for ticker in TICKERS}
+    index = SnapshotIndex(store=None, feed=ReplayBarFeed(frames, start=len(frames['NVDA'])))
+    index.track(TICKERS)
+    snapshots = {ticker: index.get(ticker) for ticker in TICKERS}
+
+    oversold = [t for t, s in snapshots.items() if s['signals'].get('RSI') == RSI_OVERSOLD]
+    assert index.with_signal('RSI', RSI_OVERSOLD) == sorted(oversold)
+    by_volatility = sorted(TICKERS, key=lambda t: snapshots[t]['statistics']['volatility'], reverse=True)
+    assert [s['ticker'] for s in index.top(2)] == by_volatility[:2]
+    assert [s['ticker'] for s in index.top(1, by='RSI', ascending=True)] == \
+        [min(TICKERS, key=lambda t: snapshots[t]['technical_indicators']['RSI'])]
+
+    below = [t for t in TICKERS if snapshots[t]['technical_indicators']['RSI'] < 60]
+    assert sorted(s['ticker'] for s in index.screen("rsi < 60")) == sorted(below)
+    assert [s['ticker'] for s in index.screen("close > 0", sort_by='volatility')] == by_volatility
+
+    index.untrack('NVDA')
+    assert index.get('NVDA') is None and 'NVDA' not in index.with_signal('RSI', snapshots['NVDA']['signals']['RSI'])
+
+
+def test_analyzer_answers_tracked_tickers_from_the_index(tmp_path):
+    frames = {ticker: load_history(ticker) for ticker in TICKERS}
+    agent = TradingAgent(market_data=MarketDataStore(data_dir=str(tmp_path / 'data')), llm=FakeLLM(),
+                         llm_cache=LLMResponseCache(path=str(tmp_path / 'cache.sqlite3')))
+    agent._snapshots = SnapshotIndex(agent.market_data, feed=ReplayBarFeed(frames, start=len(frames['NVDA'])))
+
+    # Untracked tickers are tracked on first use
+    first = agent._analyze_stock_data('NVDA')
+    assert agent.snapshots.tracked() == ['NVDA'] and first is agent.snapshots.get('NVDA')
+    assert_matches_recompute(first, frames['NVDA'])
+
+    started = time.perf_counter()
+    for _ in range(10000):
+        agent._analyze_stock_data('NVDA')
+    assert time.perf_counter() - started < 1
+
+
+def test_analyzer_picks_up_new_bars_once_the_snapshot_is_old(tmp_path):
+    frames = {'NVDA': load_history('NVDA')}
+    feed = ReplayBarFeed(frames, start=500)
+    now = [0.0]
+    agent = TradingAgent(market_data=MarketDataStore(data_dir=str(tmp_path / 'data')), llm=FakeLLM(),
+                         llm_cache=LLMResponseCache(path=str(tmp_path / 'cache.sqlite3')))
+    # A store without listeners, such as SharedMarketData
+    agent._snapshots = SnapshotIndex(None, feed=feed, max_age=timedelta(minutes=15), timer=lambda: now[0])
+
+    assert_matches_recompute(agent._analyze_stock_data('NVDA'), frames['NVDA'].iloc[:500])
+    feed.advance(3)
+    fetches = feed.fetches['NVDA']
+    assert_matches_recompute(agent._analyze_stock_data('NVDA'), frames['NVDA'].iloc[:500])
+    assert feed.fetches['NVDA'] == fetches
+
+    now[0] += 15 * 60
+    assert_matches_recompute(agent._analyze_stock_data('NVDA'), frames['NVDA'].iloc[:503])
@@ -0,0 +1,172 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import pytest
+from agents import backtest
+from agents.fast_parser import FastStrategyParser
+from agents.llm_cache import LLMResponseCache
+from agents.market_data import MarketDataStore, MARKET_TZ
+from agents.monitor import StoreBarFeed, StrategyMonitor
+from agents.portfolio import PortfolioBacktest
+from agents.server import TradingService
+from agents.test_backtest import load_history
+from agents.test_llm_cache import FakeLLM
+from agents.timeframes import (
+    bars_per_year, history_days, normalize_timeframe, resample_bars, resample_chunks, source_timeframe
+)
+from agents.trading_agent import TradingAgent
+
+
+def minute_bars(sessions=5, seed=7):
+    """Regular-session minute bars on consecutive weekdays starting Monday 2025-01-06"""
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range('2025-01-06', periods=sessions)
+    index = pd.DatetimeIndex([
+        ts for day in days
+        for ts in pd.date_range(day + pd.Timedelta(hours=9, minutes=30), periods=390, freq='1min')
+    ]).tz_localize(MARKET_TZ)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, len(index))))
+    spread = np.abs(rng.normal(0, 0.0005, len(index))) * close
+    return pd.DataFrame({
+        'Open': np.concatenate([[close[0]], close[:-1]]),
+        'High': close + spread,
+        'Low': close - spread,
+        'Close': close,
+        'Volume': rng.integers(1_000, 10_000, len(index)),
+    }, index=pd.DatetimeIndex(index, name='Date'))
+
+
+class IntradayProvider:
+    def __init__(self, df):
+        self.df = df
+        self.calls = []
+
+    def __call__(self, ticker, start, end, interval='1d'):
+        self.calls.append((ticker, start, end, interval))
+        return self.df.loc[pd.Timestamp(start).tz_localize(MARKET_TZ):pd.Timestamp(end).tz_localize(MARKET_TZ)].copy()
+
+
+class RecordingStore(MarketDataStore):
+    """Store serving minute bars resampled to the requested bar size, recording each request"""
+
+    def __init__(self, data_dir, df):
+        super().__init__(data_dir=data_dir)
+        self.df = df
+        self.requests = []
+
+    def get_history(self, ticker, start=None, end=None, days=None, force_refresh=False, timeframe='1d'):
+        self.requests.append((ticker, days, timeframe))
+        return load_history(ticker) if timeframe == '1d' else resample_bars(self.df, timeframe)
+
+
+def test_normalize_timeframe():
+    assert normalize_timeframe(None) == '1d'
+    assert normalize_timeframe('daily') == '1d'
+    assert normalize_timeframe('5 minutes') == '5m'
+    assert normalize_timeframe('60m') == '1h'
+    assert normalize_timeframe('2 hours') == '2h'
+    assert source_timeframe('4h') == '1h' and source_timeframe('10m') == '5m'
+    assert bars_per_year('1h') == 252 * 7
+    for bad in ('fortnightly', '3d', '0m', '8h'):
+        with pytest.raises(ValueError):
+            normalize_timeframe(bad)
+
+
+def test_resample_bars_aligns_to_session_open():
+    df = minute_bars(sessions=2)
+    hourly = resample_bars(df, '1h')
+
+    # 6.5 hour sessions: six full bars from 9:30 plus a half bar from 15:30
+    assert len(hourly) == 14
+    assert hourly.index[0].strftime('%H:%M') == '09:30'
+    assert hourly.index[6].strftime('%H:%M') == '15:30'
+    first = df.iloc[:60]
+    assert hourly['Open'].iloc[0] == first['Open'].iloc[0]
+    assert hourly['High'].iloc[0] == first['High'].max()
+    assert hourly['Close'].iloc[0] == first['Close'].iloc[-1]
+    assert hourly['Volume'].iloc[0] == first['Volume'].sum()
+    assert hourly['Volume'].dtype == df['Volume'].dtype
+
+
+@pytest.mark.parametrize('chunk_rows', [7, 100, 389, 1000])
+def test_resample_chunks_matches_whole_frame(chunk_rows):
+    df = minute_bars()
+    chunks = (df.iloc[i:i + chunk_rows] for i in range(0, len(df), chunk_rows))
+    pd.testing.assert_frame_equal(pd.concat(resample_chunks(chunks, '15m')), resample_bars(df, '15m'))
+
+
+@pytest.mark.parametrize('chunk_rows', [50, 333, 1000])
+def test_backtest_chunks_matches_backtest(chunk_rows):
+    df = minute_bars()
+    strategy = {'ticker': 'TEST', 'indicator': 'RSI', 'condition': 'below', 'threshold': 30}
+    chunks = (df.iloc[i:i + chunk_rows] for i in range(0, len(df), chunk_rows))
+
+    expected = backtest.backtest(df, strategy)
+    result = backtest.backtest_chunks(chunks, strategy)
+    assert expected['total_signals'] > 0
+    assert result['total_signals'] == expected['total_signals']
+    assert result['avg_return'] == pytest.approx(expected['avg_return'], rel=1e-9)
+    assert result['win_rate'] == pytest.approx(expected['win_rate'])
+
+
+def test_intraday_history_is_fetched_in_windows_and_streamed(tmp_path):
+    df = minute_bars(sessions=10)
+    provider = IntradayProvider(df)
+    store = MarketDataStore(data_dir=str(tmp_path), fetcher=provider)
+    start, end = datetime(2025, 1, 6), datetime(2025, 1, 18)
+
+    bars = store.get_history('TEST', start=start, end=end, timeframe='1m')
+    assert len(bars) == len(df)
+    # 1-minute requests are limited to 7 days each
+    assert [call[3] for call in provider.calls] == ['1m', '1m']
+    assert all(call[2] - call[1] <= timedelta(days=7) for call in provider.calls)
+    assert store.freshness('TEST', '1m')['rows'] == len(df)
+    assert store.freshness('TEST') == {}
+
+    # Bar sizes the provider does not serve are resampled from the stored minute bars
+    calls = len(provider.calls)
+    three = store.get_history('TEST', start=start, end=end, timeframe='3m')
+    assert len(provider.calls) == calls
+    pd.testing.assert_frame_equal(three, resample_bars(df, '3m'))
+
+    chunks = list(store.iter_history('TEST', timeframe='3m', chunk_rows=500))
+    assert len(chunks) > 1
+    # Chunks come straight from the columnar files, whose index is always nanoseconds
+    pd.testing.assert_frame_equal(pd.concat(chunks), three, check_index_type=False)
+
+
+def test_parser_reads_timeframe():
+    parser = FastStrategyParser(known_tickers=['NVDA'])
+    assert parser.parse("RSI below 30 on NVDA")['timeframe'] == '1d'
+    strategy = parser.parse("RSI below 25 on NVDA 15 minute bars")
+    assert strategy['timeframe'] == '15m' and strategy['threshold'] == 25
+    assert parser.parse("hourly RSI above 70 for NVDA")['timeframe'] == '1h'
+    assert parser.parse("RSI below 30 on NVDA 3 day bars") is None
+
+
+def test_intraday_strategies_run_on_intraday_bars(tmp_path):
+    store = RecordingStore(str(tmp_path / 'data'), minute_bars(sessions=10))
+    agent = TradingAgent(market_data=store, llm=FakeLLM(),
+                         llm_cache=LLMResponseCache(path=str(tmp_path / 'cache.sqlite3')))
+    strategy = {'ticker': 'NVDA', 'indicator': 'RSI', 'condition': 'below', 'threshold': 40, 'timeframe': '5m'}
+    expected = ('NVDA', history_days('5m'), '5m')
+
+    results = agent.optimize_strategy(strategy, {'threshold': [30, 40]}, workers=1)
+    assert store.requests[-1] == expected
+    assert results['total_signals'].max() > 0
+
+    report = agent.backtest_portfolio({'a': strategy})
+    assert store.requests[-1] == expected
+    assert report['metrics']['total_trades'] > 0
+    with pytest.raises(ValueError):
+        PortfolioBacktest({'a': strategy, 'b': {**strategy, 'timeframe': '1d'}})
+
+    service = TradingService(agent)
+    try:
+        service._history('NVDA', '5m')
+    finally:
+        service.close()
+    assert store.requests[-1] == expected
+
+    StrategyMonitor({'a': strategy}, StoreBarFeed(store)).run_cycle()
+    assert store.requests[-1] == ('NVDA', history_days('5m', 'analysis'), '5m')
@@ -0,0 +1,146 @@
+from typing import Iterable, Iterator, Optional
+import math
+import re
+import pandas as pd
+
+DEFAULT_TIMEFRAME = '1d'
+
+# Bar sizes the data provider serves directly; anything else is resampled from one of these
+FETCH_TIMEFRAMES = ['1m', '2m', '5m', '15m', '30m', '1h', '1d']
+
+# Longest range one provider request may cover for each intraday bar size
+MAX_FETCH_DAYS = {'1m': 7, '2m': 60, '5m': 60, '15m': 60, '30m': 60, '1h': 730}
+
+# History loaded for a backtest, a current-state analysis and a robustness analysis, by fetched bar size
+BACKTEST_DAYS = {'1m': 7, '2m': 30, '5m': 30, '15m': 60, '30m': 60, '1h': 365, '1d': 365}
+ANALYSIS_DAYS = {'1m': 2, '2m': 3, '5m': 5, '15m': 10, '30m': 20, '1h': 30, '1d': 60}
+ROBUSTNESS_DAYS = {'1m': 30, '2m': 60, '5m': 60, '15m': 60, '30m': 60, '1h': 730, '1d': 5 * 365}
+
+# Regular US equity session: opens 9:30, 390 minutes long
+SESSION_OPEN_MINUTES = 9 * 60 + 30
+SESSION_MINUTES = 390
+TRADING_DAYS = 252
+
+TIMEFRAME_ALIASES = {
+    'daily': '1d', 'day': '1d', 'd': '1d', '1day': '1d',
+    'hourly': '1h', 'hour': '1h', 'h': '1h',
+    'minute': '1m', 'min': '1m',
+}
+
+_TIMEFRAME_RE = re.compile(r'^(\d+)\s*-?\s*(m|min|mins|minute|minutes|h|hr|hrs|hour|hours|d|day|days)$')
+
+# Columns aggregated when bars are resampled; others keep their last value
+AGGREGATIONS = {
+    'Open': 'first',
+    'High': 'max',
+    'Low': 'min',
+    'Close': 'last',
+    'Volume': 'sum',
+    'Dividends': 'sum',
+    'Stock Splits': 'max',
+    'Capital Gains': 'sum',
+}
+
+
+def normalize_timeframe(value: Optional[str]) -> str:
+    """Canonical bar size such as '1m', '5m', '1h', '4h' or '1d' for user or LLM wording"""
+    if value is None or value == '':
+        return DEFAULT_TIMEFRAME
+    text = str(value).strip().lower()
+    text = TIMEFRAME_ALIASES.get(text, text)
+    match = _TIMEFRAME_RE.match(text)
+    if not match:
+        raise ValueError(f"Unknown timeframe: {value}")
+
+    count, unit = int(match.group(1)), match.group(2)
+    if count <= 0:
+        raise ValueError(f"Unknown timeframe: {value}")
+    if unit.startswith('d'):
+        if count != 1:
+            raise ValueError(f"Multi-day bars are not supported: {value}")
+        return '1d'
+
+    minutes = count * 60 if unit.startswith('h') else count
+    if minutes >= SESSION_MINUTES:
+        raise ValueError(f"Intraday bars must be shorter than a session: {value}")
+    return f"{minutes // 60}h" if minutes % 60 == 0 else f"{minutes}m"
+
+
+def timeframe_minutes(timeframe: str) -> int:
+    timeframe = normalize_timeframe(timeframe)
+    if timeframe == '1d':
+        return 24 * 60
+    return int(timeframe[:-1]) * (60 if timeframe.endswith('h') else 1)
+
+
+def is_intraday(timeframe: str) -> bool:
+    return normalize_timeframe(timeframe) != '1d'
+
+
+def source_timeframe(timeframe: str) -> str:
+    """Largest fetchable bar size that a timeframe can be built from"""
+    timeframe = normalize_timeframe(timeframe)
+    if timeframe in FETCH_TIMEFRAMES:
+        return timeframe
+    minutes = timeframe_minutes(timeframe)
+    divisors = [tf for tf in FETCH_TIMEFRAMES if tf != '1d' and minutes % timeframe_minutes(tf) == 0]
+    return max(divisors, key=timeframe_minutes)
+
+
+def bars_per_year(timeframe: str) -> int:
+    """Bars in a trading year, for annualizing volatility and Sharpe ratios"""
+    timeframe = normalize_timeframe(timeframe)
+    if timeframe == '1d':
+        return TRADING_DAYS
+    return TRADING_DAYS * math.ceil(SESSION_MINUTES / timeframe_minutes(timeframe))
+
+
+def history_days(timeframe: str, purpose: str = 'backtest') -> int:
+    """Calendar days of history to load for a 'backtest', an 'analysis' or a 'robustness' run at this bar size"""
+    days = {'analysis': ANALYSIS_DAYS, 'robustness': ROBUSTNESS_DAYS}.get(purpose, BACKTEST_DAYS)
+    return days[source_timeframe(timeframe)]
+
+
+def resample_bars(df: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    """Aggregate bars to a coarser timeframe; intraday bins are aligned to the 9:30 session open"""
+    timeframe = normalize_timeframe(timeframe)
+    if df.empty:
+        return df
+
+    aggregations = {column: AGGREGATIONS.get(column, 'last') for column in df.columns}
+    if timeframe == '1d':
+        resampler = df.resample('1D')
+    else:
+        minutes = timeframe_minutes(timeframe)
+        resampler = df.resample(f'{minutes}min', origin='start_day',
+                                offset=pd.Timedelta(minutes=SESSION_OPEN_MINUTES % minutes))
+    bars = resampler.agg(aggregations)
+
+    # Bins without any source bar (nights, weekends) are dropped rather than filled
+    bars = bars[resampler['Close'].count() > 0] if 'Close' in df.columns else bars
+    if 'Volume' in bars.columns and 'Volume' in df.columns:
+        bars['Volume'] = bars['Volume'].astype(df['Volume'].dtype)
+    return bars
+
+
+def resample_chunks(chunks: Iterable[pd.DataFrame], timeframe: str) -> Iterator[pd.DataFrame]:
+    """Resample consecutive chunks of bars, holding back each chunk's last bin until it is complete"""
+    carry = None
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        frame = chunk if carry is None else pd.concat([carry, chunk])
+        bars = resample_bars(frame, timeframe)
+        if bars.empty:
+            carry = frame
+            continue
+
+        # The last bin may continue in the next chunk
+        last_bin = bars.index[-1]
+        carry = frame.loc[frame.index >= last_bin]
+        if len(bars) > 1:
+            yield bars.iloc[:-1]
+
+    if carry is not None and not carry.empty:
+        yield resample_bars(carry, timeframe)
+
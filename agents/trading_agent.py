@@ -1,87 +1,171 @@
-from langchain.agents import AgentType, initialize_agent
-from langchain.chat_models import ChatOpenAI
-from langchain.tools import Tool
-from langchain.memory import ConversationBufferMemory
-from typing import List, Dict, Any, Optional, Tuple
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
 import os
+import threading
 from dotenv import load_dotenv
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import talib
 from .prompts import TradingPrompts
+from . import backtest, robustness, signals
+from .alerts import AlertPipeline
+from .expressions import ExpressionError, compile_strategy, strategy_conditions
+from .fast_parser import FastStrategyParser, normalize_strategy
+from .llm_cache import LLMResponseCache, default_cache
+from .market_data import MarketDataStore, default_store
+from .memory import ConversationMemory, langchain_memory, llm_summarizer
+from .metrics import incr, span, timed
+from .monitor import StoreBarFeed, StrategyMonitor
+from .optimizer import ParameterSweep
+from .portfolio import PortfolioBacktest
+from .snapshots import SnapshotIndex
+from .timeframes import bars_per_year, history_days, normalize_timeframe
+
+if TYPE_CHECKING:
+    from langchain.tools import Tool
 
 # Load environment variables
 load_dotenv()
 
 class TradingAgent:
-    def __init__(self):
-        # Initialize the language model
-        self.llm = ChatOpenAI(
-            temperature=0.7,
-            model_name="gpt-4"
-        )
+    def __init__(self, market_data: Optional[MarketDataStore] = None, llm=None,
+                 llm_cache: Optional[LLMResponseCache] = None, llm_summaries: bool = False):
+        # The language model, memory, tools and agent executor are built on first use,
+        # so analysis and backtests never pay for importing langchain
+        self._llm = llm
+        # Fold older conversation turns with the LLM instead of the extractive summary
+        self.llm_summaries = llm_summaries
+        self._memory = None
+        self._tools = None
+        self._snapshots = None
+        self._agent = None
+        self._build_lock = threading.RLock()
         
-        # Initialize conversation memory
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True
-        )
+        # Cache of extracted strategies, shared across agents
+        self.llm_cache = llm_cache if llm_cache is not None else default_cache()
         
         # Initialize prompts
         self.prompts = TradingPrompts()
         
-        # Initialize tools
-        self.tools = self._initialize_tools()
+        # Shared cache-first market data
+        self.market_data = market_data or default_store()
         
-        # Initialize the agent
-        self.agent = initialize_agent(
-            tools=self.tools,
-            llm=self.llm,
-            agent=AgentType.CHAT_CONVERSATIONAL_REACT_DESCRIPTION,
-            memory=self.memory,
-            verbose=True
-        )
+        # Rule-based extraction for simple requests, tried before the LLM
+        self.fast_parser = FastStrategyParser(known_tickers=self.market_data.tickers())
         
         # Store active strategies
         self.active_strategies = {}
+        
+        # Background evaluation of active strategies, created by start_monitoring
+        self.monitor = None
+        self.alerts = None
+    
+    def _build_once(self, name: str, build):
+        """Return the component stored in `name`, building it the first time it is needed"""
+        value = getattr(self, name)
+        if value is None:
+            with self._build_lock:
+                value = getattr(self, name)
+                if value is None:
+                    value = build()
+                    setattr(self, name, value)
+        return value
+    
+    @property
+    def llm(self):
+        def build():
+            from langchain.chat_models import ChatOpenAI
+            return ChatOpenAI(
+                temperature=0.7,
+                model_name="gpt-4"
+            )
+        return self._build_once('_llm', build)
+    
+    @property
+    def memory(self) -> ConversationMemory:
+        return self._build_once('_memory', self.new_memory)
+    
+    def new_memory(self) -> ConversationMemory:
+        """Empty conversation memory, summarized by the LLM when llm_summaries is set"""
+        summarizer = llm_summarizer(self.llm, self.prompts) if self.llm_summaries else None
+        return ConversationMemory(summarizer=summarizer)
+    
+    @property
+    def snapshots(self) -> SnapshotIndex:
+        return self._build_once('_snapshots', lambda: SnapshotIndex(self.market_data))
+    
+    @property
+    def tools(self) -> List["Tool"]:
+        return self._build_once('_tools', self._initialize_tools)
     
-    def _initialize_tools(self) -> List[Tool]:
+    @property
+    def agent(self):
+        def build():
+            from langchain.agents import AgentType, initialize_agent
+            return initialize_agent(
+                tools=self.tools,
+                llm=self.llm,
+                agent=AgentType.CHAT_CONVERSATIONAL_REACT_DESCRIPTION,
+                memory=langchain_memory(self.memory),
+                verbose=True
+            )
+        return self._build_once('_agent', build)
+    
+    def warm(self, tickers: List[str] = ()) -> "TradingAgent":
+        """Build every lazily created component now and load history for the given tickers"""
+        self.agent
+        for ticker in tickers:
+            self.market_data.get_history(ticker, days=365)
+        self.snapshots.track(tickers)
+        return self
+    
+    def _initialize_tools(self) -> List["Tool"]:
         """Initialize the tools that the agent can use"""
+        from langchain.tools import Tool
         tools = [
             Tool(
                 name="StockDataAnalyzer",
-                func=self._analyze_stock_data,
+                func=timed('tool.StockDataAnalyzer')(self._analyze_stock_data),
                 description="Analyzes historical stock data to identify patterns and signals. Input should be a stock ticker symbol."
             ),
             Tool(
                 name="StrategyValidator",
-                func=self._validate_strategy,
+                func=timed('tool.StrategyValidator')(self._validate_strategy),
                 description="Validates if a given trading strategy is well-formed and feasible. Input should be a dictionary containing strategy parameters."
             ),
             Tool(
                 name="BacktestStrategy",
-                func=self._backtest_strategy,
+                func=timed('tool.BacktestStrategy')(self._backtest_strategy),
                 description="Backtests a trading strategy using historical data."
             )
         ]
         return tools
     
-    def _extract_strategy(self, user_input: str) -> Tuple[Dict[str, Any], List[str]]:
+    def _extract_strategy(self, user_input: str, memory: Optional[ConversationMemory] = None) -> Tuple[Dict[str, Any], List[str]]:
         """Extract trading strategy from user input"""
         try:
-            # Create strategy extraction prompt
-            prompt = self.prompts.create_strategy_extraction_prompt(
-                user_input,
-                context={"history": self.memory.chat_memory.messages}
-            )
-            
-            # Get strategy from LLM
-            response = self.llm(prompt.format(user_input=user_input, context=""))
-            
-            # Parse response
-            strategy = self._parse_llm_response(response)
+            # Simple single-condition requests do not need the LLM
+            with span('parser.fast'):
+                strategy = self.fast_parser.parse(user_input)
+            if strategy is not None:
+                incr('parser.fast_hits')
+                return strategy, self._validate_strategy(strategy)['messages']
+            incr('parser.fast_misses')
+            
+            if memory is None:
+                memory = self.memory
+            
+            # Create strategy extraction prompt; the memory keeps its context to a bounded size
+            context = memory.context()
+            prompt = self.prompts.create_strategy_extraction_prompt(user_input)
+            
+            # Get strategy from LLM, reusing the result for repeated or concurrent identical requests
+            cache_key = self.llm_cache.make_key(user_input, self.prompts.version, self._llm_model_name(), context)
+            strategy = normalize_strategy(self.llm_cache.get_or_compute(
+                cache_key,
+                lambda: self._parse_llm_response(
+                    self._call_llm(prompt.format(user_input=user_input, context=context))
+                )
+            ))
             
             # Validate strategy
             validation_result = self._validate_strategy(strategy)
@@ -91,6 +175,21 @@ class TradingAgent:
         except Exception as e:
             return None, [f"Error extracting strategy: {str(e)}"]
     
+    def _call_llm(self, prompt_text: str) -> str:
+        """Send a prompt to the LLM and return the response text"""
+        with span('llm.call'):
+            response = self.llm.invoke(prompt_text)
+        incr('llm.calls')
+        incr('llm.prompt_chars', len(prompt_text))
+        usage = (getattr(response, 'response_metadata', None) or {}).get('token_usage') or {}
+        for key in ('prompt_tokens', 'completion_tokens', 'total_tokens'):
+            if usage.get(key):
+                incr(f'llm.{key}', usage[key])
+        return getattr(response, 'content', response)
+    
+    def _llm_model_name(self) -> str:
+        return getattr(self.llm, 'model_name', None) or type(self.llm).__name__
+    
     def _parse_llm_response(self, response: str) -> Dict[str, Any]:
         """Parse LLM response into a structured strategy"""
         try:
@@ -106,53 +205,22 @@ class TradingAgent:
     
     def _calculate_technical_indicators(self, data: pd.DataFrame) -> Dict[str, Any]:
         """Calculate various technical indicators"""
-        close_prices = data['Close'].values
-        high_prices = data['High'].values
-        low_prices = data['Low'].values
-        volume = data['Volume'].values
-
-        indicators = {}
-        
-        # RSI
-        indicators['RSI'] = talib.RSI(close_prices, timeperiod=14)[-1]
-        
-        # MACD
-        macd, signal, hist = talib.MACD(close_prices)
-        indicators['MACD'] = {
-            'macd': macd[-1],
-            'signal': signal[-1],
-            'histogram': hist[-1]
-        }
-        
-        # Bollinger Bands
-        upper, middle, lower = talib.BBANDS(close_prices)
-        indicators['BB'] = {
-            'upper': upper[-1],
-            'middle': middle[-1],
-            'lower': lower[-1]
-        }
-        
-        # Volume indicators
-        indicators['OBV'] = talib.OBV(close_prices, volume)[-1]
-        
-        # Trend indicators
-        indicators['SMA_20'] = talib.SMA(close_prices, timeperiod=20)[-1]
-        indicators['SMA_50'] = talib.SMA(close_prices, timeperiod=50)[-1]
-        indicators['EMA_20'] = talib.EMA(close_prices, timeperiod=20)[-1]
-        
-        # Volatility
-        indicators['ATR'] = talib.ATR(high_prices, low_prices, close_prices, timeperiod=14)[-1]
-        
-        return indicators
+        # Indicators are causal, so the last value of each full series is the current reading
+        return backtest.latest_values(backtest.calculate_indicator_series(data))
     
-    def _analyze_stock_data(self, ticker: str) -> Dict[str, Any]:
+    def _analyze_stock_data(self, ticker: str, timeframe: str = '1d') -> Dict[str, Any]:
         """Analyze stock data for patterns and signals"""
         try:
-            # Fetch data
-            stock = yf.Ticker(ticker)
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=60)  # Get 60 days of data
-            df = stock.history(start=start_date, end=end_date)
+            # Daily bars are answered from the snapshot index, which tracks the ticker on first use
+            # and fetches new bars once its snapshot is as old as the store's max_age
+            timeframe = normalize_timeframe(timeframe)
+            if timeframe == self.snapshots.timeframe:
+                snapshot = self.snapshots.current(ticker)
+                if snapshot is not None:
+                    return snapshot
+            
+            # Fetch data: a few days to weeks of intraday bars
+            df = self.market_data.get_history(ticker, days=history_days(timeframe, 'analysis'), timeframe=timeframe)
             
             if df.empty:
                 return {"error": f"No data found for ticker {ticker}"}
@@ -169,12 +237,13 @@ class TradingAgent:
                 'daily_return': ((current_price / df['Close'].iloc[-2]) - 1) * 100,
                 'volume': df['Volume'].iloc[-1],
                 'avg_volume_10d': df['Volume'].tail(10).mean(),
-                'volatility': df['Close'].pct_change().std() * np.sqrt(252)  # Annualized volatility
+                'volatility': df['Close'].pct_change().std() * np.sqrt(bars_per_year(timeframe))  # Annualized volatility
             }
             
             # Combine all analysis
             analysis = {
                 'ticker': ticker,
+                'timeframe': timeframe,
                 'timestamp': datetime.now().isoformat(),
                 'technical_indicators': indicators,
                 'statistics': stats,
@@ -190,44 +259,18 @@ class TradingAgent:
         """Backtest a trading strategy"""
         try:
             ticker = strategy['ticker']
+            timeframe = normalize_timeframe(strategy.get('timeframe'))
             
-            # Fetch historical data
-            stock = yf.Ticker(ticker)
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=365)  # 1 year of data
-            df = stock.history(start=start_date, end=end_date)
+            # Fetch historical data: 1 year of daily bars, less for intraday bars
+            df = self.market_data.get_history(ticker, days=history_days(timeframe), timeframe=timeframe)
             
             if df.empty:
                 return {"error": f"No historical data found for {ticker}"}
             
-            # Initialize results
-            signals = []
-            performance = []
-            
-            # Simulate strategy
-            for i in range(20, len(df)):  # Start after enough data for indicators
-                window = df.iloc[:i+1]
-                indicators = self._calculate_technical_indicators(window)
-                stats = {
-                    'volume': window['Volume'].iloc[-1],
-                    'avg_volume_10d': window['Volume'].tail(10).mean()
-                }
-                
-                signal = self._generate_signals(indicators, stats)
-                signals.append(signal)
-                
-                # Calculate returns if signal triggered
-                if self._should_trigger_signal(signal, strategy):
-                    next_return = df['Close'].iloc[min(i+5, len(df)-1)] / df['Close'].iloc[i] - 1
-                    performance.append(next_return)
-            
-            # Calculate performance metrics
-            results = {
-                'total_signals': len([s for s in signals if self._should_trigger_signal(s, strategy)]),
-                'avg_return': np.mean(performance) if performance else 0,
-                'win_rate': len([p for p in performance if p > 0]) / len(performance) if performance else 0,
-                'sharpe_ratio': np.mean(performance) / np.std(performance) if performance else 0
-            }
+            # Evaluate indicators and strategy conditions over the whole history at once, with
+            # bootstrap intervals and walk-forward folds from the same signals
+            with span('backtest.run', bars=len(df)):
+                results = robustness.backtest_with_intervals(df, strategy)
             
             return results
             
@@ -236,47 +279,11 @@ class TradingAgent:
     
     def _should_trigger_signal(self, signal: Dict[str, str], strategy: Dict[str, Any]) -> bool:
         """Check if current signals match strategy conditions"""
-        indicator = strategy['indicator']
-        condition = strategy['condition']
-        
-        if indicator not in signal:
-            return False
-            
-        if indicator == 'RSI':
-            if condition == 'below' and 'Oversold' in signal[indicator]:
-                return True
-            if condition == 'above' and 'Overbought' in signal[indicator]:
-                return True
-                
-        return False
+        return signals.should_trigger_signal(signal, strategy)
     
     def _generate_signals(self, indicators: Dict[str, Any], stats: Dict[str, Any]) -> Dict[str, str]:
         """Generate trading signals based on technical indicators"""
-        signals = {}
-        
-        # RSI signals
-        if indicators['RSI'] < 30:
-            signals['RSI'] = 'Oversold - Potential Buy'
-        elif indicators['RSI'] > 70:
-            signals['RSI'] = 'Overbought - Potential Sell'
-        else:
-            signals['RSI'] = 'Neutral'
-            
-        # MACD signals
-        if indicators['MACD']['macd'] > indicators['MACD']['signal']:
-            signals['MACD'] = 'Bullish'
-        else:
-            signals['MACD'] = 'Bearish'
-            
-        # Volume signals
-        if stats['volume'] > stats['avg_volume_10d'] * 1.5:
-            signals['Volume'] = 'Unusual volume - High'
-        elif stats['volume'] < stats['avg_volume_10d'] * 0.5:
-            signals['Volume'] = 'Unusual volume - Low'
-        else:
-            signals['Volume'] = 'Normal'
-            
-        return signals
+        return signals.generate_signals(indicators, stats)
     
     def _validate_strategy(self, strategy: Dict[str, Any]) -> Dict[str, Any]:
         """Validate if a given strategy is well-formed and feasible"""
@@ -286,7 +293,8 @@ class TradingAgent:
             'suggested_parameters': {}
         }
         
-        required_fields = ['ticker', 'indicator', 'condition', 'threshold']
+        # A strategy written as an expression needs no indicator fields
+        required_fields = ['ticker'] if strategy.get('expression') else ['ticker', 'indicator', 'condition', 'threshold']
         
         # Check required fields
         for field in required_fields:
@@ -297,59 +305,175 @@ class TradingAgent:
         if not validation_result['is_valid']:
             return validation_result
             
+        # Each of the indicator/condition/threshold entries is checked
+        try:
+            entries = [] if strategy.get('expression') else strategy_conditions(strategy)
+        except ExpressionError as e:
+            validation_result['is_valid'] = False
+            validation_result['messages'].append(str(e))
+            return validation_result
+            
         # Validate indicator
         valid_indicators = ['RSI', 'MACD', 'BB', 'Volume']
-        if strategy['indicator'] not in valid_indicators:
+        if any(indicator not in valid_indicators for indicator, _, _ in entries):
             validation_result['is_valid'] = False
             validation_result['messages'].append(f"Invalid indicator. Must be one of: {', '.join(valid_indicators)}")
             
         # Validate condition
         valid_conditions = ['above', 'below', 'crosses_above', 'crosses_below']
-        if strategy['condition'] not in valid_conditions:
+        if any(condition not in valid_conditions for _, condition, _ in entries):
             validation_result['is_valid'] = False
             validation_result['messages'].append(f"Invalid condition. Must be one of: {', '.join(valid_conditions)}")
             
+        # Validate timeframe; daily bars are used when none is given
+        try:
+            normalize_timeframe(strategy.get('timeframe'))
+        except ValueError:
+            validation_result['is_valid'] = False
+            validation_result['messages'].append("Invalid timeframe. Use a bar size such as 1m, 5m, 1h or 1d")
+            
         # Validate and suggest parameters based on indicator
-        if strategy['indicator'] == 'RSI':
-            if not (0 <= float(strategy['threshold']) <= 100):
+        for indicator, _, threshold in entries:
+            if indicator == 'RSI' and not (0 <= float(threshold) <= 100):
                 validation_result['is_valid'] = False
                 validation_result['messages'].append("RSI threshold must be between 0 and 100")
                 validation_result['suggested_parameters'] = {
                     'oversold': 30,
                     'overbought': 70
                 }
+                
+        # The conditions must combine into an expression the backtester and monitor can evaluate
+        if validation_result['is_valid']:
+            try:
+                compile_strategy(strategy)
+            except ExpressionError as e:
+                validation_result['is_valid'] = False
+                validation_result['messages'].append(f"Invalid strategy conditions: {str(e)}")
         
         return validation_result
     
     def process_user_input(self, user_input: str) -> str:
         """Process user input and return agent's response"""
+        with span('agent.process_user_input'):
+            return self._process_user_input(user_input)
+    
+    def _process_user_input(self, user_input: str) -> str:
         try:
             # Extract strategy from user input
-            strategy, messages = self._extract_strategy(user_input)
+            with span('agent.extract_strategy'):
+                strategy, messages = self._extract_strategy(user_input)
             
             if not strategy:
-                return "\n".join(messages)
+                response = "\n".join(messages)
+                self.memory.save_context({'input': user_input}, {'output': response})
+                return response
             
             # Validate strategy
-            validation_result = self._validate_strategy(strategy)
+            with span('agent.validate_strategy'):
+                validation_result = self._validate_strategy(strategy)
             
             # If strategy is valid, run backtesting
             if validation_result['is_valid']:
-                backtest_results = self._backtest_strategy(strategy)
+                with span('agent.backtest_strategy'):
+                    backtest_results = self._backtest_strategy(strategy)
                 validation_result['backtest_results'] = backtest_results
             
             # Format response
-            response = self.prompts.format_strategy_response(strategy, validation_result)
+            with span('agent.format_response'):
+                response = self.prompts.format_strategy_response(strategy, validation_result)
             
             # Store valid strategies
             if validation_result['is_valid']:
-                strategy_id = f"{strategy['ticker']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                self.active_strategies[strategy_id] = strategy
+                self.memory.add_strategy(strategy, self._activate_strategy(strategy))
+            self.memory.save_context({'input': user_input}, {'output': response})
             
             return response
             
         except Exception as e:
             return f"Error processing input: {str(e)}"
+    
+    def _activate_strategy(self, strategy: Dict[str, Any], session_id: Optional[str] = None) -> str:
+        """Add a validated strategy to the active set and return its id"""
+        strategy_id = f"{strategy['ticker']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        if session_id:
+            strategy_id = f"{strategy_id}_{session_id}"
+        self.active_strategies[strategy_id] = strategy
+        return strategy_id
+    
+    def optimize_strategy(self, strategy: Dict[str, Any], param_grid: Dict[str, List[Any]],
+                          days: Optional[int] = None, workers: Optional[int] = None) -> pd.DataFrame:
+        """Backtest every combination of a parameter grid and rank them by Sharpe ratio"""
+        sweep = ParameterSweep(strategy, param_grid, workers=workers)
+        timeframe = normalize_timeframe(strategy.get('timeframe'))
+        frames = {ticker: self.market_data.get_history(ticker, days=days or history_days(timeframe), timeframe=timeframe)
+                  for ticker in sweep.grid['ticker']}
+        return sweep.run(frames)
+    
+    def analyze_robustness(self, strategies: Optional[Dict[str, Dict[str, Any]]] = None, days: Optional[int] = None,
+                           on_result=None, **kwargs) -> Dict[str, Dict[str, Any]]:
+        """Walk-forward, bootstrap and Monte Carlo reports for strategies (the active ones by default)"""
+        strategies = strategies if strategies is not None else dict(self.active_strategies)
+        frames = {}
+        for strategy in strategies.values():
+            ticker = strategy['ticker'].upper()
+            timeframe = normalize_timeframe(strategy.get('timeframe'))
+            if ticker not in frames:
+                frames[ticker] = self.market_data.get_history(
+                    ticker, days=days or history_days(timeframe, 'robustness'), timeframe=timeframe)
+        return robustness.RobustnessAnalysis(strategies, **kwargs).run(frames, on_result)
+    
+    def backtest_portfolio(self, strategies: Optional[Dict[str, Dict[str, Any]]] = None, days: Optional[int] = None,
+                           **kwargs) -> Dict[str, Any]:
+        """Simulate strategies (the active ones by default) trading one shared account"""
+        strategies = strategies if strategies is not None else dict(self.active_strategies)
+        simulation = PortfolioBacktest(strategies, **kwargs)
+        tickers = {strategy['ticker'].upper() for strategy in strategies.values()}
+        frames = {ticker: self.market_data.get_history(ticker, days=days or history_days(simulation.timeframe),
+                                                       timeframe=simulation.timeframe)
+                  for ticker in tickers}
+        return simulation.run(frames)
+    
+    def start_monitoring(self, on_signal=None, interval: float = 60.0, market_hours_only: bool = True,
+                         alerts: Optional[AlertPipeline] = None) -> StrategyMonitor:
+        """Start evaluating active strategies in the background, delivering signals through `alerts` if given.
+
+        Calling it again replaces the signal handler and alert pipeline of the running monitor.
+        """
+        if self.alerts is not None and self.alerts is not alerts:
+            self.alerts.stop()
+        self.alerts = alerts
+        if alerts is not None:
+            alerts.start()
+            on_signal = _chain(on_signal, alerts.submit)
+        if self.monitor is None:
+            self.monitor = StrategyMonitor(
+                self.active_strategies,
+                StoreBarFeed(self.market_data),
+                on_signal=on_signal,
+                interval=interval,
+                market_hours_only=market_hours_only
+            )
+        else:
+            self.monitor.on_signal = on_signal
+            self.monitor.interval = interval
+            self.monitor.market_hours_only = market_hours_only
+        self.monitor.start()
+        return self.monitor
+    
+    def stop_monitoring(self):
+        """Stop the background monitor"""
+        if self.monitor is not None:
+            self.monitor.stop()
+        if self.alerts is not None:
+            self.alerts.stop()
+
+def _chain(*handlers):
+    """One signal handler calling each of `handlers` that is set"""
+    handlers = [handler for handler in handlers if handler is not None]
+    def handle(event):
+        for handler in handlers:
+            handler(event)
+    return handle
 
 if __name__ == "__main__":
     # Example usage
@@ -0,0 +1,110 @@
+"""Import-time and cold-start benchmark for TradingAgent.
+
+Every cold measurement runs in a fresh interpreter, the way batch jobs and CLI tools pay
+for it. Market data comes from the checked-in CSVs and the LLM is a local stand-in, so
+nothing here touches the network.
+
+    python benchmarks/startup.py --repeat 5 --json startup.json
+"""
+from typing import Dict, List
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Runs in a child interpreter and prints one JSON object of phase timings in seconds
+COLD_START = r'''
+import json, sys, time
+timings = {}
+started = time.perf_counter()
+from agents.trading_agent import TradingAgent
+timings['import'] = time.perf_counter() - started
+
+import pandas as pd
+from agents import backtest
+df = pd.read_csv('data/NVDA_historical.csv', index_col=0)
+df.index = pd.to_datetime(df.index, utc=True)
+
+mark = time.perf_counter()
+agent = TradingAgent()
+timings['construct'] = time.perf_counter() - mark
+
+mark = time.perf_counter()
+agent._calculate_technical_indicators(df)
+backtest.backtest(df, {'ticker': 'NVDA', 'indicator': 'RSI', 'condition': 'below', 'threshold': 30})
+timings['first_backtest'] = time.perf_counter() - mark
+
+mark = time.perf_counter()
+agent._extract_strategy("RSI below 30 on NVDA")
+timings['first_parse'] = time.perf_counter() - mark
+
+timings['total'] = time.perf_counter() - started
+timings['langchain_loaded'] = 'langchain' in sys.modules
+print(json.dumps(timings))
+'''
+
+
+def run_cold_start() -> Dict[str, float]:
+    output = subprocess.run([sys.executable, '-c', COLD_START], cwd=ROOT, capture_output=True,
+                            text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_pool(size: int) -> Dict[str, float]:
+    """Cost of building and warming an agent on demand versus borrowing one from a warm pool"""
+    from langchain_community.llms.fake import FakeListLLM
+    from agents.agent_pool import AgentPool
+    from agents.trading_agent import TradingAgent
+
+    def factory():
+        return TradingAgent(llm=FakeListLLM(responses=['{}']))
+
+    mark = time.perf_counter()
+    factory().warm()
+    on_demand = time.perf_counter() - mark
+
+    pool = AgentPool(size=size, factory=factory)
+    pool.wait_ready()
+    mark = time.perf_counter()
+    with pool.acquire():
+        pass
+    return {'warm_on_demand': on_demand, 'pool_acquire': time.perf_counter() - mark}
+
+
+def summarize(samples: List[Dict[str, float]]) -> Dict[str, float]:
+    return {key: statistics.median(sample[key] for sample in samples)
+            for key, value in samples[0].items() if not isinstance(value, bool)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure TradingAgent import and cold-start time")
+    parser.add_argument('--repeat', type=int, default=5, help="Fresh interpreters to start")
+    parser.add_argument('--pool-size', type=int, default=2)
+    parser.add_argument('--json', help="Write results to this file")
+    args = parser.parse_args()
+
+    samples = [run_cold_start() for _ in range(args.repeat)]
+    results = {
+        'cold_start': summarize(samples),
+        'langchain_loaded': samples[0]['langchain_loaded'],
+        'pool': run_pool(args.pool_size),
+    }
+
+    for section in ('cold_start', 'pool'):
+        for name, seconds in results[section].items():
+            print(f"{section:12} {name:16} {seconds * 1000:9.1f} ms")
+    print(f"langchain imported by the cold path: {results['langchain_loaded']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
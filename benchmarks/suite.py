@@ -0,0 +1,282 @@
+"""Offline benchmarks for the agent's hot paths, with baseline comparison.
+
+Inputs are the checked-in data/*_historical.csv files and synthetic GBM universes
+(benchmarks/synthetic.py); the LLM is a local stand-in. Nothing touches the network.
+
+    python benchmarks/suite.py --json results.json
+    python benchmarks/suite.py --compare results.json --threshold 0.2
+    python benchmarks/suite.py --quick -k indicators
+
+With --compare the exit status is 1 when any benchmark is slower than the baseline
+by more than the threshold.
+"""
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+from agents import backtest
+from agents.bar_store import BarStore
+from agents.llm_cache import LLMResponseCache
+from agents.market_data import DATA_DIR, MARKET_TZ, MarketDataStore
+from agents.panel import build_panel, calculate_panel_indicators
+from agents.signals import should_trigger_signal
+from agents.trading_agent import TradingAgent
+from synthetic import gbm_frame, gbm_universe
+
+TICKERS = ['SPY', 'SMH', 'NVDA', 'AMD']
+
+STRATEGY = {'ticker': 'NVDA', 'indicator': 'RSI', 'condition': 'below', 'threshold': 30}
+
+# Parsed without the LLM, and a compound request that needs it
+SIMPLE_REQUEST = "Alert me when NVIDIA RSI drops below 30"
+COMPOUND_REQUEST = "Alert me when NVDA RSI goes below 30 and volume spikes"
+
+
+class Benchmark:
+    """A timed callable; `setup`, if given, runs untimed before every sample and its result is passed in"""
+
+    def __init__(self, name: str, func: Callable, setup: Optional[Callable[[], Any]] = None):
+        self.name = name
+        self.func = func
+        self.setup = setup
+
+
+class FrameStore(MarketDataStore):
+    """Serves fixed frames, so agent benchmarks measure computation rather than I/O"""
+
+    def __init__(self, data_dir: str, frames: Dict[str, pd.DataFrame]):
+        super().__init__(data_dir=data_dir, fetcher=_offline_fetcher)
+        self.frames = frames
+
+    def get_history(self, ticker, start=None, end=None, days=None, force_refresh=False, timeframe='1d'):
+        return self.frames[ticker.upper()]
+
+
+def _offline_fetcher(ticker, start, end, **kwargs):
+    raise RuntimeError(f"Benchmarks run offline; {ticker} from {start} to {end} is not in the data directory")
+
+
+def load_csv(ticker: str) -> pd.DataFrame:
+    df = pd.read_csv(os.path.join(DATA_DIR, f'{ticker}_historical.csv'), index_col=0)
+    df.index = pd.to_datetime(df.index, utc=True)
+    return df
+
+
+def build_benchmarks(workdir: str, tickers: int, years: float) -> List[Benchmark]:
+    from langchain_community.llms.fake import FakeListLLM
+
+    csv_frames = {ticker: load_csv(ticker) for ticker in TICKERS}
+    nvda = csv_frames['NVDA']
+    long_frame = gbm_frame(years, seed=1)
+    universe = gbm_universe(tickers, years, seed=2)
+    panel = build_panel(universe)
+    long_strategy = {**STRATEGY, 'ticker': 'SYN'}
+
+    agent = TradingAgent(
+        market_data=FrameStore(os.path.join(workdir, 'frames'), {**csv_frames, 'SYN': long_frame}),
+        llm=FakeListLLM(responses=[json.dumps(STRATEGY)]),
+        llm_cache=LLMResponseCache(path=os.path.join(workdir, 'llm_cache.sqlite3'))
+    )
+    indicators = agent._calculate_technical_indicators(nvda)
+    stats = {'volume': nvda['Volume'].iloc[-1], 'avg_volume_10d': nvda['Volume'].tail(10).mean()}
+    signal = agent._generate_signals(indicators, stats)
+    agent._extract_strategy(COMPOUND_REQUEST)
+    unique_requests = (f"{COMPOUND_REQUEST} #{i}" for i in range(10 ** 9))
+
+    # The CSVs as an old data directory, imported into the columnar store on first read
+    csv_dir = os.path.join(workdir, 'csv')
+    os.makedirs(csv_dir)
+    for ticker in TICKERS:
+        shutil.copy(os.path.join(DATA_DIR, f'{ticker}_historical.csv'), csv_dir)
+    # Naive market time, as the store covers it
+    start, end = (nvda.index[i].tz_convert(MARKET_TZ).tz_localize(None).to_pydatetime() for i in (0, -1))
+    imported_dir = os.path.join(workdir, 'imported')
+    shutil.copytree(csv_dir, imported_dir)
+    MarketDataStore(data_dir=imported_dir, fetcher=_offline_fetcher).get_history('NVDA', start=start, end=end)
+    warm_store = MarketDataStore(data_dir=imported_dir, fetcher=_offline_fetcher)
+    warm_store.get_history('NVDA', start=start, end=end)
+    universe_bars = BarStore(os.path.join(workdir, 'universe'))
+    for ticker, df in universe.items():
+        universe_bars.write(ticker, df)
+    fresh_dirs = (os.path.join(workdir, f'import_{i}') for i in range(10 ** 9))
+
+    def fresh_csv_store():
+        path = next(fresh_dirs)
+        shutil.copytree(csv_dir, path)
+        return MarketDataStore(data_dir=path, fetcher=_offline_fetcher)
+
+    label = f"{tickers}x{years:g}y"
+    return [
+        # Indicators
+        Benchmark('indicators.csv_nvda', lambda: agent._calculate_technical_indicators(nvda)),
+        Benchmark(f'indicators.gbm_{years:g}y', lambda: agent._calculate_technical_indicators(long_frame)),
+        Benchmark(f'indicators.panel_{label}', lambda: calculate_panel_indicators(
+            panel['Close'], panel['High'], panel['Low'], panel['Volume'])),
+
+        # Signals
+        Benchmark('signals.generate', lambda: agent._generate_signals(indicators, stats)),
+        Benchmark('signals.should_trigger', lambda: should_trigger_signal(signal, STRATEGY)),
+
+        # Backtests
+        Benchmark('backtest.strategy_csv_nvda', lambda: agent._backtest_strategy(STRATEGY)),
+        Benchmark(f'backtest.strategy_gbm_{years:g}y', lambda: agent._backtest_strategy(long_strategy)),
+        Benchmark(f'backtest.universe_{label}', lambda: [backtest.backtest(df, STRATEGY) for df in universe.values()]),
+
+        # Data loading
+        Benchmark('load.read_csv', lambda: load_csv('NVDA')),
+        Benchmark('load.store_import_csv', lambda store: store.get_history('NVDA', start=start, end=end),
+                  setup=fresh_csv_store),
+        Benchmark('load.store_disk', lambda store: store.get_history('NVDA', start=start, end=end),
+                  setup=lambda: MarketDataStore(data_dir=imported_dir, fetcher=_offline_fetcher)),
+        Benchmark('load.store_memory', lambda: warm_store.get_history('NVDA', start=start, end=end)),
+        Benchmark(f'load.bar_store_universe_{label}', lambda: [universe_bars.read(ticker) for ticker in universe]),
+
+        # Strategy parsing with a stand-in LLM
+        Benchmark('parse.fast_path', lambda: agent._extract_strategy(SIMPLE_REQUEST)),
+        Benchmark('parse.llm_cache_hit', lambda: agent._extract_strategy(COMPOUND_REQUEST)),
+        Benchmark('parse.llm_stub', lambda: agent._extract_strategy(next(unique_requests))),
+    ]
+
+
+def measure(benchmark: Benchmark, repeat: int, min_time: float) -> Dict[str, Any]:
+    """Seconds per call over `repeat` samples; calls without setup are batched to last at least `min_time`"""
+    if benchmark.setup is not None:
+        number = 1
+    else:
+        started = time.perf_counter()
+        benchmark.func()
+        number = max(1, math.ceil(min_time / max(time.perf_counter() - started, 1e-9)))
+
+    samples = []
+    for _ in range(repeat):
+        args = (benchmark.setup(),) if benchmark.setup is not None else ()
+        started = time.perf_counter()
+        for _ in range(number):
+            benchmark.func(*args)
+        samples.append((time.perf_counter() - started) / number)
+
+    return {
+        'median': statistics.median(samples),
+        'min': min(samples),
+        'mean': statistics.mean(samples),
+        'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'repeat': repeat,
+        'number': number,
+    }
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            threshold: float = 0.25, metric: str = 'median') -> List[Dict[str, Any]]:
+    """One row per benchmark with its ratio to the baseline and whether that is a regression"""
+    rows = []
+    for name in sorted(set(results) | set(baseline)):
+        if name not in baseline or name not in results:
+            rows.append({'name': name, 'status': 'new' if name not in baseline else 'missing'})
+            continue
+        current, previous = results[name][metric], baseline[name][metric]
+        ratio = current / previous if previous else float('inf')
+        if ratio > 1 + threshold:
+            status = 'regression'
+        elif ratio < 1 / (1 + threshold):
+            status = 'improvement'
+        else:
+            status = 'ok'
+        rows.append({'name': name, 'baseline': previous, 'current': current, 'ratio': ratio, 'status': status})
+    return rows
+
+
+def environment() -> Dict[str, Any]:
+    import talib
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'talib': talib.__version__,
+        'commit': commit,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark indicators, backtests, data loading and parsing")
+    parser.add_argument('-k', dest='filter', help="Only run benchmarks whose name contains this")
+    parser.add_argument('--repeat', type=int, default=7, help="Samples per benchmark")
+    parser.add_argument('--min-time', type=float, default=0.05, help="Minimum seconds per sample")
+    parser.add_argument('--tickers', type=int, default=100, help="Tickers in the synthetic universe")
+    parser.add_argument('--years', type=float, default=10, help="Years of synthetic daily bars")
+    parser.add_argument('--quick', action='store_true', help="Small inputs and few samples, for CI smoke runs")
+    parser.add_argument('--json', help="Write results to this file")
+    parser.add_argument('--compare', metavar='BASELINE', help="Compare with results saved by --json")
+    parser.add_argument('--threshold', type=float, default=0.25, help="Slowdown ratio counted as a regression")
+    parser.add_argument('--metric', choices=['median', 'min', 'mean'], default='median')
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.repeat, args.min_time, args.tickers, args.years = 3, 0.01, 10, 2
+
+    with tempfile.TemporaryDirectory() as workdir:
+        benchmarks = [b for b in build_benchmarks(workdir, args.tickers, args.years)
+                      if not args.filter or args.filter in b.name]
+        results = {}
+        for benchmark in benchmarks:
+            results[benchmark.name] = measure(benchmark, args.repeat, args.min_time)
+            result = results[benchmark.name]
+            print(f"{benchmark.name:36} {result['median'] * 1000:10.3f} ms  "
+                  f"(min {result['min'] * 1000:.3f}, {result['repeat']}x{result['number']})")
+
+    report = {
+        'environment': environment(),
+        'parameters': {'tickers': args.tickers, 'years': args.years, 'repeat': args.repeat},
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if not args.compare:
+        return 0
+
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    if baseline.get('parameters', {}).get('tickers') != args.tickers or \
+            baseline.get('parameters', {}).get('years') != args.years:
+        print(f"Warning: baseline was run with {baseline.get('parameters')}; sized benchmarks will differ")
+
+    rows = compare(results, baseline['results'], args.threshold, args.metric)
+    print(f"\n{'benchmark':36} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for row in rows:
+        if 'ratio' in row:
+            print(f"{row['name']:36} {row['baseline'] * 1000:9.3f} ms {row['current'] * 1000:9.3f} ms "
+                  f"{row['ratio']:6.2f}x  {row['status']}")
+        else:
+            print(f"{row['name']:36} {row['status']}")
+
+    regressions = [row['name'] for row in rows if row['status'] == 'regression']
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
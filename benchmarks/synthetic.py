@@ -0,0 +1,51 @@
+"""Synthetic OHLCV bars from geometric Brownian motion.
+
+Deterministic for a given seed, so benchmark inputs are identical across runs and
+machines, and sized freely from one ticker-year to thousands of tickers over decades.
+"""
+from typing import Dict
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+
+def gbm_closes(tickers: int, bars: int, seed: int = 0, start_price: float = 100.0,
+               drift: float = 0.08, volatility: float = 0.3) -> np.ndarray:
+    """tickers x bars closing prices with annualized drift and volatility"""
+    rng = np.random.default_rng(seed)
+    dt = 1.0 / TRADING_DAYS
+    # Spread drift and volatility across tickers so a universe is not one repeated path
+    sigma = volatility * rng.uniform(0.5, 1.5, (tickers, 1))
+    mu = drift + rng.normal(0, 0.05, (tickers, 1))
+    shocks = rng.standard_normal((tickers, bars))
+    log_returns = (mu - 0.5 * sigma ** 2) * dt + sigma * np.sqrt(dt) * shocks
+    return start_price * np.exp(np.cumsum(log_returns, axis=1))
+
+
+def gbm_universe(tickers: int = 1, years: float = 1.0, seed: int = 0,
+                 start: str = '2015-01-02') -> Dict[str, pd.DataFrame]:
+    """Daily OHLCV frames keyed 'SYN0000', 'SYN0001', ... in the layout of data/*_historical.csv"""
+    bars = max(int(years * TRADING_DAYS), 2)
+    index = pd.DatetimeIndex(pd.bdate_range(start, periods=bars, tz='UTC'), name='Date')
+    rng = np.random.default_rng(seed + 1)
+
+    close = gbm_closes(tickers, bars, seed)
+    previous = np.concatenate([close[:, :1], close[:, :-1]], axis=1)
+    open_ = previous * np.exp(rng.normal(0, 0.005, close.shape))
+    wick = np.abs(rng.normal(0, 0.01, close.shape))
+    high = np.maximum(open_, close) * (1 + wick)
+    low = np.minimum(open_, close) * (1 - wick)
+    volume = rng.lognormal(16, 0.5, close.shape).astype(np.int64)
+
+    return {
+        f"SYN{i:04d}": pd.DataFrame({
+            'Open': open_[i], 'High': high[i], 'Low': low[i], 'Close': close[i], 'Volume': volume[i],
+            'Dividends': 0.0, 'Stock Splits': 0.0
+        }, index=index)
+        for i in range(tickers)
+    }
+
+
+def gbm_frame(years: float = 1.0, seed: int = 0, start: str = '2015-01-02') -> pd.DataFrame:
+    return next(iter(gbm_universe(1, years, seed, start).values()))
@@ -1,7 +1,14 @@
-import yfinance as yf
 from datetime import datetime, timedelta
+import argparse
 import pandas as pd
 import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agents.ingest import BulkDownloader, load_universe
+from agents.market_data import MarketDataStore
+from agents.rate_limit import TokenBucket
 
 # Set up logging
 logging.basicConfig(
@@ -10,48 +17,80 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def get_stock_data():
+# Tickers charted by the frontend
+DEFAULT_TICKERS = {
+    'SPY': 'S&P 500 ETF',
+    'SMH': 'Semiconductor ETF',
+    'NVDA': 'NVIDIA',
+    'AMD': 'AMD'
+}
+
+def get_stock_data(tickers=None, days=3*365, workers=8, rate=5.0, retries=3, export_csv=True, store=None,
+                   timeframe='1d', keep_frames=True):
     # Calculate dates
     end_date = datetime.now()
-    start_date = end_date - timedelta(days=3*365)  # 3 years of data
-    
+    start_date = end_date - timedelta(days=days)  # 3 years of data by default
+
     # List of tickers to fetch
-    tickers = {
-        'SPY': 'S&P 500 ETF',
-        'SMH': 'Semiconductor ETF',
-        'NVDA': 'NVIDIA',
-        'AMD': 'AMD'
-    }
-    
+    tickers = list(tickers or DEFAULT_TICKERS)
+
     # Dictionary to store the data
     stock_data = {}
-    
-    try:
-        for ticker, name in tickers.items():
-            # Fetch data from Yahoo Finance
-            stock = yf.Ticker(ticker)
-            df = stock.history(start=start_date, end=end_date)
-            
-            # Store data
+
+    # Cache-first store backed by the columnar files under data/bars/, shared by all workers
+    store = store or MarketDataStore(rate_limiter=TokenBucket(rate))
+
+    def on_result(ticker, df):
+        # Store data as each ticker finishes; minute bars for a large universe stay on disk only
+        if keep_frames:
             stock_data[ticker] = df
-            
-            # Save to CSV
-            df.to_csv(f'data/{ticker}_historical.csv')
-            
-        # Calculate the number of months of data
-        months = (end_date.year - start_date.year) * 12 + (end_date.month - start_date.month)
-        
-        logger.info(f"Just got the data for {months} months from Yahoo Finance")
-        return stock_data
-        
-    except Exception as e:
-        logger.error(f"Error fetching data: {str(e)}")
-        raise
+
+        # Save to CSV for the frontend
+        if export_csv:
+            store.export_csv(ticker, timeframe=timeframe)
+
+    downloader = BulkDownloader(store, workers=workers, retries=retries, timeframe=timeframe)
+    report = downloader.run(tickers, start_date, end_date, on_result=on_result)
+
+    # Calculate the number of months of data
+    months = (end_date.year - start_date.year) * 12 + (end_date.month - start_date.month)
+
+    logger.info(f"Just got the data for {months} months from Yahoo Finance")
+    for ticker, error in sorted(report['failed'].items()):
+        logger.error(f"Error fetching {ticker}: {error}")
+
+    return stock_data, report
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Download historical bars into data/")
+    parser.add_argument('tickers', nargs='*', help="Ticker symbols (defaults to the frontend tickers)")
+    parser.add_argument('--universe', help="File with one ticker per line or comma separated")
+    parser.add_argument('--days', type=int, default=3*365, help="Days of history to keep")
+    parser.add_argument('--workers', type=int, default=8, help="Concurrent downloads")
+    parser.add_argument('--rate', type=float, default=5.0, help="Maximum requests per second")
+    parser.add_argument('--retries', type=int, default=3, help="Retries per ticker")
+    parser.add_argument('--timeframe', default='1d', help="Bar size, e.g. 1m, 5m, 1h or 1d")
+    parser.add_argument('--csv', action='store_true', help="Also export CSVs for a custom universe")
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
-    # Create data directory if it doesn't exist
-    import os
-    os.makedirs('data', exist_ok=True)
-    
-    # Fetch the data
-    get_stock_data()
+    args = parse_args()
+
+    tickers = list(args.tickers)
+    if args.universe:
+        tickers += load_universe(args.universe)
+
+    # Fetch the data; CSVs are always exported for the default frontend tickers
+    _, report = get_stock_data(
+        tickers=tickers or None,
+        days=args.days,
+        workers=args.workers,
+        rate=args.rate,
+        retries=args.retries,
+        export_csv=args.csv or not tickers,
+        timeframe=args.timeframe,
+        keep_frames=False
+    )
+
+    # Partial failures are reported; only a run where nothing succeeded fails
+    sys.exit(1 if report['failed'] and not report['succeeded'] else 0)